@@ -0,0 +1,57 @@
+from flask import Flask
+import os
+import sqlite3
+
+from common.admissao import instalar_admissao
+from common.compressao import instalar_compressao
+from common.escolas import abrir_stores, instalar_escolas, store_atual
+from common.gerenciamento_client import GerenciamentoClient
+from common.metrics import instrumentar
+from common.reconciliacao import instalar_reconciliacao
+from common.snapshot import instalar_snapshot
+from common.openapi import configurar_docs
+
+
+def create_app():
+    app = Flask(__name__)
+    # Swagger (ou, com FAST_STARTUP=1, o spec pré-construído no build)
+    configurar_docs(app, "Atividades API")
+
+    # Latência, status e requisições em andamento por rota, em GET /metrics
+    instrumentar(app, "atividades")
+
+    # Controle de admissão (429/503 + Retry-After): com workers gevent, o limite de
+    # concorrência é alto; leituras têm vagas reservadas acima das escritas
+    instalar_admissao(app, "atividades", erros_lock=(sqlite3.OperationalError,),
+                      concorrencia=1000, reserva_leituras=200, escritas=200, fila_escritas=1000)
+
+    # gzip/brotli negociado pelo Accept-Encoding nas respostas grandes
+    instalar_compressao(app)
+
+    # Banco no volume /data no Docker (ATIVIDADES_DB); localmente, ao lado do código
+    db_path = os.environ.get("ATIVIDADES_DB", os.path.join(os.path.dirname(__file__), "..", "atividades.db"))
+
+    from .store import AtividadeStore
+    app.extensions["atividades"] = AtividadeStore(db_path)
+
+    # Várias escolas (ESCOLAS_DIR): com X-Escola, cada escola usa o próprio banco
+    instalar_escolas(app, abrir_stores(AtividadeStore, "atividades"))
+
+    # URL vem de GERENCIAMENTO_URL (docker-compose); conexões reaproveitadas entre requisições
+    app.extensions["gerenciamento"] = GerenciamentoClient()
+
+    # Referências a ids removidos no Gerenciamento: POST /reconciliacao (ou o job
+    # noturno ``python -m common.reconciliacao``); RECONCILIACAO_ACAO=marcar|remover
+    instalar_reconciliacao(app, app.extensions["atividades"], app.extensions["gerenciamento"],
+                           acao=os.environ.get("RECONCILIACAO_ACAO", "marcar"))
+
+    # Snapshot (backup online) e exportação em stream (NDJSON/CSV)
+    instalar_snapshot(app, lambda: store_atual(app, "atividades").caminho,
+                      {"atividades": ("atividade", ("id", "titulo", "descricao", "professor_id", "turma_id"))},
+                      "atividades")
+
+    # Importar e registra as rotas
+    from .routes import bp
+    app.register_blueprint(bp)
+
+    return app
@@ -0,0 +1,304 @@
+from flask import Blueprint, current_app, request, jsonify
+
+from common.escolas import escola_atual, store_atual
+from common.gerenciamento_client import (
+    GerenciamentoConsultaInvalida, GerenciamentoIndisponivel, GerenciamentoSobrecarregado, GerenciamentoSuspenso)
+
+bp = Blueprint("atividades", __name__)
+
+
+def _gerenciamento():
+    return current_app.extensions["gerenciamento"]
+
+
+def _atividades():
+    # Banco da escola do X-Escola, ou o do serviço
+    return store_atual(current_app, "atividades")
+
+
+def _gerenciamento_suspenso(erro):
+    # Falha rápida enquanto o Gerenciamento está degradado, sem prender a requisição
+    resp = jsonify({"error": "Gerenciamento indisponível no momento; tente novamente em instantes"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(erro.retry_after)
+    return resp
+
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+
+# Maior INTEGER do SQLite; acima dele o driver levanta OverflowError
+INT64_MAX = 2 ** 63 - 1
+
+
+def _inteiro(nome, minimo=0):
+    """Lê um parâmetro inteiro da query string, de ``minimo`` até int64 (None se ausente)."""
+    valor = request.args.get(nome)
+    if valor in (None, ""):
+        return None
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ValueError(f"O parâmetro '{nome}' deve ser um inteiro")
+    if valor > INT64_MAX:
+        raise ValueError(f"O parâmetro '{nome}' deve ser um inteiro")
+    if valor < minimo:
+        raise ValueError(f"O parâmetro '{nome}' não pode ser negativo" if minimo == 0
+                         else f"O parâmetro '{nome}' deve ser >= {minimo}")
+    return valor
+
+
+@bp.post("/atividades")
+def criar_atividade():
+    """
+    Cria uma nova atividade (valida professor e turma via Gerenciamento)
+    ---
+    tags:
+      - Atividades
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            titulo:
+              type: string
+            descricao:
+              type: string
+            professor_id:
+              type: integer
+            turma_id:
+              type: integer
+    responses:
+      201:
+        description: Atividade criada com sucesso
+      400:
+        description: Dados inválidos
+      502:
+        description: Falha ao consultar o Gerenciamento
+      503:
+        description: Gerenciamento fora do ar (circuit breaker aberto) ou sobrecarregado; tente após Retry-After
+    """
+    data = request.get_json()
+    titulo = data.get("titulo")
+    descricao = data.get("descricao")
+    professor_id = data.get("professor_id")
+    turma_id = data.get("turma_id")
+
+    if not all([titulo, professor_id, turma_id]):
+        return jsonify({"error": "Campos obrigatórios: titulo, professor_id, turma_id"}), 400
+    # bool é subclasse de int no Python, mas true/false não são ids
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (professor_id, turma_id)):
+        return jsonify({"error": "professor_id e turma_id devem ser inteiros"}), 400
+
+    # 🔹 Valida o professor e a turma no Gerenciamento em uma única chamada
+    try:
+        encontrados = _gerenciamento().existem(escola_atual(), professores=[professor_id], turmas=[turma_id])
+    except (GerenciamentoSuspenso, GerenciamentoSobrecarregado) as erro:
+        return _gerenciamento_suspenso(erro)
+    except GerenciamentoConsultaInvalida as erro:
+        return jsonify({"error": f"Dados recusados pelo Gerenciamento: {erro}"}), 400
+    except GerenciamentoIndisponivel:
+        return jsonify({"error": "Falha ao validar no Gerenciamento"}), 502
+
+    if professor_id not in encontrados["professores"]:
+        return jsonify({"error": "Professor não encontrado"}), 400
+    if turma_id not in encontrados["turmas"]:
+        return jsonify({"error": "Turma não encontrada"}), 400
+
+    atividade = _atividades().criar(titulo, descricao, professor_id, turma_id)
+    return jsonify(atividade), 201
+
+
+@bp.get("/atividades")
+def listar_atividades():
+    """
+    Lista as atividades, com filtros por turma e professor e paginação por cursor
+    ---
+    tags:
+      - Atividades
+    parameters:
+      - in: query
+        name: turma_id
+        type: integer
+      - in: query
+        name: professor_id
+        type: integer
+      - in: query
+        name: limit
+        type: integer
+        default: 100
+        description: Itens por página (de 1 a 1000; 0 é recusado com 400)
+      - in: query
+        name: after
+        type: integer
+        description: Valor de next_cursor da página anterior
+    responses:
+      200:
+        description: Página de atividades e cursor da próxima página
+      400:
+        description: Parâmetros inválidos
+    """
+    try:
+        filtros = {campo: _inteiro(campo) for campo in ("turma_id", "professor_id")}
+        # limit=0 é recusado (400), como no Gerenciamento; ausente vale LIMITE_PADRAO
+        limite = _inteiro("limit", minimo=1)
+        limite = LIMITE_PADRAO if limite is None else min(limite, LIMITE_MAXIMO)
+        after = _inteiro("after") or 0
+    except ValueError as erro:
+        return jsonify({"error": str(erro)}), 400
+
+    itens = _atividades().listar(after=after, limite=limite + 1, **filtros)
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo = itens[-1]["id"]
+    return jsonify({"items": itens, "next_cursor": proximo})
+
+
+@bp.delete("/atividades/<int:atividade_id>")
+def remover_atividade(atividade_id):
+    """
+    Remove uma atividade
+    ---
+    tags:
+      - Atividades
+    parameters:
+      - in: path
+        name: atividade_id
+        type: integer
+        required: true
+    responses:
+      204:
+        description: Atividade removida
+      404:
+        description: Atividade não encontrada
+    """
+    if not _atividades().remover(atividade_id):
+        return jsonify({"error": "Atividade não encontrada"}), 404
+    return "", 204
+
+
+@bp.get("/atividades/stats/turmas")
+def stats_atividades_por_turma():
+    """
+    Quantidade de atividades por turma (contadores mantidos a cada inserção/remoção)
+    ---
+    tags:
+      - Atividades
+    responses:
+      200:
+        description: Lista de {turma_id, total}
+    """
+    return jsonify({"items": _atividades().contagens("turma_id")})
+
+
+@bp.get("/atividades/stats/turmas/<int:turma_id>")
+def stats_atividades_turma(turma_id):
+    """
+    Quantidade de atividades de uma turma, em O(1)
+    ---
+    tags:
+      - Atividades
+    parameters:
+      - in: path
+        name: turma_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Total de atividades
+    """
+    return jsonify({"turma_id": turma_id, "total": _atividades().contagem("turma_id", turma_id)})
+
+
+@bp.get("/atividades/stats/professores")
+def stats_atividades_por_professor():
+    """
+    Quantidade de atividades por professor (contadores mantidos a cada inserção/remoção)
+    ---
+    tags:
+      - Atividades
+    responses:
+      200:
+        description: Lista de {professor_id, total}
+    """
+    return jsonify({"items": _atividades().contagens("professor_id")})
+
+
+@bp.get("/atividades/stats/professores/<int:professor_id>")
+def stats_atividades_professor(professor_id):
+    """
+    Quantidade de atividades de um professor, em O(1)
+    ---
+    tags:
+      - Atividades
+    parameters:
+      - in: path
+        name: professor_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Total de atividades
+    """
+    return jsonify({"professor_id": professor_id, "total": _atividades().contagem("professor_id", professor_id)})
+
+
+@bp.get("/cache")
+def cache_stats():
+    """
+    Estatísticas do cache de validação (hits, misses, tamanho)
+    ---
+    tags:
+      - Cache
+    responses:
+      200:
+        description: Contadores do cache
+    """
+    cache = _gerenciamento().cache
+    return jsonify(cache.stats() if cache is not None else {"enabled": False})
+
+
+@bp.delete("/cache")
+def limpar_cache():
+    """
+    Esvazia o cache de validação
+    ---
+    tags:
+      - Cache
+    responses:
+      204:
+        description: Cache esvaziado
+    """
+    _gerenciamento().invalidar()
+    return "", 204
+
+
+@bp.delete("/cache/<entidade>/<int:entidade_id>")
+def invalidar_cache(entidade, entidade_id):
+    """
+    Invalida um ID no cache de validação
+    ---
+    tags:
+      - Cache
+    parameters:
+      - in: path
+        name: entidade
+        type: string
+        enum: [professores, turmas]
+      - in: path
+        name: entidade_id
+        type: integer
+    responses:
+      204:
+        description: ID removido do cache
+    """
+    _gerenciamento().invalidar(entidade, entidade_id, escola_atual())
+    return "", 204
+
+
+@bp.get("/health")
+def health():
+    return {"status": "ok", "service": "atividades", "gerenciamento": _gerenciamento().breaker.stats()["state"]}
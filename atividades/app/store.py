@@ -0,0 +1,68 @@
+from common.sqlite_store import SQLiteStore
+
+
+class AtividadeStore(SQLiteStore):
+    """Atividades persistidas em SQLite (WAL).
+
+    O id vem do AUTOINCREMENT do SQLite, atribuído dentro da transação de
+    escrita: é único mesmo com vários workers gravando ao mesmo tempo.
+    """
+
+    TABELA = "atividade"
+    CONTADORES = ("turma_id", "professor_id")
+    REFERENCIAS = {"professor_id": "professores", "turma_id": "turmas"}
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS atividade (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo TEXT NOT NULL,
+        descricao TEXT,
+        professor_id INTEGER NOT NULL,
+        turma_id INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_atividade_professor_id ON atividade (professor_id);
+    CREATE INDEX IF NOT EXISTS ix_atividade_turma_id ON atividade (turma_id);
+    CREATE INDEX IF NOT EXISTS ix_atividade_turma_professor ON atividade (turma_id, professor_id);
+    """
+    VERSAO_SCHEMA = 2
+
+    def criar(self, titulo, descricao, professor_id, turma_id):
+        with self.transacao() as conn:
+            cur = conn.execute(
+                "INSERT INTO atividade (titulo, descricao, professor_id, turma_id) VALUES (?, ?, ?, ?)",
+                (titulo, descricao, professor_id, turma_id),
+            )
+        return {
+            "id": cur.lastrowid,
+            "titulo": titulo,
+            "descricao": descricao,
+            "professor_id": professor_id,
+            "turma_id": turma_id
+        }
+
+    def remover(self, atividade_id):
+        with self.transacao() as conn:
+            cur = conn.execute("DELETE FROM atividade WHERE id = ?", (atividade_id,))
+        return cur.rowcount > 0
+
+    def listar(self, professor_id=None, turma_id=None, after=0, limite=100):
+        """Página de atividades com ``id > after``, em ordem de id, filtrada por professor e/ou turma.
+
+        Cada filtro tem índice próprio (o id já faz parte de todo índice no
+        SQLite), então o custo é proporcional ao tamanho da página, não da tabela.
+        """
+        condicoes, params = ["id > ?"], [after]
+        if professor_id is not None:
+            condicoes.append("professor_id = ?")
+            params.append(professor_id)
+        if turma_id is not None:
+            condicoes.append("turma_id = ?")
+            params.append(turma_id)
+        params.append(limite)
+        with self.leitura() as conn:
+            linhas = conn.execute(
+                "SELECT id, titulo, descricao, professor_id, turma_id FROM atividade "
+                f"WHERE {' AND '.join(condicoes)} ORDER BY id LIMIT ?",
+                params,
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
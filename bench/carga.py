@@ -0,0 +1,197 @@
+"""Gerador de carga: mede latência (p50/p90/p99) e vazão dos endpoints dos três serviços.
+
+Cada cenário roda por ``--segundos`` com ``--concorrencia`` clientes simultâneos
+(threads com conexão keep-alive própria). O resultado sai em JSON, com o commit
+atual, para ser comparado entre versões com ``bench/comparar.py``.
+
+    python bench/carga.py --cenarios aluno-get alunos-lista reservas-post --concorrencia 32 --segundos 20 \\
+        --json resultados/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+
+NOMES_BUSCA = ("Ana", "Bruno", "Camila", "Diego", "Fernanda", "Gabriel", "João", "Larissa", "Lucas",
+               "Maria", "Pedro", "Rafael", "Silva", "Souza", "Lima", "Costa", "Almeida", "Oliveira")
+
+
+def _aluno_get(cfg, sessao, estado):
+    return sessao.get(f"{cfg.gerenciamento}/api/alunos/{random.randint(1, cfg.alunos)}")
+
+
+def _alunos_lista(cfg, sessao, estado):
+    # Percorre a listagem pelo cursor, como um cliente real; recomeça no fim
+    params = {"limit": 100}
+    if estado.get("cursor"):
+        params["after"] = estado["cursor"]
+    resp = sessao.get(f"{cfg.gerenciamento}/api/alunos", params=params)
+    if resp.ok:
+        estado["cursor"] = resp.json().get("next_cursor")
+    return resp
+
+
+def _lookup(cfg, sessao, estado):
+    return sessao.post(f"{cfg.gerenciamento}/api/lookup", json={
+        "alunos": [random.randint(1, cfg.alunos)], "turmas": [random.randint(1, cfg.turmas)]})
+
+
+def _busca(cfg, sessao, estado):
+    # Autocomplete: prefixos de 2 a 4 letras de nomes comuns
+    nome = random.choice(NOMES_BUSCA)
+    return sessao.get(f"{cfg.gerenciamento}/api/search", params={"q": nome[:random.randint(2, 4)]})
+
+
+def _reservas_post(cfg, sessao, estado):
+    return sessao.post(f"{cfg.reservas}/reservas", json={
+        "aluno_id": random.randint(1, cfg.alunos), "turma_id": random.randint(1, cfg.turmas)})
+
+
+def _reservas_lista(cfg, sessao, estado):
+    return sessao.get(f"{cfg.reservas}/reservas", params={"turma_id": random.randint(1, cfg.turmas), "limit": 100})
+
+
+def _atividades_post(cfg, sessao, estado):
+    return sessao.post(f"{cfg.atividades}/atividades", json={
+        "titulo": "Atividade de carga", "descricao": "bench",
+        "professor_id": random.randint(1, cfg.professores), "turma_id": random.randint(1, cfg.turmas)})
+
+
+def _atividades_lista(cfg, sessao, estado):
+    return sessao.get(f"{cfg.atividades}/atividades",
+                      params={"professor_id": random.randint(1, cfg.professores), "limit": 100})
+
+
+CENARIOS = {
+    "aluno-get": _aluno_get,
+    "alunos-lista": _alunos_lista,
+    "lookup": _lookup,
+    "busca": _busca,
+    "reservas-post": _reservas_post,
+    "reservas-lista": _reservas_lista,
+    "atividades-post": _atividades_post,
+    "atividades-lista": _atividades_lista,
+}
+
+
+# Respostas de carga recusada (controle de admissão)
+RECUSAS = ("429", "503")
+
+
+def percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+def rodar_cenario(nome, cfg):
+    chamada = CENARIOS[nome]
+    latencias, status = [], {}
+    lock = threading.Lock()
+    fim = time.monotonic() + cfg.segundos
+
+    def cliente():
+        sessao = requests.Session()
+        estado = {}
+        locais, contagem = [], {}
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            try:
+                codigo = chamada(cfg, sessao, estado).status_code
+            except requests.RequestException:
+                codigo = "falha"
+            locais.append(time.perf_counter() - inicio)
+            contagem[codigo] = contagem.get(codigo, 0) + 1
+        with lock:
+            latencias.extend(locais)
+            for codigo, n in contagem.items():
+                status[str(codigo)] = status.get(str(codigo), 0) + n
+
+    threads = [threading.Thread(target=cliente) for _ in range(cfg.concorrencia)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    ms = [v * 1000 for v in latencias]
+    # 429/503 são recusas do controle de admissão: contam como erro, senão um serviço
+    # que recusa a maior parte da carga parece mais rápido
+    recusadas = sum(status.get(codigo, 0) for codigo in RECUSAS)
+    erros = sum(n for codigo, n in status.items() if not codigo.startswith(("2", "3", "4"))) + status.get("429", 0)
+    return {
+        "cenario": nome,
+        "requisicoes": len(ms),
+        "erros": erros,
+        "recusadas": recusadas,
+        "taxa_erro": round(erros / len(ms) * 100, 2) if ms else 0.0,
+        "status": status,
+        "duracao_s": round(duracao, 2),
+        "rps": round(len(ms) / duracao, 1),
+        "latencia_ms": {
+            "media": round(sum(ms) / len(ms), 2) if ms else None,
+            "p50": round(percentil(ms, 50), 2) if ms else None,
+            "p90": round(percentil(ms, 90), 2) if ms else None,
+            "p99": round(percentil(ms, 99), 2) if ms else None,
+            "max": round(ms[-1], 2) if ms else None,
+        },
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cenarios", nargs="+", default=["aluno-get", "alunos-lista", "lookup"],
+                        choices=sorted(CENARIOS) + ["todos"])
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--gerenciamento", default="http://localhost:5001")
+    parser.add_argument("--reservas", default="http://localhost:5002")
+    parser.add_argument("--atividades", default="http://localhost:5003")
+    parser.add_argument("--alunos", type=int, default=10_000, help="Maior id de aluno existente")
+    parser.add_argument("--professores", type=int, default=500, help="Maior id de professor existente")
+    parser.add_argument("--turmas", type=int, default=300, help="Maior id de turma existente")
+    parser.add_argument("--json", help="Arquivo para gravar os resultados")
+    cfg = parser.parse_args()
+
+    nomes = sorted(CENARIOS) if "todos" in cfg.cenarios else cfg.cenarios
+    resultados = []
+    for nome in nomes:
+        r = rodar_cenario(nome, cfg)
+        resultados.append(r)
+        lat = r["latencia_ms"]
+        print(f"{nome:17} {r['rps']:>9} req/s  p50={lat['p50']}ms  p90={lat['p90']}ms  p99={lat['p99']}ms  "
+              f"erros={r['erros']} ({r['taxa_erro']}%)  recusadas={r['recusadas']}  status={r['status']}")
+
+    saida = {
+        "commit": _commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "maquina": platform.node(),
+        "concorrencia": cfg.concorrencia,
+        "segundos": cfg.segundos,
+        "resultados": resultados,
+    }
+    if cfg.json:
+        with open(cfg.json, "w") as arquivo:
+            json.dump(saida, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
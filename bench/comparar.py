@@ -0,0 +1,69 @@
+"""Compara dois resultados de ``bench/carga.py`` e aponta regressões.
+
+    python bench/comparar.py base.json novo.json --tolerancia 10
+
+Sai com código 1 se, em algum cenário, o p99 piorou ou a vazão caiu mais que
+``--tolerancia`` por cento, ou se a taxa de erro (que inclui as recusas 429/503
+do controle de admissão) subiu mais que ``--tolerancia-erros`` pontos percentuais.
+"""
+import argparse
+import json
+import sys
+
+
+def variacao(antes, depois):
+    if not antes or depois is None:
+        return None
+    return (depois - antes) / antes * 100
+
+
+def taxa_erro(resultado):
+    # Resultados antigos não têm "taxa_erro" nem contavam o 429 em "erros"
+    if "taxa_erro" in resultado:
+        return resultado["taxa_erro"]
+    requisicoes = resultado["requisicoes"]
+    erros = resultado["erros"] + resultado["status"].get("429", 0)
+    return round(erros / requisicoes * 100, 2) if requisicoes else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--tolerancia", type=float, default=10.0, help="Piora máxima aceita, em %%")
+    parser.add_argument("--tolerancia-erros", type=float, default=1.0,
+                        help="Aumento máximo aceito na taxa de erro, em pontos percentuais")
+    args = parser.parse_args()
+
+    with open(args.base) as a, open(args.novo) as b:
+        base, novo = json.load(a), json.load(b)
+    antes = {r["cenario"]: r for r in base["resultados"]}
+
+    print(f"base={base.get('commit')}  novo={novo.get('commit')}")
+    print(f"{'cenário':17} {'req/s':>18} {'p50 ms':>18} {'p99 ms':>18} {'erros %':>16}")
+    regressao = False
+    for r in novo["resultados"]:
+        anterior = antes.get(r["cenario"])
+        if anterior is None:
+            print(f"{r['cenario']:17} (sem base)")
+            continue
+        d_rps = variacao(anterior["rps"], r["rps"])
+        d_p50 = variacao(anterior["latencia_ms"]["p50"], r["latencia_ms"]["p50"])
+        d_p99 = variacao(anterior["latencia_ms"]["p99"], r["latencia_ms"]["p99"])
+        erro_antes, erro_depois = taxa_erro(anterior), taxa_erro(r)
+        d_erro = erro_depois - erro_antes
+        piorou = ((d_rps is not None and d_rps < -args.tolerancia) or (d_p99 is not None and d_p99 > args.tolerancia)
+                  or d_erro > args.tolerancia_erros)
+        regressao |= piorou
+
+        def fmt(valor, delta):
+            return f"{valor} ({delta:+.1f}%)" if delta is not None else f"{valor}"
+        print(f"{r['cenario']:17} {fmt(r['rps'], d_rps):>18} {fmt(r['latencia_ms']['p50'], d_p50):>18} "
+              f"{fmt(r['latencia_ms']['p99'], d_p99):>18} {f'{erro_depois} ({d_erro:+.1f})':>16}"
+              f"{'  <- REGRESSÃO' if piorou else ''}")
+
+    sys.exit(1 if regressao else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Vazão de gravação de reservas: um commit por reserva contra commit em grupo.
+
+Roda o ``ReservaStore`` em processo, com ``--concorrencia`` threads criando
+reservas sem parar por ``--segundos``, em cada modo:
+
+- ``direta``: ``store.criar`` (um ``BEGIN IMMEDIATE``/``COMMIT`` por reserva);
+- ``lote``: ``GroupCommit`` esperando o commit do lote (mesma garantia de durabilidade);
+- ``ticket``: ``GroupCommit`` sem esperar (só enfileira; mede a aceitação).
+
+A validação no Gerenciamento fica de fora: o que se mede é o caminho de escrita.
+Com ``--turmas 1 --capacidade N`` todos disputam a mesma turma (turma "quente"):
+depois de lotada, as tentativas são recusadas como no ``POST /reservas``.
+
+    python bench/escrita_reservas.py --concorrencia 64 --segundos 10 --json escrita.json
+    python bench/escrita_reservas.py --turmas 1 --capacidade 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "reservas"))
+
+from app.store import ReservaDuplicada, ReservaStore, TurmaLotada  # noqa: E402
+from common.group_commit import FilaCheia, GroupCommit  # noqa: E402
+
+MODOS = ("direta", "lote", "ticket")
+
+
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] if ordenadas else 0.0
+
+
+def rodar(modo, args, diretorio):
+    store = ReservaStore(os.path.join(diretorio, f"{modo}.db"), pool=args.concorrencia)
+    lote = GroupCommit(store.criar_lote, f"bench-{modo}", max_lote=args.lote_max,
+                       intervalo=args.intervalo_ms / 1000, capacidade=args.fila)
+    latencias = [[] for _ in range(args.concorrencia)]
+    recusadas = [0] * args.concorrencia
+    lotadas = [0] * args.concorrencia
+    fim = time.monotonic() + args.segundos
+
+    def cliente(n):
+        i = 0
+        while time.monotonic() < fim:
+            i += 1
+            item = {"aluno_id": n * 1_000_000 + i, "turma_id": i % args.turmas,
+                    "capacidade": args.capacidade, "ticket": None}
+            inicio = time.perf_counter()
+            if store.lotada(item["turma_id"], args.capacidade):
+                lotadas[n] += 1
+            elif modo == "direta":
+                try:
+                    store.criar(item["aluno_id"], item["turma_id"], args.capacidade)
+                except (TurmaLotada, ReservaDuplicada):
+                    lotadas[n] += 1
+            else:
+                try:
+                    futuro = lote.enviar(item)
+                except FilaCheia:
+                    recusadas[n] += 1
+                    time.sleep(0.001)
+                    continue
+                if modo == "lote":
+                    try:
+                        futuro.result()
+                    except (TurmaLotada, ReservaDuplicada):
+                        lotadas[n] += 1
+            latencias[n].append(time.perf_counter() - inicio)
+
+    threads = [threading.Thread(target=cliente, args=(n,)) for n in range(args.concorrencia)]
+    inicio = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    lote.fechar()
+    duracao = time.monotonic() - inicio
+
+    with store.leitura() as conn:
+        gravadas = conn.execute("SELECT COUNT(*) FROM reserva").fetchone()[0]
+    todas = sorted(x * 1000 for lista in latencias for x in lista)
+    return {
+        "reservas_por_s": round(gravadas / duracao, 1),
+        "gravadas": gravadas,
+        "recusadas_fila_cheia": sum(recusadas),
+        "recusadas_sem_vaga": sum(lotadas),
+        "p50_ms": round(statistics.median(todas), 3) if todas else 0.0,
+        "p99_ms": round(_percentil(todas, 0.99), 3),
+        "media_por_lote": lote.stats()["avg_batch"] if modo != "direta" else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modos", nargs="+", default=list(MODOS), choices=MODOS)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--turmas", type=int, default=50, help="Turmas disputadas (1 = turma quente)")
+    parser.add_argument("--capacidade", type=int, help="Vagas por turma (padrão: sem limite)")
+    parser.add_argument("--lote-max", type=int, default=200)
+    parser.add_argument("--intervalo-ms", type=float, default=1)
+    parser.add_argument("--fila", type=int, default=10000)
+    parser.add_argument("--json", help="Arquivo para gravar os resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix="bench-escrita-") as diretorio:
+        for modo in args.modos:
+            resultados[modo] = rodar(modo, args, diretorio)
+            print(f"{modo:<8} {resultados[modo]}")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump({"concorrencia": args.concorrencia, "segundos": args.segundos,
+                       "resultados": resultados}, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Tempo até o primeiro ``/health`` saudável de cada serviço, por modo de inicialização.
+
+Sobe o serviço (processo novo, servidor do Flask) em modo padrão (Swagger
+montado na inicialização) e com ``FAST_STARTUP=1`` (spec pré-construído), com
+o banco vazio ("frio") e já criado ("quente"), e mede do ``spawn`` até a
+primeira resposta 200. O resultado sai em JSON, com o commit atual.
+
+    python bench/inicializacao.py --servicos gerenciamento reservas atividades --repeticoes 5
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# serviço -> (variável do banco, rota de health)
+SERVICOS = {
+    "gerenciamento": ("GERENCIAMENTO_DB", "/api/health"),
+    "reservas": ("RESERVAS_DB", "/health"),
+    "atividades": ("ATIVIDADES_DB", "/health"),
+}
+
+SERVIDOR = "from app import create_app; create_app().run(host='127.0.0.1', port={porta})"
+
+
+def _ambiente(servico, banco, extra):
+    env = dict(os.environ, PYTHONPATH=RAIZ, GERENCIAMENTO_URL="http://127.0.0.1:9", **extra)
+    env[SERVICOS[servico][0]] = banco
+    return env
+
+
+def gerar_spec(servico, destino, diretorio):
+    subprocess.run(
+        [sys.executable, "-m", "common.openapi", destino],
+        cwd=os.path.join(RAIZ, servico), check=True, stdout=subprocess.DEVNULL,
+        env=_ambiente(servico, os.path.join(diretorio, "spec.db"), {}),
+    )
+
+
+def medir(servico, porta, banco, extra, limite=30.0):
+    """Segundos do spawn até o primeiro 200 em /health."""
+    url = f"http://127.0.0.1:{porta}{SERVICOS[servico][1]}"
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-c", SERVIDOR.format(porta=porta)],
+        cwd=os.path.join(RAIZ, servico), env=_ambiente(servico, banco, extra),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - inicio < limite:
+            try:
+                if requests.get(url, timeout=0.5).status_code == 200:
+                    return time.perf_counter() - inicio
+            except requests.ConnectionError:
+                pass
+            if processo.poll() is not None:
+                raise RuntimeError(f"{servico} encerrou durante a inicialização (código {processo.returncode})")
+            time.sleep(0.005)
+        raise RuntimeError(f"{servico} não respondeu em {limite}s")
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def _resumo(amostras):
+    ms = sorted(a * 1000 for a in amostras)
+    return {"mediana_ms": round(statistics.median(ms), 1), "min_ms": round(ms[0], 1), "max_ms": round(ms[-1], 1)}
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=RAIZ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servicos", nargs="+", default=list(SERVICOS), choices=list(SERVICOS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--porta", type=int, default=5951)
+    parser.add_argument("--json", help="Arquivo para gravar os resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    diretorio = tempfile.mkdtemp(prefix="bench-inicializacao-")
+    try:
+        for servico in args.servicos:
+            spec = os.path.join(diretorio, f"{servico}.json")
+            gerar_spec(servico, spec, diretorio)
+            modos = {"padrao": {"FAST_STARTUP": "0"}, "rapido": {"FAST_STARTUP": "1", "OPENAPI_SPEC": spec}}
+            for modo, extra in modos.items():
+                for estado in ("frio", "quente"):
+                    amostras = []
+                    for i in range(args.repeticoes):
+                        banco = os.path.join(diretorio, f"{servico}-{modo}.db")
+                        if estado == "frio":
+                            for arquivo in os.listdir(diretorio):
+                                if arquivo.startswith(f"{servico}-{modo}.db"):
+                                    os.remove(os.path.join(diretorio, arquivo))
+                        elif i == 0:
+                            medir(servico, args.porta, banco, extra)  # cria o banco
+                        amostras.append(medir(servico, args.porta, banco, extra))
+                    chave = f"{servico}/{modo}/{estado}"
+                    resultados[chave] = _resumo(amostras)
+                    print(f"{chave:<32} {resultados[chave]}")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    saida = {
+        "commit": _commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "maquina": platform.node(),
+        "repeticoes": args.repeticoes,
+        "resultados": resultados,
+    }
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(saida, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
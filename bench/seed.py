@@ -0,0 +1,49 @@
+"""Popula o Gerenciamento com dados sintéticos pelos endpoints de cadastro em lote.
+
+    python bench/seed.py --url http://localhost:5001 --alunos 100000 --professores 1000 --turmas 500
+"""
+import argparse
+import json
+import time
+
+import requests
+
+LOTE = 50_000
+
+
+def ndjson(registros):
+    return "".join(json.dumps(r) + "\n" for r in registros).encode()
+
+
+def enviar(sessao, url, entidade, gerar, quantidade):
+    inicio = time.perf_counter()
+    erros = 0
+    for base in range(0, quantidade, LOTE):
+        registros = [gerar(i) for i in range(base, min(base + LOTE, quantidade))]
+        resp = sessao.post(f"{url}/api/{entidade}/bulk", data=ndjson(registros),
+                           headers={"Content-Type": "application/x-ndjson"}, timeout=600)
+        resp.raise_for_status()
+        erros += resp.json()["erro"]
+    duracao = time.perf_counter() - inicio
+    print(f"{entidade:12} {quantidade:>9} linhas em {duracao:6.1f}s ({quantidade / duracao:,.0f}/s), erros={erros}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--alunos", type=int, default=10_000)
+    parser.add_argument("--professores", type=int, default=500)
+    parser.add_argument("--turmas", type=int, default=300)
+    args = parser.parse_args()
+
+    sessao = requests.Session()
+    enviar(sessao, args.url, "turmas", lambda i: {"nome": f"Turma {i}", "descricao": "Gerada pelo bench"}, args.turmas)
+    enviar(sessao, args.url, "professores", lambda i: {
+        "nome": f"Professor {i}", "idade": 25 + i % 40, "email": f"professor{i}@bench.escola.com",
+        "materia": ("Matemática", "Português", "História", "Ciências")[i % 4],
+    }, args.professores)
+    enviar(sessao, args.url, "alunos", lambda i: {"nome": f"Aluno {i}", "email": f"aluno{i}@bench.escola.com"}, args.alunos)
+
+
+if __name__ == "__main__":
+    main()
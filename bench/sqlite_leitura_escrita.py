@@ -0,0 +1,105 @@
+"""Vazão de leitura do Gerenciamento enquanto há escritas em andamento.
+
+Compara os perfis de banco (DB_PROFILE) rodando o app em processo, com
+threads leitoras (GET por id e página da listagem) disputando o banco com
+threads escritoras (POST /api/alunos).
+
+    python bench/sqlite_leitura_escrita.py --alunos 20000 --segundos 10 --leitores 8 --escritores 2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "gerenciamento"))
+
+
+def criar_app(perfil, diretorio):
+    os.environ["GERENCIAMENTO_DB"] = os.path.join(diretorio, f"{perfil}.db")
+    os.environ["DB_PROFILE"] = perfil
+    from app import create_app
+    return create_app()
+
+
+def semear(app, quantidade):
+    cliente = app.test_client()
+    for inicio in range(0, quantidade, 5000):
+        lote = [{"nome": f"Aluno {i}", "email": f"aluno{i}@escola.com"}
+                for i in range(inicio, min(inicio + 5000, quantidade))]
+        cliente.post("/api/alunos/bulk", json=lote)
+
+
+def rodar(perfil, args, diretorio):
+    app = criar_app(perfil, diretorio)
+    semear(app, args.alunos)
+
+    fim = time.monotonic() + args.segundos
+    contadores = {"leituras": 0, "erros_leitura": 0, "escritas": 0, "erros_escrita": 0}
+    lock = threading.Lock()
+
+    def somar(chave):
+        with lock:
+            contadores[chave] += 1
+
+    def leitor():
+        cliente = app.test_client()
+        while time.monotonic() < fim:
+            if random.random() < 0.8:
+                resp = cliente.get(f"/api/alunos/{random.randint(1, args.alunos)}")
+            else:
+                resp = cliente.get("/api/alunos?limit=50&sort=nome")
+            somar("leituras" if resp.status_code == 200 else "erros_leitura")
+
+    def escritor(n):
+        cliente = app.test_client()
+        i = 0
+        while time.monotonic() < fim:
+            i += 1
+            resp = cliente.post("/api/alunos", json={"nome": "Novo", "email": f"novo{perfil}{n}-{i}@escola.com"})
+            somar("escritas" if resp.status_code == 201 else "erros_escrita")
+
+    threads = [threading.Thread(target=leitor) for _ in range(args.leitores)]
+    threads += [threading.Thread(target=escritor, args=(n,)) for n in range(args.escritores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        "perfil": perfil,
+        **contadores,
+        "leituras_por_s": round(contadores["leituras"] / args.segundos, 1),
+        "escritas_por_s": round(contadores["escritas"] / args.segundos, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--perfis", nargs="+", default=["development", "production"])
+    parser.add_argument("--alunos", type=int, default=20000)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--json", help="Arquivo para gravar os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for perfil in args.perfis:
+            resultado = rodar(perfil, args, diretorio)
+            resultados.append(resultado)
+            print(f"{perfil:12} leituras/s={resultado['leituras_por_s']:>9}  escritas/s={resultado['escritas_por_s']:>8}  "
+                  f"erros leitura={resultado['erros_leitura']}  erros escrita={resultado['erros_escrita']}")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Gerenciamento de mentira para testar Reservas e Atividades isoladamente.
+
+Responde ``POST /api/lookup`` e ``GET /api/<entidade>/<id>`` considerando que
+existem os IDs de 1 até ``--alunos`` / ``--professores`` / ``--turmas``, com
+latência artificial opcional. Não usa banco nem Flask, para não ser o gargalo.
+
+    python bench/stub_gerenciamento.py --porta 5901 --latencia-ms 2
+    GERENCIAMENTO_URL=http://localhost:5901 python reservas/wsgi.py
+"""
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROTA_ID = re.compile(r"^/api/(alunos|professores|turmas)/(\d+)$")
+
+
+def criar_handler(limites, latencia):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            if latencia:
+                time.sleep(latencia)
+            if self.path == "/api/health":
+                return self._responder(200, {"status": "ok", "service": "gerenciamento-stub"})
+            rota = ROTA_ID.match(self.path)
+            if not rota:
+                return self._responder(404, {"error": "Rota não encontrada"})
+            entidade, id_ = rota.group(1), int(rota.group(2))
+            if 1 <= id_ <= limites[entidade]:
+                return self._responder(200, {"id": id_, "nome": f"{entidade} {id_}"})
+            return self._responder(404, {"error": "Não encontrado"})
+
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latencia:
+                time.sleep(latencia)
+            if self.path != "/api/lookup":
+                return self._responder(404, {"error": "Rota não encontrada"})
+            resposta = {}
+            for entidade, ids in json.loads(corpo).items():
+                limite = limites.get(entidade, 0)
+                resposta[entidade] = {
+                    "found": sorted(i for i in ids if 1 <= i <= limite),
+                    "missing": sorted(i for i in ids if not 1 <= i <= limite),
+                }
+            self._responder(200, resposta)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=5901)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--alunos", type=int, default=1_000_000)
+    parser.add_argument("--professores", type=int, default=10_000)
+    parser.add_argument("--turmas", type=int, default=10_000)
+    args = parser.parse_args()
+
+    limites = {"alunos": args.alunos, "professores": args.professores, "turmas": args.turmas}
+    ThreadingHTTPServer.request_queue_size = 1024
+    servidor = ThreadingHTTPServer(("0.0.0.0", args.porta), criar_handler(limites, args.latencia_ms / 1000))
+    print(f"Stub do Gerenciamento em http://localhost:{args.porta} ({limites})")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
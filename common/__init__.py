@@ -0,0 +1 @@
+"""Código compartilhado pelos microsserviços (copiado para cada imagem Docker)."""
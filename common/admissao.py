@@ -0,0 +1,225 @@
+"""Controle de admissão: recusa rápido (429/503 com ``Retry-After``) em vez de enfileirar sem limite.
+
+Sob sobrecarga, aceitar tudo faz a latência de todas as requisições crescer
+sem parar, e no Gerenciamento as escritas esperam o lock do SQLite até falhar
+com "database is locked". Cada requisição passa, nesta ordem, por:
+
+1. **Taxa por cliente** (token bucket, ``ADMISSAO_TAXA`` por segundo e
+   ``ADMISSAO_RAJADA``): acima dela, 429. O cliente é o ``X-Client-Id`` ou o
+   IP. Desligada por padrão (0): os clientes do Gerenciamento são
+   principalmente Reservas e Atividades, e cada um seria um cliente só.
+2. **Concorrência** (``ADMISSAO_CONCORRENCIA`` em andamento por worker):
+   leituras entram até o limite; escritas só até o limite menos
+   ``ADMISSAO_RESERVA_LEITURAS``. Assim, perto da saturação, as escritas são
+   recusadas (503) primeiro e as leituras continuam sendo atendidas.
+3. **Escritas** (POST/PUT/PATCH/DELETE, exceto as rotas marcadas com
+   ``somente_leitura = True``, como o lookup em lote): no máximo ``ADMISSAO_ESCRITAS``
+   simultâneas. As demais esperam até ``ADMISSAO_ESPERA_MS``, em uma fila de
+   até ``ADMISSAO_FILA_ESCRITAS``; com a fila cheia ou a espera esgotada, 503.
+
+``/health`` e ``/metrics`` nunca passam pelo controle. ``ADMISSAO=0`` desliga tudo.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+from .metrics import REGISTRO
+
+RECUSADAS = REGISTRO.contador(
+    "admission_rejected_total", "Requisições recusadas pelo controle de admissão, por motivo.", ("service", "reason"))
+EM_ANDAMENTO = REGISTRO.gauge(
+    "admission_in_flight", "Requisições admitidas em andamento, por tipo.", ("service", "kind"))
+FILA_ESCRITAS = REGISTRO.gauge(
+    "admission_write_queue_depth", "Escritas esperando uma vaga de escrita.", ("service",))
+ESPERA_ESCRITA = REGISTRO.histograma(
+    "admission_write_wait_seconds", "Espera por uma vaga de escrita (escritas admitidas).", ("service",))
+
+METODOS_ESCRITA = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+ISENTAS = ("/health", "/api/health", "/metrics")
+
+
+def _escrita(app):
+    """A requisição atual conta como escrita: método de escrita em rota que não é ``somente_leitura``."""
+    if request.method not in METODOS_ESCRITA:
+        return False
+    view = app.view_functions.get(request.endpoint)
+    return not getattr(view, "somente_leitura", False)
+
+
+class Recusada(Exception):
+    """Requisição recusada: ``status`` (429 ou 503), motivo e ``retry_after`` em segundos."""
+
+    def __init__(self, status, motivo, mensagem, retry_after=1):
+        super().__init__(mensagem)
+        self.status = status
+        self.motivo = motivo
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class LimiteTaxa:
+    """Token bucket por cliente; os baldes ficam em um LRU de ``clientes`` entradas."""
+
+    def __init__(self, taxa, rajada=None, clientes=10000, relogio=time.monotonic):
+        self.taxa = taxa
+        self.rajada = rajada or max(1.0, taxa)
+        self.clientes = clientes
+        self._relogio = relogio
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, cliente):
+        """Gasta um token de ``cliente``; devolve 0 ou os segundos até o próximo token."""
+        agora = self._relogio()
+        with self._lock:
+            tokens, ultimo = self._baldes.pop(cliente, (self.rajada, agora))
+            tokens = min(self.rajada, tokens + (agora - ultimo) * self.taxa)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / self.taxa
+            self._baldes[cliente] = (tokens, agora)
+            if len(self._baldes) > self.clientes:
+                self._baldes.popitem(last=False)
+        return espera
+
+
+class Admissao:
+    """Limites de concorrência de um worker, com prioridade para leituras (ver o docstring do módulo)."""
+
+    def __init__(self, servico, concorrencia=64, reserva_leituras=16, escritas=8, fila_escritas=64,
+                 espera_escrita=0.5, taxa=None):
+        self.servico = servico
+        self.concorrencia = concorrencia
+        self.limite_escritas_total = max(1, concorrencia - reserva_leituras)
+        self.escritas = escritas
+        self.fila_escritas = fila_escritas
+        self.espera_escrita = espera_escrita
+        self.taxa = taxa
+        self._vagas_escrita = threading.BoundedSemaphore(escritas)
+        self._lock = threading.Lock()
+        self._em_andamento = {"leitura": 0, "escrita": 0}
+        self._esperando = 0
+
+    @classmethod
+    def do_ambiente(cls, servico, **padroes):
+        """Lê ``ADMISSAO_*`` do ambiente; ``padroes`` são os valores do serviço quando a variável falta."""
+        def valor(nome, tipo):
+            bruto = os.environ.get(f"ADMISSAO_{nome.upper()}")
+            return tipo(bruto) if bruto is not None else padroes[nome]
+
+        padroes = {"concorrencia": 64, "reserva_leituras": 16, "escritas": 8, "fila_escritas": 64,
+                   "espera_ms": 500, "taxa": 0.0, "rajada": 0.0, **padroes}
+        taxa = valor("taxa", float)
+        return cls(
+            servico,
+            concorrencia=valor("concorrencia", int),
+            reserva_leituras=valor("reserva_leituras", int),
+            escritas=valor("escritas", int),
+            fila_escritas=valor("fila_escritas", int),
+            espera_escrita=valor("espera_ms", float) / 1000,
+            taxa=LimiteTaxa(taxa, valor("rajada", float) or None) if taxa > 0 else None,
+        )
+
+    def admitir(self, cliente, escrita):
+        """Reserva uma vaga para a requisição ou levanta ``Recusada``; devolve o tipo admitido."""
+        if self.taxa is not None:
+            espera = self.taxa.consumir(cliente)
+            if espera:
+                raise Recusada(429, "rate_limit", "Muitas requisições deste cliente; aguarde", espera)
+
+        tipo = "escrita" if escrita else "leitura"
+        limite = self.limite_escritas_total if escrita else self.concorrencia
+        with self._lock:
+            if sum(self._em_andamento.values()) >= limite:
+                raise Recusada(503, "overload", "Serviço sobrecarregado; tente novamente em instantes")
+            self._em_andamento[tipo] += 1
+        EM_ANDAMENTO.set(self._em_andamento[tipo], service=self.servico, kind=tipo)
+        if not escrita or self._vagas_escrita.acquire(blocking=False):
+            return tipo
+
+        with self._lock:
+            cheia = self._esperando >= self.fila_escritas
+            if not cheia:
+                self._esperando += 1
+        if cheia:
+            self._liberar(tipo)
+            raise Recusada(503, "write_queue_full", "Fila de escritas cheia; tente novamente em instantes")
+        FILA_ESCRITAS.set(self._esperando, service=self.servico)
+        inicio = time.monotonic()
+        obtida = self._vagas_escrita.acquire(timeout=self.espera_escrita)
+        with self._lock:
+            self._esperando -= 1
+        FILA_ESCRITAS.set(self._esperando, service=self.servico)
+        if not obtida:
+            self._liberar(tipo)
+            raise Recusada(503, "write_timeout", "Escritas demais em andamento; tente novamente em instantes")
+        ESPERA_ESCRITA.observar(time.monotonic() - inicio, service=self.servico)
+        return tipo
+
+    def liberar(self, tipo):
+        if tipo == "escrita":
+            self._vagas_escrita.release()
+        self._liberar(tipo)
+
+    def _liberar(self, tipo):
+        with self._lock:
+            self._em_andamento[tipo] -= 1
+            atual = self._em_andamento[tipo]
+        EM_ANDAMENTO.set(atual, service=self.servico, kind=tipo)
+
+    def stats(self):
+        with self._lock:
+            return {**self._em_andamento, "esperando_escrita": self._esperando,
+                    "concorrencia": self.concorrencia, "escritas": self.escritas}
+
+
+def instalar_admissao(app, servico, isentas=(), erros_lock=(), **padroes):
+    """Põe o controle de admissão na frente das rotas do app.
+
+    ``isentas`` soma prefixos de caminho aos que nunca são limitados (ex.:
+    long-poll). ``erros_lock`` são exceções de "database is locked" do
+    banco do serviço: elas viram 503 com ``Retry-After`` em vez de 500.
+    """
+    if os.environ.get("ADMISSAO", "1") == "0":
+        return None
+    admissao = Admissao.do_ambiente(servico, **padroes)
+    app.extensions["admissao"] = admissao
+    prefixos = ISENTAS + tuple(isentas)
+
+    def _recusar(erro):
+        RECUSADAS.inc(service=servico, reason=erro.motivo)
+        resp = jsonify({"error": str(erro)})
+        resp.status_code = erro.status
+        resp.headers["Retry-After"] = str(erro.retry_after)
+        return resp
+
+    @app.before_request
+    def _admitir():
+        if request.path.startswith(prefixos):
+            return None
+        cliente = request.headers.get("X-Client-Id") or request.remote_addr
+        try:
+            g._admissao = admissao.admitir(cliente, _escrita(app))
+        except Recusada as erro:
+            return _recusar(erro)
+        return None
+
+    @app.teardown_request
+    def _liberar_admissao(_erro):
+        tipo = g.pop("_admissao", None)
+        if tipo is not None:
+            admissao.liberar(tipo)
+
+    def _banco_travado(erro):
+        if "locked" not in str(erro):
+            raise erro
+        return _recusar(Recusada(503, "database_locked", "Banco ocupado; tente novamente em instantes"))
+
+    for classe in erros_lock:
+        app.register_error_handler(classe, _banco_travado)
+    return admissao
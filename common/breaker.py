@@ -0,0 +1,92 @@
+import math
+import threading
+import time
+
+from .metrics import REGISTRO
+
+ESTADO = REGISTRO.gauge(
+    "circuit_breaker_state", "Estado do circuit breaker (0 fechado, 1 aberto, 2 meio aberto).", ("name",))
+REJEITADAS = REGISTRO.contador(
+    "circuit_breaker_rejected_total", "Chamadas recusadas sem tentar, com o circuito aberto.", ("name",))
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+_CODIGOS = {FECHADO: 0, ABERTO: 1, MEIO_ABERTO: 2}
+
+
+class CircuitoAberto(Exception):
+    """Chamada recusada pelo circuit breaker; ``retry_after`` em segundos (inteiro)."""
+
+    def __init__(self, nome, retry_after):
+        super().__init__(f"Circuito '{nome}' aberto")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class CircuitBreaker:
+    """Circuit breaker por falhas consecutivas, com sondagem no estado meio aberto.
+
+    Depois de ``limite_falhas`` falhas seguidas o circuito abre e as chamadas
+    falham na hora (``CircuitoAberto``) por ``tempo_aberto`` segundos. Passado
+    esse tempo, até ``sondas`` chamadas passam (meio aberto): um sucesso fecha
+    o circuito, uma falha o abre de novo.
+
+    Uso: ``permitir()`` antes da chamada e ``sucesso()``/``falha()`` depois.
+    """
+
+    def __init__(self, nome, limite_falhas=5, tempo_aberto=10.0, sondas=1, relogio=time.monotonic):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.sondas = sondas
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._sondando = 0
+        ESTADO.set(_CODIGOS[FECHADO], name=nome)
+
+    def _mudar(self, estado):
+        self._estado = estado
+        ESTADO.set(_CODIGOS[estado], name=self.nome)
+
+    def permitir(self):
+        with self._lock:
+            if self._estado == ABERTO:
+                restante = self._aberto_ate - self._relogio()
+                if restante > 0:
+                    REJEITADAS.inc(name=self.nome)
+                    raise CircuitoAberto(self.nome, restante)
+                self._mudar(MEIO_ABERTO)
+                self._sondando = 0
+            if self._estado == MEIO_ABERTO:
+                if self._sondando >= self.sondas:
+                    REJEITADAS.inc(name=self.nome)
+                    raise CircuitoAberto(self.nome, 1)
+                self._sondando += 1
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            if self._estado != FECHADO:
+                self._mudar(FECHADO)
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self._estado == MEIO_ABERTO or self._falhas >= self.limite_falhas:
+                self._aberto_ate = self._relogio() + self.tempo_aberto
+                self._mudar(ABERTO)
+
+    def stats(self):
+        with self._lock:
+            estado = self._estado
+            if estado == ABERTO and self._relogio() >= self._aberto_ate:
+                estado = MEIO_ABERTO  # a próxima chamada será uma sonda
+            return {
+                "state": estado,
+                "consecutive_failures": self._falhas,
+                "failure_threshold": self.limite_falhas,
+                "open_seconds": self.tempo_aberto,
+            }
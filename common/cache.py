@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """Cache LRU limitado, com validade (TTL) por entrada e seguro entre threads.
+
+    Ao passar de ``tamanho`` entradas, a menos usada recentemente é descartada.
+    Entradas expiradas contam como miss em ``get``. Com ``obsoleto`` > 0, uma
+    entrada expirada ainda fica disponível por esse tempo em ``consultar``
+    (stale-while-revalidate); depois disso é removida na leitura.
+    """
+
+    def __init__(self, tamanho=10000, ttl=60.0, relogio=time.monotonic, obsoleto=0.0):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self.obsoleto = obsoleto
+        self._relogio = relogio
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def consultar(self, chave):
+        """``(valor, fresco)`` da entrada, ou ``None`` se ausente ou vencida de vez."""
+        agora = self._relogio()
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[2] <= agora:
+                if item is not None:
+                    del self._dados[chave]
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            fresco = item[1] > agora
+            if fresco:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return item[0], fresco
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[1] <= self._relogio():
+                if item is not None and item[2] <= self._relogio():
+                    del self._dados[chave]
+                self.misses += 1
+                return padrao
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return item[0]
+
+    def set(self, chave, valor, ttl=None, obsoleto=None):
+        expira = self._relogio() + (self.ttl if ttl is None else ttl)
+        descarta = expira + (self.obsoleto if obsoleto is None else obsoleto)
+        with self._lock:
+            self._dados[chave] = (valor, expira, descarta)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, chave):
+        with self._lock:
+            return self._dados.pop(chave, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._dados),
+                "max_size": self.tamanho,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.stale_hits) / total, 4) if total else 0.0,
+            }
+
+
+class SingleFlight:
+    """Junta chamadas simultâneas com a mesma chave (request coalescing).
+
+    Enquanto ``funcao`` roda para uma chave, as outras chamadas com essa chave
+    esperam e recebem o mesmo resultado (ou a mesma exceção) em vez de repetir
+    o trabalho. ``executar`` devolve ``(resultado, compartilhado)``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+
+    def executar(self, chave, funcao, timeout=None):
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = self._em_andamento[chave] = Future()
+        if not lider:
+            return futuro.result(timeout), True
+
+        try:
+            resultado = funcao()
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+        futuro.set_result(resultado)
+        return resultado, False
@@ -0,0 +1,60 @@
+"""Compressão gzip/brotli das respostas, negociada pelo ``Accept-Encoding``.
+
+Só respostas acima de ``COMPRESSAO_MIN_BYTES`` (padrão 1024) e de tipos
+textuais são comprimidas; respostas em stream (SSE) passam direto. O brotli é
+usado quando o pacote ``brotli`` está instalado e o cliente o aceita.
+"""
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele, só gzip
+    brotli = None
+
+TIPOS_COMPRESSIVEIS = ("application/json", "application/x-ndjson", "text/csv", "text/html", "text/plain")
+
+NIVEL_GZIP = 6
+QUALIDADE_BROTLI = 4  # qualidades altas custam muito CPU para ganhar pouco em JSON
+
+
+def codificacoes():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def variantes_etag(etag):
+    """O ETag e suas versões comprimidas (o ETag forte muda com o ``Content-Encoding``)."""
+    return [etag] + [f"{etag}-{codificacao}" for codificacao in codificacoes()]
+
+
+def _comprimir(dados, codificacao):
+    if codificacao == "br":
+        return brotli.compress(dados, quality=QUALIDADE_BROTLI)
+    return gzip.compress(dados, compresslevel=NIVEL_GZIP)
+
+
+def instalar_compressao(app, minimo=None):
+    """Comprime as respostas do app acima de ``minimo`` bytes."""
+    minimo = int(os.environ.get("COMPRESSAO_MIN_BYTES", 1024)) if minimo is None else minimo
+
+    @app.after_request
+    def _comprimir_resposta(resposta):
+        if (resposta.status_code < 200 or resposta.status_code in (204, 304)
+                or resposta.direct_passthrough or resposta.is_streamed
+                or "Content-Encoding" in resposta.headers
+                or resposta.mimetype not in TIPOS_COMPRESSIVEIS):
+            return resposta
+
+        resposta.vary.add("Accept-Encoding")
+        codificacao = request.accept_encodings.best_match(codificacoes())
+        if codificacao is None or resposta.content_length is None or resposta.content_length < minimo:
+            return resposta
+
+        resposta.set_data(_comprimir(resposta.get_data(), codificacao))
+        resposta.headers["Content-Encoding"] = codificacao
+        etag, fraco = resposta.get_etag()
+        if etag:
+            resposta.set_etag(f"{etag}-{codificacao}", weak=fraco)
+        return resposta
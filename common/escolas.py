@@ -0,0 +1,155 @@
+"""Várias escolas em uma implantação: cada escola tem o próprio banco (shard).
+
+A escola vem do cabeçalho ``X-Escola`` (``escola_atual()`` dentro da
+requisição). Sem o cabeçalho, o serviço usa o banco de sempre: quem tem uma
+escola só não muda nada. Os shards ficam em ``ESCOLAS_DIR/<escola>.db``, são
+abertos na primeira requisição da escola e mantidos em um LRU (``Shards``) de
+no máximo ``ESCOLAS_MAX_ABERTAS`` abertos. Como cada arquivo tem o próprio
+lock de escrita do SQLite, as escritas de escolas diferentes não disputam o
+mesmo escritor.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from flask import g, has_request_context, jsonify, request
+
+from .metrics import REGISTRO
+
+CABECALHO = "X-Escola"
+# Vira nome de arquivo: só minúsculas, dígitos, "-" e "_"
+FORMATO = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
+ABERTOS = REGISTRO.gauge("tenant_shards_open", "Shards de escola abertos.", ("service",))
+ABERTURAS = REGISTRO.contador("tenant_shard_opens_total", "Shards de escola abertos (inclui reaberturas).", ("service",))
+DESCARTES = REGISTRO.contador(
+    "tenant_shard_evictions_total", "Shards fechados por passar de ESCOLAS_MAX_ABERTAS.", ("service",))
+
+
+def diretorio_escolas():
+    """``ESCOLAS_DIR``, ou None quando o serviço atende uma escola só."""
+    return os.environ.get("ESCOLAS_DIR") or None
+
+
+def caminho_shard(diretorio, escola):
+    return os.path.join(diretorio, f"{escola}.db")
+
+
+def escola_atual():
+    """Escola da requisição em andamento (None fora de requisição ou sem ``X-Escola``)."""
+    return g.get("escola") if has_request_context() else None
+
+
+def cabecalhos_escola(escola):
+    """Cabeçalhos para repassar a escola nas chamadas a outro serviço."""
+    return {CABECALHO: escola} if escola is not None else {}
+
+
+class Shards:
+    """LRU dos shards abertos, por escola.
+
+    ``abrir(escola)`` cria o shard (engine, store...) e ``fechar(shard)``
+    libera seus recursos quando ele sai do LRU. Um shard descartado enquanto
+    ainda está em uso por outra requisição continua funcionando até ela
+    terminar; só deixa de ser reaproveitado. A abertura de uma escola não
+    bloqueia as requisições das outras.
+    """
+
+    def __init__(self, abrir, fechar=None, maximo=32, servico=""):
+        self._abrir = abrir
+        self._fechar = fechar
+        self.maximo = maximo
+        self.servico = servico
+        self._abertos = OrderedDict()
+        self._abrindo = {}
+        self._lock = threading.Lock()
+
+    def obter(self, escola):
+        with self._lock:
+            shard = self._abertos.get(escola)
+            if shard is not None:
+                self._abertos.move_to_end(escola)
+                return shard
+            lock_escola = self._abrindo.setdefault(escola, threading.Lock())
+
+        with lock_escola:
+            with self._lock:
+                shard = self._abertos.get(escola)
+            if shard is None:
+                shard = self._abrir(escola)
+                ABERTURAS.inc(service=self.servico)
+                with self._lock:
+                    self._abertos[escola] = shard
+                    self._abrindo.pop(escola, None)
+                    descartados = []
+                    while len(self._abertos) > self.maximo:
+                        descartados.append(self._abertos.popitem(last=False)[1])
+                    ABERTOS.set(len(self._abertos), service=self.servico)
+                for antigo in descartados:
+                    DESCARTES.inc(service=self.servico)
+                    if self._fechar is not None:
+                        self._fechar(antigo)
+        return shard
+
+    def fechar_todos(self):
+        with self._lock:
+            abertos = list(self._abertos.values())
+            self._abertos.clear()
+            ABERTOS.set(0, service=self.servico)
+        if self._fechar is not None:
+            for shard in abertos:
+                self._fechar(shard)
+
+    def stats(self):
+        with self._lock:
+            return {"open": len(self._abertos), "max_open": self.maximo, "schools": list(self._abertos)}
+
+
+def abrir_stores(classe, servico):
+    """``Shards`` de ``classe`` (um ``SQLiteStore``) em ``ESCOLAS_DIR``, ou None sem a variável."""
+    diretorio = diretorio_escolas()
+    if diretorio is None:
+        return None
+    return Shards(lambda escola: classe(caminho_shard(diretorio, escola)), lambda store: store.fechar(),
+                  maximo=int(os.environ.get("ESCOLAS_MAX_ABERTAS", 32)), servico=servico)
+
+
+def store_atual(app, nome):
+    """Store da escola da requisição, ou ``app.extensions[nome]`` (o banco do serviço) sem ``X-Escola``."""
+    escola = escola_atual()
+    if escola is None:
+        return app.extensions[nome]
+    return app.extensions["escolas"].obter(escola)
+
+
+def instalar_escolas(app, shards):
+    """Lê ``X-Escola`` de cada requisição para ``g.escola``.
+
+    ``shards`` é o ``Shards`` do serviço, ou None quando ``ESCOLAS_DIR`` não
+    está definido: aí o cabeçalho é recusado com 400, para que dados de uma
+    escola não caiam no banco único por engano de configuração. Com shards,
+    as respostas levam ``Vary: X-Escola`` para caches compartilhados.
+    """
+    app.extensions["escolas"] = shards
+
+    @app.before_request
+    def _escola_da_requisicao():
+        escola = request.headers.get(CABECALHO)
+        g.escola = None
+        if not escola:
+            return None
+        if shards is None:
+            return jsonify({"error": f"Este serviço atende uma escola só (ESCOLAS_DIR não definido); "
+                                     f"remova o cabeçalho {CABECALHO}"}), 400
+        if not FORMATO.fullmatch(escola):
+            return jsonify({"error": f"{CABECALHO} inválido: use até 64 letras minúsculas, dígitos, '-' ou '_'"}), 400
+        g.escola = escola
+        return None
+
+    if shards is not None:
+        @app.after_request
+        def _variar_por_escola(resposta):
+            # A mesma URL traz dados de outra escola conforme o cabeçalho
+            resposta.vary.add(CABECALHO)
+            return resposta
@@ -0,0 +1,335 @@
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .breaker import CircuitBreaker, CircuitoAberto
+from .cache import TTLCache
+from .escolas import cabecalhos_escola
+from .metrics import REGISTRO
+
+log = logging.getLogger(__name__)
+
+LATENCIA_UPSTREAM = REGISTRO.histograma(
+    "upstream_request_duration_seconds", "Duração das chamadas ao Gerenciamento.", ("upstream", "method", "endpoint"))
+ERROS_UPSTREAM = REGISTRO.contador(
+    "upstream_errors_total", "Chamadas ao Gerenciamento que falharam (rede, timeout ou 5xx).",
+    ("upstream", "method", "endpoint", "reason"))
+
+GERENCIAMENTO_URL_PADRAO = "http://gerenciamento:5001"
+MAX_IDS_LOOKUP = 50000  # limite do POST /api/lookup por chamada
+
+
+class GerenciamentoIndisponivel(Exception):
+    """O Gerenciamento não respondeu (timeout, erro de rede ou 5xx)."""
+
+
+class GerenciamentoSuspenso(GerenciamentoIndisponivel):
+    """Circuit breaker aberto: a chamada nem foi feita. ``retry_after`` em segundos."""
+
+    def __init__(self, retry_after):
+        super().__init__("Gerenciamento indisponível (circuit breaker aberto)")
+        self.retry_after = retry_after
+
+
+class GerenciamentoSobrecarregado(GerenciamentoIndisponivel):
+    """O Gerenciamento recusou a chamada por sobrecarga (429/503 com ``Retry-After``).
+
+    Não é repetida nem conta como falha no circuit breaker: o serviço está
+    de pé e pediu para esperar ``retry_after`` segundos.
+    """
+
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class GerenciamentoConsultaInvalida(Exception):
+    """O Gerenciamento recusou a consulta como inválida (4xx): erro de quem chamou, não indisponibilidade."""
+
+
+class _RetrySemRecusa(Retry):
+    """``Retry`` que não repete respostas com ``Retry-After`` (recusa do controle de admissão)."""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if has_retry_after and status_code in (429, 503):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class GerenciamentoClient:
+    """Cliente HTTP do Gerenciamento com pool de conexões keep-alive.
+
+    Todas as chamadas têm timeout e são repetidas algumas vezes em caso de
+    falha de conexão ou 502/503/504; um 429/503 com ``Retry-After`` (recusa
+    por sobrecarga) não é repetido e vira ``GerenciamentoSobrecarregado``. Configuração por variáveis de ambiente:
+    ``GERENCIAMENTO_URL``, ``GERENCIAMENTO_TIMEOUT``, ``GERENCIAMENTO_CONNECT_TIMEOUT``,
+    ``GERENCIAMENTO_RETRIES`` e ``GERENCIAMENTO_POOL``.
+
+    O resultado de ``existem``/``detalhes`` fica em um cache LRU local: IDs encontrados por
+    ``GERENCIAMENTO_CACHE_TTL`` segundos e IDs ausentes por
+    ``GERENCIAMENTO_CACHE_TTL_NEGATIVO`` (mais curto, para que um cadastro novo
+    seja visto logo). ``GERENCIAMENTO_CACHE_TAMANHO=0`` desliga o cache.
+    Um ID encontrado continua sendo aceito por mais ``GERENCIAMENTO_CACHE_STALE``
+    segundos depois de expirar, enquanto é revalidado em segundo plano.
+    A capacidade da turma devolvida por ``detalhes`` vale só por
+    ``GERENCIAMENTO_CACHE_TTL_CAPACIDADE`` segundos, sem período obsoleto.
+
+    As chamadas passam por um circuit breaker: após
+    ``GERENCIAMENTO_BREAKER_FALHAS`` falhas seguidas, elas falham na hora com
+    ``GerenciamentoSuspenso`` por ``GERENCIAMENTO_BREAKER_ABERTO`` segundos,
+    até uma chamada de sondagem dar certo.
+
+    Os métodos de consulta aceitam ``escola``: a chamada leva o cabeçalho
+    ``X-Escola`` e o cache separa os IDs por escola.
+    """
+
+    def __init__(self, base_url=None, timeout=None, connect_timeout=None, tentativas=None, pool=None,
+                 cache=None, ttl_negativo=None, breaker=None):
+        base_url = (base_url or os.environ.get("GERENCIAMENTO_URL", GERENCIAMENTO_URL_PADRAO)).rstrip("/")
+        # O docker-compose informa a URL sem o prefixo /api
+        if not base_url.endswith("/api"):
+            base_url += "/api"
+        self.base_url = base_url
+
+        self.timeout = (
+            float(connect_timeout or os.environ.get("GERENCIAMENTO_CONNECT_TIMEOUT", 1.0)),
+            float(timeout or os.environ.get("GERENCIAMENTO_TIMEOUT", 3.0)),
+        )
+        tentativas = int(tentativas if tentativas is not None else os.environ.get("GERENCIAMENTO_RETRIES", 2))
+        pool = int(pool or os.environ.get("GERENCIAMENTO_POOL", 20))
+
+        retry = _RetrySemRecusa(
+            total=tentativas,
+            backoff_factor=0.05,
+            status_forcelist=(502, 503, 504),
+            # O lookup é somente leitura, então também pode ser repetido
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool, thread_name_prefix="gerenciamento")
+
+        if cache is None:
+            tamanho = int(os.environ.get("GERENCIAMENTO_CACHE_TAMANHO", 10000))
+            ttl = float(os.environ.get("GERENCIAMENTO_CACHE_TTL", 60.0))
+            obsoleto = float(os.environ.get("GERENCIAMENTO_CACHE_STALE", 300.0))
+            cache = TTLCache(tamanho=tamanho, ttl=ttl, obsoleto=obsoleto) if tamanho > 0 else None
+        self.cache = cache
+        # Só marca quando a capacidade de cada turma foi confirmada; o valor fica em ``cache``
+        self.cache_capacidade = None
+        if cache is not None:
+            ttl_capacidade = float(os.environ.get("GERENCIAMENTO_CACHE_TTL_CAPACIDADE", 1.5))
+            self.cache_capacidade = TTLCache(tamanho=cache.tamanho, ttl=ttl_capacidade, obsoleto=0)
+        self.ttl_negativo = float(ttl_negativo or os.environ.get("GERENCIAMENTO_CACHE_TTL_NEGATIVO", 5.0))
+        self._revalidando = set()
+        self._lock_revalidacao = threading.Lock()
+
+        self.breaker = breaker or CircuitBreaker(
+            "gerenciamento",
+            limite_falhas=int(os.environ.get("GERENCIAMENTO_BREAKER_FALHAS", 5)),
+            tempo_aberto=float(os.environ.get("GERENCIAMENTO_BREAKER_ABERTO", 10.0)),
+        )
+
+    def _request(self, metodo, caminho, escola=None, **kwargs):
+        try:
+            self.breaker.permitir()
+        except CircuitoAberto as erro:
+            raise GerenciamentoSuspenso(erro.retry_after) from erro
+        try:
+            resp = self._enviar(metodo, caminho, headers=cabecalhos_escola(escola), **kwargs)
+        except GerenciamentoSobrecarregado:
+            # Respondeu, só pediu para esperar: libera a sonda do breaker sem contar falha
+            self.breaker.sucesso()
+            raise
+        except GerenciamentoIndisponivel:
+            self.breaker.falha()
+            raise
+        self.breaker.sucesso()
+        return resp
+
+    def _enviar(self, metodo, caminho, **kwargs):
+        rotulos = {"upstream": "gerenciamento", "method": metodo, "endpoint": re.sub(r"/\d+", "/{id}", caminho)}
+        inicio = time.perf_counter()
+        try:
+            resp = self.session.request(metodo, f"{self.base_url}{caminho}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as erro:
+            ERROS_UPSTREAM.inc(reason=type(erro).__name__, **rotulos)
+            raise GerenciamentoIndisponivel(str(erro)) from erro
+        finally:
+            LATENCIA_UPSTREAM.observar(time.perf_counter() - inicio, **rotulos)
+        retry_after = resp.headers.get("Retry-After")
+        if resp.status_code in (429, 503) and retry_after is not None:
+            ERROS_UPSTREAM.inc(reason="overloaded", **rotulos)
+            try:
+                espera = max(1, int(retry_after))
+            except ValueError:
+                espera = 1
+            raise GerenciamentoSobrecarregado(f"{metodo} {caminho}: HTTP {resp.status_code}", espera)
+        if resp.status_code >= 500:
+            ERROS_UPSTREAM.inc(reason=f"http_{resp.status_code}", **rotulos)
+            raise GerenciamentoIndisponivel(f"{metodo} {caminho}: HTTP {resp.status_code}")
+        return resp
+
+    def existem(self, escola=None, **ids):
+        """Retorna, para cada entidade pedida, o conjunto de IDs que existem.
+
+        Exemplo: ``existem(alunos=[1], turmas=[2])`` -> ``{"alunos": {1}, "turmas": set()}``.
+        """
+        encontrados = self._detalhes(escola, ids, capacidade=False)
+        return {entidade: set(atributos) for entidade, atributos in encontrados.items()}
+
+    def detalhes(self, escola=None, **ids):
+        """Como ``existem``, mas com os atributos devolvidos pelo lookup de cada ID encontrado.
+
+        Exemplo: ``detalhes(alunos=[1], turmas=[2])`` ->
+        ``{"alunos": {1: {}}, "turmas": {2: {"capacidade": 30}}}``.
+        IDs que não estão no cache são consultados em uma única chamada ao
+        ``POST /api/lookup``; se o Gerenciamento ainda não tiver o endpoint, cai
+        para os GETs por id, feitos em paralelo. IDs com resultado obsoleto no
+        cache são aceitos na hora e revalidados em segundo plano. Uma turma cuja
+        capacidade passou de ``GERENCIAMENTO_CACHE_TTL_CAPACIDADE`` é consultada de novo.
+        """
+        return self._detalhes(escola, ids, capacidade=True)
+
+    def _detalhes(self, escola, ids, capacidade):
+        encontrados = {entidade: {} for entidade in ids}
+        pendentes, obsoletos = {}, {}
+        for entidade, lista in ids.items():
+            for i in set(lista):
+                item = self.cache.consultar((escola, entidade, i)) if self.cache is not None else None
+                if item is None or (capacidade and not self._capacidade_fresca(escola, entidade, i, item[0])):
+                    pendentes.setdefault(entidade, []).append(i)
+                    continue
+                atributos, fresco = item
+                if atributos is not False:
+                    encontrados[entidade][i] = atributos
+                if not fresco:
+                    obsoletos.setdefault(entidade, []).append(i)
+        if not pendentes:
+            if obsoletos:
+                self._revalidar_em_segundo_plano(obsoletos, escola)
+            return encontrados
+
+        # Já que haverá uma chamada, os obsoletos são revalidados nela mesma
+        pedidos = {entidade: sorted(pendentes.get(entidade, []) + obsoletos.get(entidade, []))
+                   for entidade in {*pendentes, *obsoletos}}
+        consultados = self._consultar(pedidos, escola)
+        self._guardar(pedidos, consultados, escola)
+        for entidade, lista in pedidos.items():
+            for i in lista:
+                encontrados[entidade].pop(i, None)
+            encontrados[entidade].update(consultados[entidade])
+        return encontrados
+
+    def _capacidade_fresca(self, escola, entidade, i, atributos):
+        # Só turmas encontradas têm capacidade; ela não é servida obsoleta
+        if entidade != "turmas" or atributos is False:
+            return True
+        return self.cache_capacidade.get((escola, entidade, i)) is not None
+
+    def _guardar(self, pedidos, consultados, escola=None):
+        if self.cache is None:
+            return
+        for entidade, lista in pedidos.items():
+            for i in lista:
+                if i in consultados[entidade]:
+                    self.cache.set((escola, entidade, i), consultados[entidade][i])
+                    if entidade == "turmas":
+                        self.cache_capacidade.set((escola, entidade, i), True)
+                else:
+                    # Ausência não é servida obsoleta: um cadastro novo deve valer logo
+                    self.cache.set((escola, entidade, i), False, self.ttl_negativo, obsoleto=0)
+
+    def _revalidar_em_segundo_plano(self, obsoletos, escola=None):
+        with self._lock_revalidacao:
+            pedidos = {}
+            for entidade, lista in obsoletos.items():
+                novos = [i for i in lista if (escola, entidade, i) not in self._revalidando]
+                if novos:
+                    pedidos[entidade] = novos
+                    self._revalidando.update((escola, entidade, i) for i in novos)
+        if pedidos:
+            self._executor.submit(self._revalidar, pedidos, escola)
+
+    def _revalidar(self, pedidos, escola=None):
+        try:
+            self._guardar(pedidos, self._consultar(pedidos, escola), escola)
+        except (GerenciamentoSuspenso, GerenciamentoSobrecarregado):
+            pass  # circuito aberto ou sobrecarga: o valor obsoleto continua valendo até vencer de vez
+        except (GerenciamentoIndisponivel, GerenciamentoConsultaInvalida) as erro:
+            log.warning("Revalidação no Gerenciamento falhou: %s", erro)
+        finally:
+            with self._lock_revalidacao:
+                self._revalidando.difference_update((escola, e, i) for e, lista in pedidos.items() for i in lista)
+
+    def ausentes(self, entidade, ids, escola=None):
+        """IDs de ``ids`` que não existem no Gerenciamento, consultados sem passar pelo cache."""
+        faltando = set()
+        for inicio in range(0, len(ids), MAX_IDS_LOOKUP):
+            lote = list(ids[inicio:inicio + MAX_IDS_LOOKUP])
+            encontrados = self._consultar({entidade: lote}, escola)[entidade]
+            faltando.update(i for i in lote if i not in encontrados)
+        return faltando
+
+    def digest(self, entidade, inicio, fim, baldes, escola=None):
+        """Resumo (total e hash) dos IDs existentes de ``entidade`` em ``baldes`` faixas de ``[inicio, fim)``."""
+        resp = self._request("GET", f"/{entidade}/digest", escola,
+                             params={"inicio": inicio, "fim": fim, "baldes": baldes})
+        if resp.status_code != 200:
+            raise GerenciamentoIndisponivel(f"GET /{entidade}/digest: HTTP {resp.status_code}")
+        return resp.json()["baldes"]
+
+    def invalidar(self, entidade=None, id=None, escola=None):
+        """Remove um ID do cache, ou tudo quando chamado sem argumentos."""
+        if self.cache is None:
+            return
+        if entidade is None:
+            self.cache.clear()
+            self.cache_capacidade.clear()
+        else:
+            self.cache.invalidate((escola, entidade, id))
+            self.cache_capacidade.invalidate((escola, entidade, id))
+
+    def _consultar(self, pedidos, escola=None):
+        resp = self._request("POST", "/lookup", escola, json=pedidos)
+        if resp.status_code in (404, 405):
+            return self._existem_por_id(pedidos, escola)
+        if 400 <= resp.status_code < 500:
+            try:
+                motivo = resp.json().get("error")
+            except ValueError:
+                motivo = None
+            raise GerenciamentoConsultaInvalida(motivo or f"POST /lookup: HTTP {resp.status_code}")
+        if resp.status_code != 200:
+            raise GerenciamentoIndisponivel(f"POST /lookup: HTTP {resp.status_code}")
+        corpo = resp.json()
+        encontrados = {}
+        for entidade in pedidos:
+            capacidades = corpo[entidade].get("capacidade")
+            encontrados[entidade] = {
+                i: {"capacidade": capacidades.get(str(i))} if capacidades is not None else {}
+                for i in corpo[entidade]["found"]
+            }
+        return encontrados
+
+    def _existem_por_id(self, pedidos, escola=None):
+        chamadas = [(entidade, i) for entidade, lista in pedidos.items() for i in lista]
+        futuros = [self._executor.submit(self._request, "GET", f"/{entidade}/{i}", escola)
+                   for entidade, i in chamadas]
+        encontrados = {entidade: {} for entidade in pedidos}
+        for (entidade, i), futuro in zip(chamadas, futuros):
+            resp = futuro.result()
+            if resp.status_code == 200:
+                corpo = resp.json()
+                encontrados[entidade][i] = {"capacidade": corpo.get("capacidade")} if entidade == "turmas" else {}
+        return encontrados
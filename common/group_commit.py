@@ -0,0 +1,163 @@
+"""Escrita em lote (group commit) com fila limitada e um gravador em segundo plano.
+
+As requisições enfileiram o que precisa ser gravado e recebem um ``Future``;
+uma thread junta os itens e chama ``gravar(itens)`` uma vez por lote, ao
+atingir ``max_lote`` itens ou ``intervalo`` segundos depois do primeiro item
+do lote — o que vier antes. Um commit para centenas de inserções em vez de um
+por requisição.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .metrics import REGISTRO
+
+log = logging.getLogger(__name__)
+
+TAMANHO_LOTE = REGISTRO.histograma(
+    "group_commit_batch_size", "Itens gravados por commit.", ("name",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+DURACAO_LOTE = REGISTRO.histograma(
+    "group_commit_flush_duration_seconds", "Duração da gravação de um lote.", ("name",))
+PROFUNDIDADE = REGISTRO.gauge(
+    "group_commit_queue_depth", "Itens aguardando o próximo commit.", ("name",))
+RECUSADOS = REGISTRO.contador(
+    "group_commit_rejected_total", "Itens recusados com a fila cheia.", ("name",))
+
+
+class FilaCheia(Exception):
+    """A fila de escrita está no limite; ``retry_after`` em segundos."""
+
+    def __init__(self, nome, retry_after=1):
+        super().__init__(f"Fila de escrita '{nome}' cheia")
+        self.retry_after = retry_after
+
+
+class GroupCommit:
+    """Fila de escrita com commit em grupo.
+
+    ``gravar(itens)`` recebe a lista do lote e devolve, na mesma ordem, o
+    resultado de cada item — ou a exceção daquele item, que é repassada só
+    ao seu ``Future``. Se ``gravar`` levantar, o lote inteiro falha.
+
+    ``enviar(item)`` levanta ``FilaCheia`` quando há ``capacidade`` itens
+    esperando (contrapressão em vez de memória sem limite). A thread é
+    criada no primeiro envio, então o objeto pode ser criado antes do fork
+    dos workers do Gunicorn. Na saída do processo a fila é esvaziada.
+    """
+
+    def __init__(self, gravar, nome, max_lote=200, intervalo=0.001, capacidade=10000):
+        self.gravar = gravar
+        self.nome = nome
+        self.max_lote = max_lote
+        self.intervalo = intervalo
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._fechado = False
+        self._lotes = 0
+        self._itens = 0
+
+    def enviar(self, item, chave=None):
+        """Enfileira ``item`` e devolve o ``Future`` do seu resultado.
+
+        ``chave`` (opcional) permite consultar com ``pendente()`` se o item
+        ainda está na fila.
+        """
+        if self._fechado:
+            raise FilaCheia(self.nome)
+        self._iniciar()
+        futuro = Future()
+        if chave is not None:
+            with self._lock:
+                self._pendentes[chave] = futuro
+        try:
+            self._fila.put_nowait((item, chave, futuro))
+        except queue.Full:
+            with self._lock:
+                self._pendentes.pop(chave, None)
+            RECUSADOS.inc(name=self.nome)
+            raise FilaCheia(self.nome)
+        PROFUNDIDADE.inc(name=self.nome)
+        return futuro
+
+    def pendente(self, chave):
+        with self._lock:
+            return chave in self._pendentes
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name=f"group-commit-{self.nome}", daemon=True)
+                self._thread.start()
+                atexit.register(self.fechar)
+
+    def _executar(self):
+        while True:
+            primeiro = self._fila.get()
+            if primeiro is None:
+                return
+            lote = [primeiro]
+            limite = time.monotonic() + self.intervalo
+            fim = False
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    entrada = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if entrada is None:
+                    fim = True
+                    break
+                lote.append(entrada)
+            self._gravar_lote(lote)
+            if fim:
+                return
+
+    def _gravar_lote(self, lote):
+        PROFUNDIDADE.dec(len(lote), name=self.nome)
+        inicio = time.perf_counter()
+        try:
+            resultados = self.gravar([item for item, _, _ in lote])
+        except Exception as erro:
+            log.exception("Falha ao gravar lote de %d itens em '%s'", len(lote), self.nome)
+            resultados = [erro] * len(lote)
+        DURACAO_LOTE.observar(time.perf_counter() - inicio, name=self.nome)
+        TAMANHO_LOTE.observar(len(lote), name=self.nome)
+
+        with self._lock:
+            self._lotes += 1
+            self._itens += len(lote)
+            for _, chave, _ in lote:
+                self._pendentes.pop(chave, None)
+        for (_, _, futuro), resultado in zip(lote, resultados):
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+
+    def fechar(self, timeout=10.0):
+        """Para de aceitar itens e espera a gravação do que já está na fila."""
+        self._fechado = True
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._fila.put(None)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._fila.qsize(),
+                "capacity": self._fila.maxsize,
+                "max_batch": self.max_lote,
+                "interval_ms": self.intervalo * 1000,
+                "batches": self._lotes,
+                "items": self._itens,
+                "avg_batch": round(self._itens / self._lotes, 1) if self._lotes else 0.0,
+            }
@@ -0,0 +1,31 @@
+"""Configuração do Gunicorn dos três serviços em produção.
+
+Reservas e Atividades usam workers gevent (padrão): cada requisição roda em
+uma greenlet e, com a biblioteca padrão "monkey-patched" pelo worker, as
+chamadas ao Gerenciamento (requests / urllib3) não bloqueiam o processo
+enquanto esperam a rede. Um worker mantém milhares de validações em
+andamento; vários workers usam todos os núcleos.
+
+O Gerenciamento usa ``WEB_WORKER_CLASS=gthread``: o SQLAlchemy e o
+``sqlite3`` bloqueiam, então cada requisição (inclusive o long-poll e o SSE
+de ``/api/changes``) ocupa uma das ``WEB_THREADS`` threads do worker.
+
+    gunicorn -c common/gunicorn_conf.py wsgi:app
+
+Variáveis de ambiente: ``PORT``, ``WEB_WORKERS`` (padrão: nº de CPUs),
+``WEB_WORKER_CLASS`` (``gevent`` ou ``gthread``), ``WEB_WORKER_CONNECTIONS``
+(greenlets simultâneas por worker gevent), ``WEB_THREADS`` (threads por
+worker gthread) e ``WEB_TIMEOUT``.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count()))
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gevent")
+worker_connections = int(os.environ.get("WEB_WORKER_CONNECTIONS", 2000))
+threads = int(os.environ.get("WEB_THREADS", 64))
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+graceful_timeout = 20
+keepalive = 5
+accesslog = "-"
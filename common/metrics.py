@@ -0,0 +1,178 @@
+"""Métricas no formato texto do Prometheus, sem dependências externas.
+
+Cada processo tem seu próprio ``REGISTRO``; com vários workers do Gunicorn,
+cada scrape de ``/metrics`` mostra os números do worker que atendeu.
+"""
+import threading
+import time
+
+from flask import Response, g, request
+
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes, valores, extra=()):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    pares += [f'{n}="{_escapar(v)}"' for n, v in extra]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        return tuple(rotulos.get(n, "") for n in self.rotulos)
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._lock:
+            itens = list(self._valores.items())
+        for chave, valor in sorted(itens):
+            linhas.extend(self._linhas(chave, valor))
+        return linhas
+
+    def _linhas(self, chave, valor):
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {valor}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def dec(self, valor=1, **rotulos):
+        self.inc(-valor, **rotulos)
+
+    def set(self, valor, **rotulos):
+        with self._lock:
+            self._valores[self._chave(rotulos)] = valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            atual = self._valores.get(chave)
+            if atual is None:
+                atual = self._valores[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    atual[0][i] += 1
+                    break
+            atual[1] += valor
+            atual[2] += 1
+
+    def _linhas(self, chave, valor):
+        por_bucket, soma, total = valor
+        linhas, acumulado = [], 0
+        for limite, n in zip(self.buckets, por_bucket):
+            acumulado += n
+            linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, [('le', limite)])} {acumulado}")
+        linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, [('le', '+Inf')])} {total}")
+        linhas.append(f"{self.nome}_sum{_formatar_rotulos(self.rotulos, chave)} {soma}")
+        linhas.append(f"{self.nome}_count{_formatar_rotulos(self.rotulos, chave)} {total}")
+        return linhas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, classe, nome, *args, **kwargs):
+        with self._lock:
+            if nome not in self._metricas:
+                self._metricas[nome] = classe(nome, *args, **kwargs)
+            return self._metricas[nome]
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador, nome, ajuda, rotulos)
+
+    def gauge(self, nome, ajuda, rotulos=()):
+        return self._registrar(Gauge, nome, ajuda, rotulos)
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma, nome, ajuda, rotulos, buckets)
+
+    def exportar(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = Registro()
+
+REQUISICOES = REGISTRO.contador(
+    "http_requests_total", "Requisições HTTP atendidas.", ("service", "method", "route", "status"))
+LATENCIA = REGISTRO.histograma(
+    "http_request_duration_seconds", "Duração das requisições HTTP.", ("service", "method", "route"))
+EM_ANDAMENTO = REGISTRO.gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento.", ("service", "method", "route"))
+
+
+def rota_atual():
+    """Padrão da rota (ex.: ``/api/alunos/<int:aluno_id>``), para não explodir a cardinalidade."""
+    regra = request.url_rule
+    return regra.rule if regra is not None else "<sem rota>"
+
+
+def instrumentar(app, servico):
+    """Mede todas as rotas do app e expõe ``GET /metrics``."""
+
+    @app.before_request
+    def _inicio_metricas():
+        g._metricas_inicio = time.perf_counter()
+        g._metricas_rotulos = {"service": servico, "method": request.method, "route": rota_atual()}
+        EM_ANDAMENTO.inc(**g._metricas_rotulos)
+
+    @app.after_request
+    def _fim_metricas(resposta):
+        inicio = g.pop("_metricas_inicio", None)
+        if inicio is not None:
+            rotulos = g._metricas_rotulos
+            LATENCIA.observar(time.perf_counter() - inicio, **rotulos)
+            REQUISICOES.inc(status=resposta.status_code, **rotulos)
+        return resposta
+
+    @app.teardown_request
+    def _liberar_metricas(_erro):
+        rotulos = g.pop("_metricas_rotulos", None)
+        if rotulos is not None:
+            EM_ANDAMENTO.dec(**rotulos)
+
+    def metrics():
+        return Response(REGISTRO.exportar(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
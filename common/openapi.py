@@ -0,0 +1,79 @@
+"""Documentação OpenAPI dos serviços, gerada pelo Flasgger ou pré-construída.
+
+Modo padrão: o Flasgger monta o spec a partir dos ``swag_from``/docstrings e
+serve a UI em ``/apidocs``. Com ``FAST_STARTUP=1`` (produção) o Flasgger nem
+é importado: ``/apispec_1.json`` é servido do arquivo gerado no build
+(``OPENAPI_SPEC``, padrão ``openapi.json`` na pasta do serviço) e a UI fica
+desligada.
+
+Passo de build, na pasta do serviço:
+
+    PYTHONPATH=.. python -m common.openapi openapi.json
+"""
+import os
+import sys
+
+from flask import Response
+
+ROTA_SPEC = "/apispec_1.json"
+
+
+def inicio_rapido():
+    return os.environ.get("FAST_STARTUP", "0").lower() in ("1", "true", "yes")
+
+
+def swag_from(specs):
+    """``flasgger.utils.swag_from`` no modo padrão; no início rápido não faz nada."""
+    if inicio_rapido():
+        return lambda view: view
+    from flasgger.utils import swag_from as flasgger_swag_from
+    return flasgger_swag_from(specs)
+
+
+def configurar_docs(app, titulo):
+    """Swagger completo ou spec pré-construído, conforme ``FAST_STARTUP``."""
+    if not inicio_rapido():
+        from flasgger import Swagger
+        app.config["SWAGGER"] = {"title": titulo, "uiversion": 3}
+        Swagger(app)
+        return
+
+    caminho = os.environ.get("OPENAPI_SPEC", os.path.join(app.root_path, "..", "openapi.json"))
+    try:
+        with open(caminho, "rb") as arquivo:
+            spec = arquivo.read()
+    except OSError:
+        app.logger.warning("FAST_STARTUP sem spec pré-construído (%s); %s não será servido", caminho, ROTA_SPEC)
+        return
+
+    def apispec():
+        return Response(spec, mimetype="application/json")
+
+    app.add_url_rule(ROTA_SPEC, "apispec_1", apispec, methods=["GET"])
+
+
+def gerar_spec(app):
+    """Monta o spec com o Flasgger (como o app em modo padrão serviria)."""
+    resp = app.test_client().get(ROTA_SPEC)
+    if resp.status_code != 200:
+        raise RuntimeError(f"Falha ao gerar o spec: HTTP {resp.status_code}")
+    return resp.get_data()
+
+
+def main(argv):
+    if len(argv) != 1:
+        print("uso: python -m common.openapi <arquivo de saída>", file=sys.stderr)
+        return 2
+    os.environ["FAST_STARTUP"] = "0"
+    sys.path.insert(0, os.getcwd())
+    from app import create_app
+
+    spec = gerar_spec(create_app())
+    with open(argv[0], "wb") as arquivo:
+        arquivo.write(spec)
+    print(f"spec gravado em {argv[0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
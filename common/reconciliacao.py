@@ -0,0 +1,413 @@
+"""Reconciliação de referências órfãs (ids removidos no Gerenciamento) por árvore de hashes.
+
+Reservas e Atividades guardam ids de alunos, professores e turmas. Quando um
+deles é removido no Gerenciamento, as linhas que o referenciam ficam órfãs.
+Em vez de comparar as tabelas inteiras, os dois lados resumem faixas de ids
+em baldes (quantidade e soma de um hash por id) e só descem nas faixas cujo
+resumo mudou desde a última verificação:
+
+- o Gerenciamento resume os ids existentes (``GET /api/<entidade>/digest``);
+- o serviço resume os ids distintos que ele referencia, na mesma faixa;
+- uma faixa cujos dois resumos são os mesmos da última verificação limpa é
+  pulada (nada foi removido lá e nada novo foi referenciado);
+- uma faixa que mudou e tem poucas referências (``limite_lookup``) é
+  conferida com um ``POST /api/lookup`` só desses ids, sem cache; as
+  maiores são divididas de novo em ``baldes`` partes.
+
+Nenhum id é declarado órfão sem passar pelo lookup, nem numa faixa em que o
+Gerenciamento não tem id nenhum: o resumo é só o filtro de onde procurar.
+
+Os resumos verificados ficam em ``reconciliacao_no`` e os órfãos encontrados
+em ``referencia_orfa`` (ação ``marcar``) ou são apagados (ação ``remover``).
+Rodando todas as noites, só as faixas com remoções no dia trafegam ids.
+
+    cd reservas && PYTHONPATH=.. python -m common.reconciliacao
+    cd reservas && PYTHONPATH=.. python -m common.reconciliacao --todas-escolas
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import jsonify, request
+
+from .escolas import diretorio_escolas, escola_atual
+
+# Hash multiplicativo (Knuth) de 32 bits: a soma por faixa não depende da
+# ordem e, junto com a quantidade, muda com qualquer inclusão ou remoção.
+MULTIPLICADOR = 2654435761
+MODULO = 2 ** 32
+
+# Ids do SQLite cabem nessa faixa na prática; a raiz da árvore é fixa para que
+# as faixas (e os resumos guardados) sejam sempre as mesmas entre execuções.
+RAIZ = (0, 2 ** 31)
+BALDES = 16
+LIMITE_LOOKUP = 500
+ACOES = ("marcar", "remover")
+_LOCK_ESCOLAS = threading.Lock()
+
+
+def hash_id(valor):
+    return (valor * MULTIPLICADOR) % MODULO
+
+
+def sql_resumo(tabela, coluna, distinto=False):
+    """SELECT de (balde, total, hash) dos valores de ``coluna`` em ``[:inicio, :fim)``.
+
+    ``distinto`` resume cada valor uma vez (referências repetidas contam como uma).
+    """
+    origem = f"(SELECT DISTINCT {coluna} AS v FROM {tabela} WHERE {coluna} >= :inicio AND {coluna} < :fim)" \
+        if distinto else f"(SELECT {coluna} AS v FROM {tabela} WHERE {coluna} >= :inicio AND {coluna} < :fim)"
+    return (
+        f"SELECT (v - :inicio) / :largura AS balde, COUNT(*) AS total, "
+        f"COALESCE(SUM((v * {MULTIPLICADOR}) % {MODULO}), 0) AS hash "
+        f"FROM {origem} GROUP BY balde"
+    )
+
+
+def dividir(inicio, fim, baldes):
+    """Largura dos baldes e a lista de faixas ``(inicio, fim)`` que cobrem ``[inicio, fim)``."""
+    largura = max(1, -(-(fim - inicio) // baldes))
+    return largura, [(a, min(a + largura, fim)) for a in range(inicio, fim, largura)]
+
+
+def montar_baldes(inicio, fim, baldes, linhas):
+    """Lista completa de baldes (inclusive os vazios) a partir das linhas de ``sql_resumo``."""
+    _, faixas = dividir(inicio, fim, baldes)
+    por_balde = {linha["balde"]: linha for linha in linhas}
+    return [
+        {"inicio": a, "fim": b,
+         "total": por_balde[i]["total"] if i in por_balde else 0,
+         "hash": por_balde[i]["hash"] if i in por_balde else 0}
+        for i, (a, b) in enumerate(faixas)
+    ]
+
+
+class ReconciliacaoEmAndamento(Exception):
+    """Já há uma reconciliação rodando neste processo."""
+
+
+class Reconciliador:
+    """Encontra e trata referências órfãs de um ``SQLiteStore`` com ``REFERENCIAS``.
+
+    ``store.REFERENCIAS`` mapeia coluna local -> entidade no Gerenciamento
+    (ex.: ``{"aluno_id": "alunos"}``); ``cliente`` é o ``GerenciamentoClient``.
+    Com ``acao="remover"``, as linhas que referenciam um id órfão são apagadas.
+    ``escola`` é repassada ao Gerenciamento quando ``store`` é o shard de uma escola.
+    """
+
+    def __init__(self, store, cliente, acao="marcar", baldes=BALDES, limite_lookup=LIMITE_LOOKUP, escola=None):
+        if acao not in ACOES:
+            raise ValueError(f"Ação de reconciliação inválida: {acao!r} (use {' ou '.join(ACOES)})")
+        self.store = store
+        self.cliente = cliente
+        self.escola = escola
+        self.referencias = store.REFERENCIAS
+        self.acao = acao
+        self.baldes = baldes
+        self.limite_lookup = max(limite_lookup, baldes)
+        self._lock = threading.Lock()
+        self.ultimo = None
+
+    # -----------------------
+    # EXECUÇÃO
+    # -----------------------
+
+    def executar(self):
+        """Reconcilia todas as colunas e devolve o relatório da execução."""
+        if not self._lock.acquire(blocking=False):
+            raise ReconciliacaoEmAndamento("Já há uma reconciliação em andamento")
+        try:
+            inicio = time.monotonic()
+            relatorio = {"acao": self.acao, "iniciado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                         "colunas": {}}
+            for coluna, entidade in self.referencias.items():
+                estatisticas = {"entidade": entidade, "requisicoes": 0, "bytes_json": 0,
+                                "faixas_iguais": 0, "ids_conferidos": 0, "orfaos": 0, "removidos": 0}
+                self._no(coluna, entidade, *RAIZ, estatisticas)
+                relatorio["colunas"][coluna] = estatisticas
+            relatorio["duracao_s"] = round(time.monotonic() - inicio, 3)
+            self.ultimo = relatorio
+            return relatorio
+        finally:
+            self._lock.release()
+
+    def _no(self, coluna, entidade, inicio, fim, estatisticas):
+        """Confere os baldes de ``[inicio, fim)``; devolve (total, hash) das referências removidas."""
+        # O lado local é lido antes: toda referência lida já existia no Gerenciamento
+        # quando foi gravada, então aparece no resumo remoto lido depois (se não foi removida)
+        locais = self._resumo_local(coluna, inicio, fim, self.baldes)
+        remotos = self.cliente.digest(entidade, inicio, fim, self.baldes, self.escola)
+        estatisticas["requisicoes"] += 1
+        estatisticas["bytes_json"] += len(json.dumps(remotos))
+        verificados = self._verificados(coluna, inicio, fim)
+
+        folhas, internos = [], []
+        for remoto, local in zip(remotos, locais):
+            faixa = (remoto["inicio"], remoto["fim"])
+            if local["total"] == 0:
+                if faixa in verificados:  # as referências da faixa acabaram
+                    self._esquecer(coluna, *faixa)
+                continue
+            chaves = (f"{remoto['total']}:{remoto['hash']}", f"{local['total']}:{local['hash']}")
+            if verificados.get(faixa) == chaves:
+                estatisticas["faixas_iguais"] += 1
+            elif local["total"] <= self.limite_lookup:
+                folhas.append((faixa, remoto, local))
+            else:
+                internos.append((faixa, remoto, local))
+        ids_por_faixa = {faixa: self._ids_locais(coluna, *faixa) for faixa, _, _ in folhas}
+
+        # As folhas que mudaram são conferidas juntas, num único lookup. Uma faixa sem
+        # nenhum id no Gerenciamento também é conferida: os ids locais são lidos depois
+        # do resumo remoto e podem ter sido criados (e referenciados) nesse meio-tempo.
+        conferir = [i for faixa, _, _ in folhas for i in ids_por_faixa[faixa]]
+        ausentes = set()
+        if conferir:
+            ausentes = self.cliente.ausentes(entidade, conferir, self.escola)
+            estatisticas["requisicoes"] += 1
+            estatisticas["bytes_json"] += len(json.dumps({entidade: conferir}))
+            estatisticas["ids_conferidos"] += len(conferir)
+
+        removido_total = removido_hash = 0
+        for faixa, remoto, local in folhas + internos:
+            if faixa not in ids_por_faixa:
+                total, soma = self._no(coluna, entidade, *faixa, estatisticas)
+            else:
+                orfaos = [i for i in ids_por_faixa[faixa] if i in ausentes]
+                estatisticas["orfaos"] += len(orfaos)
+                total, soma = self._tratar_orfaos(coluna, entidade, faixa, orfaos, estatisticas)
+
+            # O resumo local salvo desconta o que foi apagado agora
+            chave_local = f"{local['total'] - total}:{local['hash'] - soma}"
+            self._salvar_verificado(coluna, faixa, f"{remoto['total']}:{remoto['hash']}", chave_local)
+            removido_total += total
+            removido_hash += soma
+        return removido_total, removido_hash
+
+    # -----------------------
+    # ACESSO AO BANCO LOCAL
+    # -----------------------
+
+    def _resumo_local(self, coluna, inicio, fim, baldes):
+        largura, _ = dividir(inicio, fim, baldes)
+        with self.store.leitura() as conn:
+            linhas = conn.execute(
+                sql_resumo(self.store.TABELA, coluna, distinto=True),
+                {"inicio": inicio, "fim": fim, "largura": largura},
+            ).fetchall()
+        return montar_baldes(inicio, fim, baldes, linhas)
+
+    def _ids_locais(self, coluna, inicio, fim):
+        with self.store.leitura() as conn:
+            linhas = conn.execute(
+                f"SELECT DISTINCT {coluna} FROM {self.store.TABELA} WHERE {coluna} >= ? AND {coluna} < ? "
+                f"ORDER BY {coluna}", (inicio, fim),
+            ).fetchall()
+        return [linha[0] for linha in linhas]
+
+    def _verificados(self, coluna, inicio, fim):
+        with self.store.leitura() as conn:
+            linhas = conn.execute(
+                "SELECT inicio, fim, hash_remoto, hash_local FROM reconciliacao_no "
+                "WHERE coluna = ? AND inicio >= ? AND fim <= ?", (coluna, inicio, fim),
+            ).fetchall()
+        return {(linha["inicio"], linha["fim"]): (linha["hash_remoto"], linha["hash_local"]) for linha in linhas}
+
+    def _salvar_verificado(self, coluna, faixa, chave_remota, chave_local):
+        with self.store.transacao() as conn:
+            conn.execute(
+                "INSERT INTO reconciliacao_no (coluna, inicio, fim, hash_remoto, hash_local) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (coluna, inicio, fim) DO UPDATE SET "
+                "hash_remoto = excluded.hash_remoto, hash_local = excluded.hash_local",
+                (coluna, *faixa, chave_remota, chave_local),
+            )
+
+    def _esquecer(self, coluna, inicio, fim):
+        with self.store.transacao() as conn:
+            conn.execute("DELETE FROM reconciliacao_no WHERE coluna = ? AND inicio >= ? AND fim <= ?",
+                         (coluna, inicio, fim))
+            conn.execute("DELETE FROM referencia_orfa WHERE coluna = ? AND valor >= ? AND valor < ?",
+                         (coluna, inicio, fim))
+
+    def _tratar_orfaos(self, coluna, entidade, faixa, orfaos, estatisticas):
+        """Marca ou apaga os órfãos da faixa; devolve (total, hash) dos valores apagados."""
+        agora = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self.store.transacao() as conn:
+            # As marcas da faixa passam a ser exatamente os órfãos de agora
+            marcadores = ",".join("?" * len(orfaos))
+            conn.execute(
+                f"DELETE FROM referencia_orfa WHERE coluna = ? AND valor >= ? AND valor < ?"
+                + (f" AND valor NOT IN ({marcadores})" if orfaos else ""),
+                (coluna, *faixa, *orfaos),
+            )
+            if self.acao == "remover" and orfaos:
+                cur = conn.execute(f"DELETE FROM {self.store.TABELA} WHERE {coluna} IN ({marcadores})", orfaos)
+                estatisticas["removidos"] += cur.rowcount
+                conn.execute(f"DELETE FROM referencia_orfa WHERE coluna = ? AND valor IN ({marcadores})",
+                             (coluna, *orfaos))
+            else:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO referencia_orfa (coluna, valor, detectado_em) VALUES (?, ?, ?)",
+                    [(coluna, valor, agora) for valor in orfaos],
+                )
+        for valor in orfaos:
+            self.cliente.invalidar(entidade, valor, self.escola)
+        if self.acao != "remover":
+            return 0, 0
+        return len(orfaos), sum(hash_id(valor) for valor in orfaos)
+
+    def orfaos(self, coluna=None, after=None, limite=100):
+        """Página das referências marcadas como órfãs, em ordem de (coluna, valor)."""
+        condicoes, params = [], []
+        if coluna is not None:
+            condicoes.append("coluna = ?")
+            params.append(coluna)
+        if after is not None:
+            condicoes.append("(coluna, valor) > (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        with self.store.leitura() as conn:
+            linhas = conn.execute(
+                f"SELECT coluna, valor, detectado_em FROM referencia_orfa {where} ORDER BY coluna, valor LIMIT ?",
+                (*params, limite),
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+
+def reconciliador_da_escola(app, escola):
+    """``Reconciliador`` do shard de ``escola`` (o do banco do app quando ``escola`` é None)."""
+    padrao = app.extensions["reconciliacao"]
+    if escola is None:
+        return padrao
+    shards, por_escola = app.extensions["escolas"], app.extensions["reconciliacao_escolas"]
+    with _LOCK_ESCOLAS:
+        reconciliador = por_escola.get(escola)
+        if reconciliador is None:
+            reconciliador = Reconciliador(shards.obter(escola), padrao.cliente, acao=padrao.acao,
+                                          baldes=padrao.baldes, limite_lookup=padrao.limite_lookup, escola=escola)
+            por_escola[escola] = reconciliador
+        elif not reconciliador._lock.locked():
+            # O shard pode ter saído do LRU e sido reaberto desde a última execução
+            reconciliador.store = shards.obter(escola)
+    return reconciliador
+
+
+def instalar_reconciliacao(app, store, cliente, acao="marcar"):
+    """Cria o ``Reconciliador`` do app e as rotas ``/reconciliacao`` (por escola, com ``X-Escola``)."""
+    padrao = Reconciliador(store, cliente, acao=acao)
+    app.extensions["reconciliacao"] = padrao
+    app.extensions["reconciliacao_escolas"] = {}
+
+    def executar_reconciliacao():
+        """
+        Roda a reconciliação de referências órfãs agora (o mesmo que o job noturno)
+        ---
+        tags:
+          - Reconciliação
+        responses:
+          200:
+            description: Relatório da execução (faixas puladas, ids conferidos, órfãos)
+          409:
+            description: Já há uma reconciliação em andamento
+        """
+        reconciliador = reconciliador_da_escola(app, escola_atual())
+        try:
+            return jsonify(reconciliador.executar())
+        except ReconciliacaoEmAndamento as erro:
+            return jsonify({"error": str(erro)}), 409
+
+    def ultima_reconciliacao():
+        """
+        Relatório da última reconciliação deste processo
+        ---
+        tags:
+          - Reconciliação
+        responses:
+          200:
+            description: Relatório, ou null se ainda não rodou
+        """
+        reconciliador = reconciliador_da_escola(app, escola_atual())
+        return jsonify({"acao": reconciliador.acao, "referencias": reconciliador.referencias,
+                        "ultima": reconciliador.ultimo})
+
+    def listar_orfaos():
+        """
+        Referências marcadas como órfãs (ids que não existem mais no Gerenciamento)
+        ---
+        tags:
+          - Reconciliação
+        parameters:
+          - in: query
+            name: coluna
+            type: string
+          - in: query
+            name: limit
+            type: integer
+            default: 100
+          - in: query
+            name: after
+            type: string
+            description: Valor de next_cursor da página anterior
+        responses:
+          200:
+            description: Página de {coluna, valor, detectado_em} e cursor da próxima página
+          400:
+            description: Parâmetros inválidos
+        """
+        reconciliador = reconciliador_da_escola(app, escola_atual())
+        coluna = request.args.get("coluna")
+        if coluna is not None and coluna not in reconciliador.referencias:
+            return jsonify({"error": f"O parâmetro 'coluna' deve ser um de: {', '.join(reconciliador.referencias)}"}), 400
+        try:
+            limite = min(int(request.args.get("limit", 100)), 1000)
+            after = request.args.get("after")
+            if after:
+                nome, _, valor = after.rpartition(":")
+                after = (nome, int(valor))
+        except ValueError:
+            return jsonify({"error": "Parâmetros 'limit' ou 'after' inválidos"}), 400
+        if limite < 1:
+            return jsonify({"error": "O parâmetro 'limit' deve ser maior que zero"}), 400
+
+        itens = reconciliador.orfaos(coluna, after or None, limite + 1)
+        proximo = None
+        if len(itens) > limite:
+            itens = itens[:limite]
+            proximo = f"{itens[-1]['coluna']}:{itens[-1]['valor']}"
+        return jsonify({"items": itens, "next_cursor": proximo})
+
+    app.add_url_rule("/reconciliacao", "executar_reconciliacao", executar_reconciliacao, methods=["POST"])
+    app.add_url_rule("/reconciliacao", "ultima_reconciliacao", ultima_reconciliacao, methods=["GET"])
+    app.add_url_rule("/reconciliacao/orfaos", "listar_orfaos", listar_orfaos, methods=["GET"])
+    return padrao
+
+
+def main():
+    """Job noturno: ``cd reservas && PYTHONPATH=.. python -m common.reconciliacao``."""
+    import sys
+
+    parser = argparse.ArgumentParser(description="Reconciliação de referências órfãs.")
+    parser.add_argument("--escola", action="append", default=[], help="Escola (shard) a reconciliar; repetível")
+    parser.add_argument("--todas-escolas", action="store_true",
+                        help="Reconcilia o banco principal e todos os shards em ESCOLAS_DIR")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    from app import create_app
+
+    app = create_app()
+    escolas = list(args.escola)
+    if args.todas_escolas:
+        diretorio = diretorio_escolas()
+        arquivos = sorted(os.listdir(diretorio)) if diretorio and os.path.isdir(diretorio) else []
+        escolas = [None] + [nome[:-3] for nome in arquivos if nome.endswith(".db")]
+    relatorios = {escola or "": reconciliador_da_escola(app, escola).executar() for escola in escolas or [None]}
+    saida = relatorios[""] if list(relatorios) == [""] else relatorios
+    print(json.dumps(saida, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
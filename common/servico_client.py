@@ -0,0 +1,99 @@
+import os
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from .breaker import CircuitBreaker, CircuitoAberto
+from .escolas import cabecalhos_escola
+from .gerenciamento_client import ERROS_UPSTREAM, LATENCIA_UPSTREAM, _RetrySemRecusa
+
+LIMITE_PAGINA = 1000  # máximo por página nas listagens de Reservas e Atividades
+
+
+class ServicoIndisponivel(Exception):
+    """O serviço não respondeu (timeout, erro de rede, 5xx ou circuit breaker aberto)."""
+
+
+class ServicoSobrecarregado(ServicoIndisponivel):
+    """O serviço recusou a chamada por sobrecarga (429/503 com ``Retry-After``); não conta no breaker."""
+
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class ServicoClient:
+    """Cliente HTTP de leitura de Reservas ou Atividades, para as consultas agregadas do Gerenciamento.
+
+    ``nome`` é o serviço ("reservas", "atividades"): a URL vem de
+    ``<NOME>_URL`` e o rótulo ``upstream`` das métricas é o próprio nome.
+    Como no ``GerenciamentoClient``, as conexões são keep-alive, as chamadas
+    têm timeout (``SERVICOS_TIMEOUT``), são repetidas em falhas de conexão ou
+    502/503/504 e passam por um circuit breaker por serviço. Um 429/503 com
+    ``Retry-After`` (recusa do controle de admissão) não é repetido nem conta
+    como falha no breaker: vira ``ServicoSobrecarregado``.
+    """
+
+    def __init__(self, nome, url_padrao, timeout=None, pool=None):
+        self.nome = nome
+        self.base_url = os.environ.get(f"{nome.upper()}_URL", url_padrao).rstrip("/")
+        self.timeout = (1.0, float(timeout or os.environ.get("SERVICOS_TIMEOUT", 3.0)))
+
+        retry = _RetrySemRecusa(total=2, backoff_factor=0.05, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(pool or os.environ.get("SERVICOS_POOL", 20)),
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(nome)
+
+    def _get(self, caminho, params, escola=None):
+        rotulos = {"upstream": self.nome, "method": "GET", "endpoint": re.sub(r"/\d+", "/{id}", caminho)}
+        try:
+            self.breaker.permitir()
+        except CircuitoAberto as erro:
+            raise ServicoIndisponivel(f"{self.nome}: circuit breaker aberto") from erro
+
+        inicio = time.perf_counter()
+        try:
+            resp = self.session.get(f"{self.base_url}{caminho}", params=params, timeout=self.timeout,
+                                    headers=cabecalhos_escola(escola))
+        except requests.RequestException as erro:
+            ERROS_UPSTREAM.inc(reason=type(erro).__name__, **rotulos)
+            self.breaker.falha()
+            raise ServicoIndisponivel(f"{self.nome}: {type(erro).__name__}") from erro
+        finally:
+            LATENCIA_UPSTREAM.observar(time.perf_counter() - inicio, **rotulos)
+        retry_after = resp.headers.get("Retry-After")
+        if resp.status_code in (429, 503) and retry_after is not None:
+            ERROS_UPSTREAM.inc(reason="overloaded", **rotulos)
+            # Respondeu, só pediu para esperar: libera a sonda do breaker sem contar falha
+            self.breaker.sucesso()
+            try:
+                espera = max(1, int(retry_after))
+            except ValueError:
+                espera = 1
+            raise ServicoSobrecarregado(f"{self.nome}: GET {caminho}: HTTP {resp.status_code}", espera)
+        if resp.status_code >= 500:
+            ERROS_UPSTREAM.inc(reason=f"http_{resp.status_code}", **rotulos)
+            self.breaker.falha()
+            raise ServicoIndisponivel(f"{self.nome}: GET {caminho}: HTTP {resp.status_code}")
+        self.breaker.sucesso()
+        if resp.status_code != 200:
+            raise ServicoIndisponivel(f"{self.nome}: GET {caminho}: HTTP {resp.status_code}")
+        return resp.json()
+
+    def listar(self, caminho, filtros, escola=None):
+        """Todos os itens de uma listagem paginada por cursor (``items``/``next_cursor``)."""
+        itens, cursor = [], None
+        while True:
+            params = {**filtros, "limit": LIMITE_PAGINA}
+            if cursor is not None:
+                params["after"] = cursor
+            pagina = self._get(caminho, params, escola)
+            itens.extend(pagina["items"])
+            cursor = pagina.get("next_cursor")
+            if cursor is None:
+                return itens
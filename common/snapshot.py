@@ -0,0 +1,277 @@
+"""Snapshot, exportação e restauração dos bancos SQLite dos serviços.
+
+- ``copiar_banco``: cópia consistente com a API de backup online do SQLite.
+  Em WAL, o backup em um passo lê de um snapshot: os escritores continuam
+  gravando durante a cópia (um backup em vários passos recomeçaria a cada
+  escrita de outra conexão).
+- ``exportar``: linhas de uma consulta em NDJSON ou CSV, geradas em lotes
+  de um cursor (memória limitada), para responder em stream comprimido.
+- ``restaurar_banco``: confere um snapshot (``quick_check`` e versão do
+  schema) e o coloca no lugar do banco, página a página, pela mesma API.
+
+As rotas são instaladas por ``instalar_snapshot``; a restauração é só por
+linha de comando, com o serviço parado::
+
+    python -m common.snapshot copiar reservas/reservas.db /backup/reservas.db
+    python -m common.snapshot restaurar /backup/reservas.db.gz reservas/reservas.db
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+
+from flask import Response, jsonify, request, stream_with_context
+
+from .compressao import brotli, codificacoes
+from .sqlite_store import em_thread
+
+FORMATOS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+LOTE_CURSOR = 1000
+BLOCO_ARQUIVO = 1024 * 1024
+
+
+class SnapshotInvalido(Exception):
+    """O arquivo não é um banco SQLite íntegro com a versão de schema esperada."""
+
+
+def _abrir_leitura(caminho):
+    return sqlite3.connect(f"file:{os.path.abspath(caminho)}?mode=ro", uri=True, check_same_thread=False)
+
+
+def copiar_banco(origem, destino):
+    """Copia o banco ``origem`` para o arquivo ``destino`` (substituído de forma atômica)."""
+    inicio = time.monotonic()
+    temporario = f"{destino}.parcial"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    fonte = _abrir_leitura(origem)
+    alvo = sqlite3.connect(temporario)
+    try:
+        fonte.backup(alvo)  # um passo só: um snapshot de leitura, sem travar escritores em WAL
+        alvo.execute("PRAGMA journal_mode=DELETE")  # arquivo único, sem -wal ao lado
+    finally:
+        alvo.close()
+        fonte.close()
+    os.replace(temporario, destino)
+    return {"arquivo": destino, "bytes": os.path.getsize(destino), "duracao_s": round(time.monotonic() - inicio, 3)}
+
+
+def _descomprimir_se_preciso(caminho, diretorio):
+    with open(caminho, "rb") as arquivo:
+        if arquivo.read(2) != b"\x1f\x8b":
+            return caminho
+    destino = os.path.join(diretorio, "snapshot.db")
+    with gzip.open(caminho, "rb") as origem, open(destino, "wb") as saida:
+        shutil.copyfileobj(origem, saida, BLOCO_ARQUIVO)
+    return destino
+
+
+def restaurar_banco(snapshot, destino, versao_schema=None):
+    """Substitui o banco ``destino`` pelo ``snapshot`` (``.db`` ou ``.db.gz``).
+
+    O snapshot é conferido antes de tocar no destino; o banco antigo só é
+    trocado (``os.replace``) quando a cópia nova está completa. Rode com o
+    serviço parado: conexões abertas continuariam vendo o arquivo antigo.
+    """
+    inicio = time.monotonic()
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(destino))) as diretorio:
+        origem = _descomprimir_se_preciso(snapshot, diretorio)
+        fonte = _abrir_leitura(origem)
+        try:
+            verificacao = fonte.execute("PRAGMA quick_check").fetchone()[0]
+            if verificacao != "ok":
+                raise SnapshotInvalido(f"Snapshot corrompido: {verificacao}")
+            versao = fonte.execute("PRAGMA user_version").fetchone()[0]
+            if versao_schema is not None and versao != versao_schema:
+                raise SnapshotInvalido(f"Snapshot com schema {versao}; o serviço espera {versao_schema}")
+
+            temporario = os.path.join(diretorio, "restaurado.db")
+            alvo = sqlite3.connect(temporario)
+            try:
+                fonte.backup(alvo)
+                alvo.execute("PRAGMA journal_mode=WAL")
+            finally:
+                alvo.close()
+        except sqlite3.DatabaseError as erro:
+            raise SnapshotInvalido(f"Arquivo não é um banco SQLite: {erro}") from erro
+        finally:
+            fonte.close()
+
+        for sufixo in ("-wal", "-shm"):
+            if os.path.exists(destino + sufixo):
+                os.remove(destino + sufixo)
+        os.replace(temporario, destino)
+    return {"arquivo": destino, "bytes": os.path.getsize(destino), "schema": versao,
+            "duracao_s": round(time.monotonic() - inicio, 3)}
+
+
+def exportar(caminho, tabela, colunas, formato):
+    """Gera o conteúdo de ``tabela`` (em ordem de id) em NDJSON ou CSV, em blocos de texto.
+
+    Uma única transação de leitura: a exportação é consistente mesmo com
+    escritas em andamento, e em WAL não as bloqueia.
+    """
+    conn = _abrir_leitura(caminho)
+    try:
+        cursor = conn.execute(f"SELECT {', '.join(colunas)} FROM {tabela} ORDER BY id")
+        if formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer, lineterminator="\n")
+            escritor.writerow(colunas)
+        while True:
+            linhas = cursor.fetchmany(LOTE_CURSOR)
+            if not linhas:
+                break
+            if formato == "csv":
+                escritor.writerows(linhas)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield "".join(json.dumps(dict(zip(colunas, linha)), ensure_ascii=False) + "\n" for linha in linhas)
+        if formato == "csv" and buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        conn.close()
+
+
+def comprimir_stream(blocos, codificacao, nivel=6):
+    """Comprime um gerador de ``bytes``/``str`` em stream (gzip ou br); ``None`` não comprime."""
+    if codificacao == "br":
+        compressor = brotli.Compressor(quality=4)
+        processar, terminar = compressor.process, compressor.finish
+    elif codificacao == "gzip":
+        compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # 31: cabeçalho gzip
+        processar, terminar = compressor.compress, compressor.flush
+    for bloco in blocos:
+        dados = bloco.encode() if isinstance(bloco, str) else bloco
+        if codificacao is None:
+            yield dados
+            continue
+        saida = processar(dados)
+        if saida:
+            yield saida
+    if codificacao is not None:
+        yield terminar()
+
+
+def _ler_arquivo(caminho, remover=False):
+    try:
+        with open(caminho, "rb") as arquivo:
+            while True:
+                bloco = arquivo.read(BLOCO_ARQUIVO)
+                if not bloco:
+                    break
+                yield bloco
+    finally:
+        if remover:
+            os.remove(caminho)
+
+
+def instalar_snapshot(app, caminho, exportacoes, servico, prefixo=""):
+    """Adiciona ``GET {prefixo}/admin/snapshot`` e ``GET {prefixo}/export/<nome>`` ao app.
+
+    ``exportacoes`` mapeia o nome exposto para ``(tabela, colunas)``. ``caminho``
+    pode ser uma função, chamada a cada requisição (banco da escola em ``X-Escola``).
+    """
+
+    def arquivo():
+        return caminho() if callable(caminho) else caminho
+
+    def snapshot():
+        """
+        Cópia consistente do banco (API de backup online do SQLite), comprimida com gzip
+        ---
+        tags:
+          - Snapshot
+        produces:
+          - application/gzip
+        responses:
+          200:
+            description: Arquivo .db.gz; restaure com python -m common.snapshot restaurar
+        """
+        descritor, temporario = tempfile.mkstemp(prefix=f"snapshot-{servico}-", suffix=".db")
+        os.close(descritor)
+        em_thread(copiar_banco, arquivo(), temporario)
+        carimbo = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        # Nível 1: o banco inteiro passa pelo compressor, e os níveis altos pouco ganham
+        blocos = comprimir_stream(_ler_arquivo(temporario, remover=True), "gzip", nivel=1)
+        resposta = Response(stream_with_context(blocos), mimetype="application/gzip")
+        resposta.headers["Content-Disposition"] = f'attachment; filename="{servico}-{carimbo}.db.gz"'
+        return resposta
+
+    def exportacao(nome):
+        """
+        Exporta uma tabela inteira em NDJSON ou CSV, em stream (gzip/brotli pelo Accept-Encoding)
+        ---
+        tags:
+          - Snapshot
+        parameters:
+          - in: path
+            name: nome
+            type: string
+            required: true
+          - in: query
+            name: formato
+            type: string
+            enum: [ndjson, csv]
+            default: ndjson
+        responses:
+          200:
+            description: Uma linha por registro, em ordem de id
+          400:
+            description: Formato inválido
+          404:
+            description: Tabela desconhecida
+        """
+        if nome not in exportacoes:
+            return jsonify({"error": f"Exportações disponíveis: {', '.join(exportacoes)}"}), 404
+        formato = request.args.get("formato", "ndjson")
+        if formato not in FORMATOS:
+            return jsonify({"error": f"O parâmetro 'formato' deve ser um de: {', '.join(FORMATOS)}"}), 400
+
+        tabela, colunas = exportacoes[nome]
+        codificacao = request.accept_encodings.best_match(codificacoes())
+        resposta = Response(
+            stream_with_context(comprimir_stream(exportar(arquivo(), tabela, colunas, formato), codificacao)),
+            mimetype=FORMATOS[formato],
+        )
+        resposta.vary.add("Accept-Encoding")
+        if codificacao is not None:
+            resposta.headers["Content-Encoding"] = codificacao
+        resposta.headers["Content-Disposition"] = f'attachment; filename="{nome}.{formato}"'
+        return resposta
+
+    app.add_url_rule(f"{prefixo}/admin/snapshot", "snapshot", snapshot, methods=["GET"])
+    app.add_url_rule(f"{prefixo}/export/<nome>", "exportacao", exportacao, methods=["GET"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot e restauração dos bancos SQLite dos serviços.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    copiar = comandos.add_parser("copiar", help="Cópia consistente de um banco em uso")
+    copiar.add_argument("banco")
+    copiar.add_argument("destino")
+    restaurar = comandos.add_parser("restaurar", help="Substitui o banco por um snapshot (.db ou .db.gz)")
+    restaurar.add_argument("snapshot")
+    restaurar.add_argument("banco")
+    restaurar.add_argument("--schema", type=int, help="Versão de schema exigida (PRAGMA user_version)")
+    args = parser.parse_args()
+
+    if args.comando == "copiar":
+        resultado = copiar_banco(args.banco, args.destino)
+    else:
+        resultado = restaurar_banco(args.snapshot, args.banco, args.schema)
+    print(json.dumps(resultado, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas aplicados a cada conexão. WAL permite leituras concorrentes com o
+# escritor; synchronous=NORMAL é seguro em WAL (só o último commit pode se perder
+# em queda de energia, nunca corromper o banco).
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _threadpool_gevent():
+    """Threadpool do hub do gevent no worker gevent (threading "monkey-patched"), senão None."""
+    try:
+        from gevent import get_hub, monkey
+    except ImportError:
+        return None
+    return get_hub().threadpool if monkey.is_module_patched("threading") else None
+
+
+def em_thread(funcao, *args):
+    """Roda ``funcao(*args)`` numa thread de verdade quando o processo usa gevent.
+
+    O ``sqlite3`` é código C que o gevent não consegue tornar cooperativo: uma
+    espera pelo lock de escrita (``busy_timeout``) ou uma consulta longa
+    travaria todas as greenlets do worker, inclusive o ``/health``. Na
+    threadpool do hub, só a greenlet que fez a chamada espera. Fora do gevent,
+    chama direto.
+    """
+    threadpool = _threadpool_gevent()
+    if threadpool is None:
+        return funcao(*args)
+    return threadpool.apply(funcao, args)
+
+
+class _ConexaoEmThread:
+    """Conexão ``sqlite3`` cujos comandos rodam na threadpool do gevent (ver ``em_thread``)."""
+
+    def __init__(self, conn, threadpool):
+        self._conn = conn
+        self._threadpool = threadpool
+
+    def execute(self, *args):
+        return self._threadpool.apply(self._conn.execute, args)
+
+    def executemany(self, *args):
+        return self._threadpool.apply(self._conn.executemany, args)
+
+    def executescript(self, *args):
+        return self._threadpool.apply(self._conn.executescript, args)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+def schema_contador(tabela, coluna):
+    """DDL de uma tabela de contagem de ``tabela`` por ``coluna``, mantida por triggers.
+
+    Os triggers rodam na mesma transação do INSERT/DELETE, então a contagem
+    nunca diverge dos dados. Na primeira criação a contagem é preenchida a
+    partir das linhas já existentes.
+    """
+    contador = f"contagem_{tabela}_{coluna}"
+    return f"""
+    CREATE TABLE IF NOT EXISTS {contador} (
+        {coluna} INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL
+    );
+    INSERT INTO {contador} ({coluna}, total)
+        SELECT {coluna}, COUNT(*) FROM {tabela}
+        WHERE NOT EXISTS (SELECT 1 FROM {contador})
+        GROUP BY {coluna};
+    CREATE TRIGGER IF NOT EXISTS tg_{contador}_insert AFTER INSERT ON {tabela} BEGIN
+        INSERT INTO {contador} ({coluna}, total) VALUES (NEW.{coluna}, 1)
+            ON CONFLICT ({coluna}) DO UPDATE SET total = total + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS tg_{contador}_delete AFTER DELETE ON {tabela} BEGIN
+        UPDATE {contador} SET total = total - 1 WHERE {coluna} = OLD.{coluna};
+    END;
+    """
+
+
+# Estado da reconciliação de referências órfãs (common/reconciliacao.py)
+SCHEMA_RECONCILIACAO = """
+CREATE TABLE IF NOT EXISTS reconciliacao_no (
+    coluna TEXT NOT NULL,
+    inicio INTEGER NOT NULL,
+    fim INTEGER NOT NULL,
+    hash_remoto TEXT NOT NULL,
+    hash_local TEXT NOT NULL,
+    PRIMARY KEY (coluna, inicio, fim)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS referencia_orfa (
+    coluna TEXT NOT NULL,
+    valor INTEGER NOT NULL,
+    detectado_em TEXT NOT NULL,
+    PRIMARY KEY (coluna, valor)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStore:
+    """Base para os armazenamentos SQLite dos serviços.
+
+    Mantém um pool de conexões (compartilhável entre threads) em modo WAL.
+    As subclasses definem ``SCHEMA`` (idempotente, executado na abertura só
+    quando o ``PRAGMA user_version`` do arquivo difere de ``VERSAO_SCHEMA``) e
+    usam ``leitura()`` para consultas e ``transacao()`` para escritas.
+    ``TABELA`` e ``CONTADORES`` (colunas) geram contagens por valor mantidas
+    por triggers, lidas em O(1) com ``contagem()``. ``REFERENCIAS`` (coluna ->
+    entidade do Gerenciamento) habilita a reconciliação de órfãos.
+    ``transacao()`` abre com ``BEGIN IMMEDIATE``: o lock de escrita é obtido
+    logo no início, então workers concorrentes esperam (``busy_timeout``) em
+    vez de falhar no meio da transação. No worker gevent, os comandos rodam
+    na threadpool do hub (``em_thread``), e essa espera não trava o processo.
+    """
+
+    SCHEMA = ""
+    VERSAO_SCHEMA = 1
+    TABELA = None
+    CONTADORES = ()
+    REFERENCIAS = {}
+
+    def __init__(self, caminho, pool=8, busy_timeout=5.0):
+        self.caminho = caminho
+        self.busy_timeout = busy_timeout
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._pool = queue.LifoQueue()
+        self._tamanho_pool = pool
+        self._abertas = 0
+        self._lock = threading.Lock()
+
+        with self.conexao() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.VERSAO_SCHEMA:
+                self._migrar(conn)
+
+    def _migrar(self, conn):
+        """Aplica o ``SCHEMA`` (com contadores e reconciliação) e grava ``VERSAO_SCHEMA``."""
+        schema = self.SCHEMA + "".join(schema_contador(self.TABELA, coluna) for coluna in self.CONTADORES)
+        if self.REFERENCIAS:
+            schema += SCHEMA_RECONCILIACAO
+        conn.executescript(schema + f"PRAGMA user_version={self.VERSAO_SCHEMA};")
+
+    def _abrir(self):
+        conn = sqlite3.connect(
+            self.caminho,
+            timeout=self.busy_timeout,
+            isolation_level=None,  # transações controladas explicitamente
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        threadpool = _threadpool_gevent()
+        return conn if threadpool is None else _ConexaoEmThread(conn, threadpool)
+
+    @contextmanager
+    def conexao(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                criar = self._abertas < self._tamanho_pool
+                if criar:
+                    self._abertas += 1
+            conn = self._abrir() if criar else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def fechar(self):
+        """Fecha as conexões ociosas do pool.
+
+        As que estiverem em uso voltam ao pool normalmente; se o store for
+        usado de novo, novas conexões são abertas sob demanda.
+        """
+        with self._lock:
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._abertas -= 1
+
+    @contextmanager
+    def leitura(self):
+        with self.conexao() as conn:
+            yield conn
+
+    @contextmanager
+    def transacao(self):
+        with self.conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def contagem(self, coluna, valor):
+        """Total de linhas com ``coluna = valor`` (uma leitura por chave primária)."""
+        with self.leitura() as conn:
+            linha = conn.execute(
+                f"SELECT total FROM contagem_{self.TABELA}_{coluna} WHERE {coluna} = ?", (valor,)
+            ).fetchone()
+        return linha["total"] if linha else 0
+
+    def contagens(self, coluna):
+        """Todas as contagens não nulas de ``coluna``, em ordem do valor."""
+        with self.leitura() as conn:
+            linhas = conn.execute(
+                f"SELECT {coluna}, total FROM contagem_{self.TABELA}_{coluna} WHERE total > 0 ORDER BY {coluna}"
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
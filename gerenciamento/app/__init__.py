@@ -1,34 +1,88 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flasgger import Swagger
-import os
+from sqlalchemy.exc import OperationalError
 
-db = SQLAlchemy()
+from common.admissao import instalar_admissao
+from common.compressao import instalar_compressao
+from common.escolas import instalar_escolas
+from common.metrics import instrumentar
+from common.openapi import configurar_docs
+from common.snapshot import instalar_snapshot
+
+from . import database
+
+db = SQLAlchemy(session_options={"class_": database.SessaoRoteada})
 
 def create_app():
     app = Flask(__name__)
+    # Serialização JSON com orjson (jsonify e request.get_json)
+    from .serializers import OrjsonProvider
+    app.json = OrjsonProvider(app)
 
-    db_path = os.path.join(os.path.dirname(__file__), "..", "gerenciamento.db")
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    # URI e perfil do SQLite vêm do ambiente (GERENCIAMENTO_DB / DATABASE_URL, DB_PROFILE)
+    database.configurar(app)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 
-    # Configuração basica do Swagger
-    app.config['SWAGGER'] = {
-        'title': 'Gerenciamento API',
-        'uiversion': 3
-    }
-    Swagger(app)
+    # Swagger (ou, com FAST_STARTUP=1, o spec pré-construído no build)
+    configurar_docs(app, 'Gerenciamento API')
+
+    # Latência/status por rota e consultas SQL por requisição, em GET /metrics
+    instrumentar(app, "gerenciamento")
+    database.instrumentar_consultas(app)
+
+    # Controle de admissão: com o único escritor do SQLite ocupado, recusa rápido
+    # (503 + Retry-After) em vez de deixar as escritas falharem com "database is locked".
+    # O long-poll do feed de mudanças só espera, então fica de fora.
+    instalar_admissao(app, "gerenciamento", isentas=("/api/changes",), erros_lock=(OperationalError,),
+                      concorrencia=64, reserva_leituras=16, escritas=4, fila_escritas=8, espera_ms=250)
+
+    # gzip/brotli negociado pelo Accept-Encoding nas respostas grandes
+    instalar_compressao(app)
 
     db.init_app(app)
+    database.iniciar(app, db)
 
     with app.app_context():
-        from .models import Aluno, Professor, Turma
-        db.create_all()
+        from .models import Aluno, Professor, Turma, Mudanca
+        from . import search
+        # create_all só quando o PRAGMA user_version do banco está desatualizado
+        database.preparar_schema(db, scripts=(search.SCHEMA,))
+
+    # Várias escolas (ESCOLAS_DIR): com X-Escola, cada escola usa o próprio banco
+    instalar_escolas(app, database.abrir_escolas(app, db, scripts=(search.SCHEMA,)))
 
     #Importar e registra as rotas
     from .routes import bp 
     app.register_blueprint(bp, url_prefix='/api')
+
+    # Feed de mudanças (também registra os eventos do ORM que alimentam o outbox)
+    from .changes import bp as changes_bp
+    app.register_blueprint(changes_bp, url_prefix='/api')
+
+    # Cadastro em lote (JSON, NDJSON ou CSV)
+    from .bulk import bp as bulk_bp
+    app.register_blueprint(bulk_bp, url_prefix='/api')
+
+    # Busca textual (FTS5) em alunos e professores
+    from .search import bp as search_bp
+    app.register_blueprint(search_bp, url_prefix='/api')
+
+    # Resumos por faixa de ids para a reconciliação de órfãos de Reservas/Atividades
+    from .digest import bp as digest_bp
+    app.register_blueprint(digest_bp, url_prefix='/api')
+
+    # Visão geral da turma: fan-out em paralelo para Reservas e Atividades
+    from .overview import bp as overview_bp, configurar_overview
+    configurar_overview(app)
+    app.register_blueprint(overview_bp, url_prefix='/api')
+
+    # Snapshot (backup online) e exportação em stream de alunos, professores e turmas
+    if database.caminho_arquivo(app) is not None:
+        from .serializers import CAMPOS, NOMES
+        exportacoes = {NOMES[model]: (model.__tablename__, CAMPOS[model]) for model in CAMPOS}
+        instalar_snapshot(app, lambda: database.caminho_da_requisicao(app), exportacoes, "gerenciamento",
+                          prefixo="/api")
     
     return app
 
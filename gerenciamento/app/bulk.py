@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from common.openapi import swag_from
+
+from . import db
+from .changes import registrar_mudancas
+from .models import Aluno, Professor, Turma
+from .routes import ler_capacidade
+
+bp = Blueprint("bulk", __name__)
+
+# Linhas por transação. Com até 6 colunas fica bem abaixo do limite de
+# variáveis por statement do SQLite mesmo quando o executemany vira VALUES múltiplo.
+TAMANHO_LOTE = 1000
+
+
+# -----------------------
+# LEITURA DO CORPO
+# -----------------------
+
+def _ler_linhas():
+    """Itera sobre os registros do corpo: array JSON, NDJSON ou CSV (com cabeçalho).
+
+    NDJSON e CSV são lidos do stream da requisição, linha a linha.
+    """
+    tipo = request.mimetype
+    if tipo in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        texto = io.TextIOWrapper(request.stream, encoding="utf-8")
+        return (_ler_json(linha) for linha in texto if linha.strip())
+    if tipo == "text/csv":
+        texto = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        return csv.DictReader(texto)
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("Envie um array JSON, NDJSON (application/x-ndjson) ou CSV (text/csv)")
+    return iter(data)
+
+
+def _ler_json(linha):
+    try:
+        return json.loads(linha)
+    except ValueError:
+        return None
+
+
+def _lotes(iteravel, tamanho):
+    iteravel = iter(iteravel)
+    while lote := list(islice(iteravel, tamanho)):
+        yield lote
+
+
+# -----------------------
+# VALIDAÇÃO POR ENTIDADE
+# -----------------------
+
+def _texto(registro, campo):
+    valor = registro.get(campo)
+    if valor in (None, ""):
+        return None
+    return str(valor)
+
+
+def _validar_aluno(registro):
+    nome, email = _texto(registro, "nome"), _texto(registro, "email")
+    if not nome or not email:
+        raise ValueError("Nome e email são obrigatórios")
+    return {"nome": nome, "email": email}
+
+
+def _validar_professor(registro):
+    linha = {campo: _texto(registro, campo) for campo in ("nome", "email", "materia", "observacoes")}
+    try:
+        idade = int(registro.get("idade"))
+    except (TypeError, ValueError):
+        idade = None
+    if not all([linha["nome"], idade, linha["email"], linha["materia"]]):
+        raise ValueError("Campos 'nome', 'idade', 'email' e 'materia' são obrigatórios")
+    linha["idade"] = idade
+    return linha
+
+
+def _validar_turma(registro):
+    nome = _texto(registro, "nome")
+    if not nome:
+        raise ValueError("O campo nome é obrigatório")
+    return {"nome": nome, "descricao": _texto(registro, "descricao"), "capacidade": ler_capacidade(registro)}
+
+
+# entidade -> (model, validação, coluna única usada no upsert)
+ENTIDADES = {
+    "alunos": (Aluno, _validar_aluno, "email"),
+    "professores": (Professor, _validar_professor, "email"),
+    "turmas": (Turma, _validar_turma, None),
+}
+
+
+# -----------------------
+# GRAVAÇÃO EM LOTE
+# -----------------------
+
+def _gravar_upsert(model, entidade, chave, validos):
+    """INSERT ... ON CONFLICT(chave) DO UPDATE para um lote; devolve {chave: (id, status)}."""
+    tabela = model.__table__
+    # Registros repetidos no mesmo lote: vale o último
+    por_chave = {linha[chave]: linha for _, linha in validos}
+    linhas = list(por_chave.values())
+
+    existentes = set(db.session.scalars(select(tabela.c[chave]).where(tabela.c[chave].in_(list(por_chave)))))
+
+    stmt = sqlite_insert(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabela.c[chave]],
+        # ``versao`` recebe o valor novo gerado pelo default da coluna (novo ETag)
+        set_={coluna: stmt.excluded[coluna] for coluna in [*linhas[0], "versao"] if coluna != chave},
+    )
+    db.session.execute(stmt, linhas)
+
+    ids = dict(db.session.execute(
+        select(tabela.c[chave], tabela.c.id).where(tabela.c[chave].in_(list(por_chave)))
+    ).all())
+
+    criados, atualizados = [], []
+    for valor, linha in por_chave.items():
+        destino = atualizados if valor in existentes else criados
+        destino.append({"id": ids[valor], **linha})
+    conexao = db.session.connection()
+    registrar_mudancas(conexao, entidade, "criado", criados)
+    registrar_mudancas(conexao, entidade, "atualizado", atualizados)
+
+    return {valor: (ids[valor], "atualizado" if valor in existentes else "criado") for valor in por_chave}
+
+
+def _gravar_insert(model, entidade, validos):
+    tabela = model.__table__
+    linhas = [linha for _, linha in validos]
+    stmt = insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True)
+    ids = list(db.session.scalars(stmt, linhas))
+    registrar_mudancas(db.session.connection(), entidade, "criado",
+                       [{"id": i, **linha} for i, linha in zip(ids, linhas)])
+    return ids
+
+
+def _processar_lote(entidade, lote, inicio):
+    model, validar, chave = ENTIDADES[entidade]
+    resultados = [None] * len(lote)
+    validos = []
+    for pos, registro in enumerate(lote):
+        try:
+            if not isinstance(registro, dict):
+                raise ValueError("Registro inválido")
+            validos.append((pos, validar(registro)))
+        except ValueError as erro:
+            resultados[pos] = {"linha": inicio + pos, "status": "erro", "error": str(erro)}
+
+    if validos:
+        try:
+            if chave:
+                gravados = _gravar_upsert(model, entidade, chave, validos)
+                for pos, linha in validos:
+                    id_, status = gravados[linha[chave]]
+                    resultados[pos] = {"linha": inicio + pos, "status": status, "id": id_}
+            else:
+                ids = _gravar_insert(model, entidade, validos)
+                for (pos, _), id_ in zip(validos, ids):
+                    resultados[pos] = {"linha": inicio + pos, "status": "criado", "id": id_}
+            db.session.info["mudancas"] = True
+            db.session.commit()
+        except SQLAlchemyError as erro:
+            db.session.rollback()
+            for pos, _ in validos:
+                resultados[pos] = {"linha": inicio + pos, "status": "erro",
+                                   "error": f"Falha ao gravar o lote: {erro.__class__.__name__}"}
+    return resultados
+
+
+def _bulk(entidade):
+    try:
+        registros = _ler_linhas()
+    except ValueError as erro:
+        return jsonify({"error": str(erro)}), 400
+
+    resultados = []
+    for lote in _lotes(registros, TAMANHO_LOTE):
+        resultados.extend(_processar_lote(entidade, lote, len(resultados) + 1))
+
+    resumo = {"total": len(resultados), "criado": 0, "atualizado": 0, "erro": 0}
+    for r in resultados:
+        resumo[r["status"]] += 1
+    return jsonify({**resumo, "results": resultados})
+
+
+def _doc_bulk(tag, exemplo):
+    return {
+        "tags": [tag],
+        "description": (
+            f"Cria {tag.lower()} em lote. Aceita array JSON, NDJSON (application/x-ndjson) "
+            f"ou CSV com cabeçalho (text/csv). Grava em transações de {TAMANHO_LOTE} linhas"
+            + ("; registros com e-mail já cadastrado são atualizados (upsert)." if tag != "Turmas" else ".")
+        ),
+        "consumes": ["application/json", "application/x-ndjson", "text/csv"],
+        "parameters": [
+            {"name": "body", "in": "body", "schema": {"type": "array", "items": {"type": "object"}, "example": [exemplo]}}
+        ],
+        "responses": {
+            200: {"description": "Totais e o resultado de cada linha (status 'criado', 'atualizado' ou 'erro')."},
+            400: {"description": "Corpo em formato não suportado."}
+        }
+    }
+
+
+@bp.post("/alunos/bulk")
+@swag_from(_doc_bulk("Alunos", {"nome": "Ana Lima", "email": "ana.lima@escola.com"}))
+def bulk_alunos():
+    return _bulk("alunos")
+
+
+@bp.post("/professores/bulk")
+@swag_from(_doc_bulk("Professores", {"nome": "Carlos Almeida", "idade": 40,
+                                     "email": "carlos.almeida@escola.com", "materia": "História"}))
+def bulk_professores():
+    return _bulk("professores")
+
+
+@bp.post("/turmas/bulk")
+@swag_from(_doc_bulk("Turmas", {"nome": "7º Ano A", "descricao": "Turma da manhã", "capacidade": 30}))
+def bulk_turmas():
+    return _bulk("turmas")
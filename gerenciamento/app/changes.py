@@ -0,0 +1,226 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session, object_session
+
+from common.openapi import swag_from
+
+from . import db
+from .models import Aluno, Mudanca, Professor, Turma
+
+bp = Blueprint("changes", __name__)
+
+# Nome da entidade no feed (o mesmo usado nas rotas /api/<entidade>)
+ENTIDADES = {Aluno: "alunos", Professor: "professores", Turma: "turmas"}
+
+LIMITE_PADRAO = 500
+LIMITE_MAXIMO = 5000
+ESPERA_MAXIMA = 30.0
+# Mesmo sem aviso de commit (outro worker/processo), o feed é reconsultado neste intervalo
+INTERVALO_RECONSULTA = 1.0
+HEARTBEAT_SSE = 15.0
+
+# Acordado a cada commit que gravou mudanças; ``_geracao`` evita perder um aviso
+# que chegue entre a consulta e o wait.
+_novidades = threading.Condition()
+_geracao = 0
+
+
+# -----------------------
+# REGISTRO (OUTBOX)
+# -----------------------
+
+def registrar_mudancas(conexao, entidade, operacao, linhas):
+    """Grava mudanças no outbox usando a conexão (e transação) de quem alterou os dados.
+
+    ``linhas`` é uma lista de dicts com ao menos ``id``. Usado pelos eventos do
+    ORM abaixo e pelas escritas em lote que não passam pelo ORM.
+    """
+    if not linhas:
+        return
+    agora = datetime.now(timezone.utc)
+    conexao.execute(insert(Mudanca.__table__), [
+        {
+            "entidade": entidade,
+            "entidade_id": linha["id"],
+            "operacao": operacao,
+            "dados": None if operacao == "removido" else linha,
+            "criado_em": agora,
+        }
+        for linha in linhas
+    ])
+
+
+def _como_dict(obj):
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs
+            if attr.key != "versao"}
+
+
+def _marcar_sessao(obj):
+    sessao = object_session(obj)
+    if sessao is not None:
+        sessao.info["mudancas"] = True
+
+
+def _ao_inserir(mapper, conexao, obj):
+    registrar_mudancas(conexao, ENTIDADES[type(obj)], "criado", [_como_dict(obj)])
+    _marcar_sessao(obj)
+
+
+def _ao_atualizar(mapper, conexao, obj):
+    # after_update também é chamado para objetos "sujos" sem mudança real de coluna
+    estado = inspect(obj)
+    if not any(estado.attrs[attr.key].history.has_changes() for attr in mapper.column_attrs
+               if attr.key != "versao"):
+        return
+    registrar_mudancas(conexao, ENTIDADES[type(obj)], "atualizado", [_como_dict(obj)])
+    _marcar_sessao(obj)
+
+
+def _ao_remover(mapper, conexao, obj):
+    registrar_mudancas(conexao, ENTIDADES[type(obj)], "removido", [{"id": obj.id}])
+    _marcar_sessao(obj)
+
+
+for _model in ENTIDADES:
+    event.listen(_model, "after_insert", _ao_inserir)
+    event.listen(_model, "after_update", _ao_atualizar)
+    event.listen(_model, "after_delete", _ao_remover)
+
+
+@event.listens_for(Session, "after_commit")
+def _avisar_commit(sessao):
+    if sessao.info.pop("mudancas", False):
+        avisar_novidades()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_aviso(sessao):
+    sessao.info.pop("mudancas", None)
+
+
+def avisar_novidades():
+    global _geracao
+    with _novidades:
+        _geracao += 1
+        _novidades.notify_all()
+
+
+# -----------------------
+# CONSULTA DO FEED
+# -----------------------
+
+def _serializar(m):
+    return {
+        "seq": m.seq,
+        "entidade": m.entidade,
+        "entidade_id": m.entidade_id,
+        "operacao": m.operacao,
+        "dados": m.dados,
+        "criado_em": m.criado_em.isoformat(),
+    }
+
+
+def _buscar(since, limite):
+    try:
+        linhas = (Mudanca.query
+                  .filter(Mudanca.seq > since)
+                  .order_by(Mudanca.seq)
+                  .limit(limite)
+                  .all())
+        return [_serializar(m) for m in linhas]
+    finally:
+        # Encerra a transação e devolve a conexão ao pool: o long-poll e o SSE
+        # esperam sem prender conexão, e a próxima busca enxerga commits novos
+        db.session.rollback()
+
+
+def _aguardar(since, limite, espera):
+    """Long-poll: devolve assim que houver mudanças após ``since`` ou ao fim da espera."""
+    fim = time.monotonic() + espera
+    while True:
+        with _novidades:
+            geracao = _geracao
+        eventos = _buscar(since, limite)
+        restante = fim - time.monotonic()
+        if eventos or restante <= 0:
+            return eventos
+        with _novidades:
+            if _geracao == geracao:
+                _novidades.wait(min(restante, INTERVALO_RECONSULTA))
+
+
+def _ler_inteiro(nome, padrao, minimo=0, maximo=None):
+    valor = request.args.get(nome, padrao)
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"O parâmetro '{nome}' deve ser um inteiro")
+    if valor < minimo:
+        raise ValueError(f"O parâmetro '{nome}' deve ser >= {minimo}")
+    return min(valor, maximo) if maximo is not None else valor
+
+
+@bp.get("/changes")
+@swag_from({
+    "tags": ["Changes"],
+    "description": (
+        "Feed de mudanças (criado/atualizado/removido) de alunos, professores e turmas, "
+        "em ordem de 'seq'. Retome a partir do último 'seq' recebido. Com 'wait' a chamada "
+        "espera (long-poll) por novas mudanças; com 'Accept: text/event-stream' o feed é "
+        "enviado continuamente via Server-Sent Events (retomada pelo cabeçalho Last-Event-ID)."
+    ),
+    "parameters": [
+        {"name": "since", "in": "query", "type": "integer", "default": 0,
+         "description": "Último 'seq' já processado pelo consumidor."},
+        {"name": "limit", "in": "query", "type": "integer", "default": LIMITE_PADRAO,
+         "description": f"Máximo de mudanças por resposta (máx. {LIMITE_MAXIMO})."},
+        {"name": "wait", "in": "query", "type": "integer", "default": 0,
+         "description": f"Segundos de espera por novidades quando não houver nenhuma (máx. {int(ESPERA_MAXIMA)})."},
+    ],
+    "responses": {
+        200: {"description": "Mudanças após 'since' e o cursor 'next_since'."},
+        400: {"description": "Parâmetros inválidos."}
+    }
+})
+def list_changes():
+    try:
+        since = _ler_inteiro("since", request.headers.get("Last-Event-ID", 0))
+        limite = _ler_inteiro("limit", LIMITE_PADRAO, minimo=1, maximo=LIMITE_MAXIMO)
+        espera = _ler_inteiro("wait", 0, maximo=int(ESPERA_MAXIMA))
+    except ValueError as erro:
+        return jsonify({"error": str(erro)}), 400
+
+    if request.accept_mimetypes.best == "text/event-stream":
+        return _stream_sse(since, limite)
+
+    eventos = _aguardar(since, limite, espera) if espera else _buscar(since, limite)
+    proximo = eventos[-1]["seq"] if eventos else since
+    return jsonify({"items": eventos, "next_since": proximo})
+
+
+def _stream_sse(since, limite):
+    def gerar():
+        ultimo = since
+        ultimo_envio = time.monotonic()
+        yield "retry: 2000\n\n"
+        while True:
+            eventos = _aguardar(ultimo, limite, HEARTBEAT_SSE)
+            for e in eventos:
+                yield f"id: {e['seq']}\nevent: {e['entidade']}.{e['operacao']}\ndata: {json.dumps(e, default=str)}\n\n"
+                ultimo = e["seq"]
+            if eventos:
+                ultimo_envio = time.monotonic()
+            elif time.monotonic() - ultimo_envio >= HEARTBEAT_SSE:
+                # Comentário SSE para manter a conexão viva atrás de proxies
+                yield ": heartbeat\n\n"
+                ultimo_envio = time.monotonic()
+
+    resp = Response(stream_with_context(gerar()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
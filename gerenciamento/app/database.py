@@ -0,0 +1,274 @@
+import os
+import time
+from collections import namedtuple
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.schema import CreateColumn
+
+from common.escolas import Shards, caminho_shard, diretorio_escolas, escola_atual
+from common.metrics import REGISTRO, rota_atual
+
+CONSULTAS = REGISTRO.contador(
+    "db_queries_total", "Consultas SQL executadas, por rota.", ("route",))
+DURACAO_CONSULTA = REGISTRO.histograma(
+    "db_query_duration_seconds", "Duração de cada consulta SQL, por rota.", ("route",))
+CONSULTAS_POR_REQUISICAO = REGISTRO.histograma(
+    "db_queries_per_request", "Consultas SQL por requisição, por rota.", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+
+# Versão do schema gravada em PRAGMA user_version. Aumente sempre que os models
+# mudarem: na inicialização, create_all só roda quando o banco tem outra versão.
+VERSAO_SCHEMA = 3
+
+# Pragmas por perfil. "production" é pensado para leitura concorrente com um
+# único escritor: WAL deixa leitores trabalharem durante as escritas,
+# synchronous=NORMAL é seguro em WAL, cache/mmap maiores evitam I/O nas
+# leituras e o busy_timeout faz o escritor esperar o lock em vez de falhar com
+# "database is locked".
+PERFIS = {
+    "development": {
+        "pragmas": {"foreign_keys": "ON"},
+        "engine": {},
+        "leitura": None,
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -64000,        # ~64 MiB por conexão
+            "mmap_size": 268435456,      # 256 MiB
+            "busy_timeout": 5000,        # ms
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON",
+        },
+        # O SQLite só aceita um escritor por vez: um pool de uma conexão faz
+        # as escritas esperarem na fila do pool (pool_timeout) em vez de
+        # disputarem o lock do arquivo.
+        "engine": {"pool_size": 1, "max_overflow": 0, "pool_timeout": 30},
+        "leitura": {"pool_size": 8, "max_overflow": 8, "pool_timeout": 30},
+    },
+}
+
+
+# Engines do banco de uma escola (ESCOLAS_DIR/<escola>.db)
+ShardEscola = namedtuple("ShardEscola", "caminho escrita leitura")
+
+
+class SessaoRoteada(Session):
+    """Sessão que manda as consultas de requisições somente leitura ao engine de leitura.
+
+    Quando ``session.info["somente_leitura"]`` está ligado e o app tem um engine
+    de leitura, ``get_bind`` devolve esse engine; escritas continuam no engine
+    principal (o único escritor). Em uma requisição com ``X-Escola``, o par de
+    engines é o do shard da escola.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        escola = escola_atual()
+        if escola is not None:
+            shard = current_app.extensions["escolas"].obter(escola)
+            if self.info.get("somente_leitura") and not self._flushing and shard.leitura is not None:
+                return shard.leitura
+            return shard.escrita
+        if self.info.get("somente_leitura") and not self._flushing:
+            leitura = current_app.extensions.get("db_leitura")
+            if leitura is not None:
+                return leitura
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def configurar(app):
+    """Define URI e opções de engine a partir do ambiente; devolve o perfil usado.
+
+    ``DATABASE_URL`` tem prioridade; senão usa ``GERENCIAMENTO_DB`` (caminho do
+    arquivo SQLite). ``DB_PROFILE`` escolhe entre "development" (padrão) e
+    "production".
+    """
+    db_path = os.environ.get("GERENCIAMENTO_DB", os.path.join(os.path.dirname(__file__), "..", "gerenciamento.db"))
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', os.environ.get("DATABASE_URL", f"sqlite:///{db_path}"))
+
+    perfil = os.environ.get("DB_PROFILE", app.config.get("DB_PROFILE", "development"))
+    if perfil not in PERFIS:
+        raise ValueError(f"DB_PROFILE inválido: {perfil!r} (use {', '.join(PERFIS)})")
+    app.config['DB_PROFILE'] = perfil
+
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if _arquivo_sqlite(url):
+        os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+        opcoes = dict(PERFIS[perfil]["engine"])
+        opcoes.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes
+    return perfil
+
+
+def iniciar(app, db):
+    """Aplica os pragmas do perfil e cria o engine somente leitura (chamar após ``db.init_app``)."""
+    perfil = PERFIS[app.config['DB_PROFILE']]
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != "sqlite":
+        return
+
+    with app.app_context():
+        _aplicar_pragmas(db.engine, perfil["pragmas"])
+
+    if perfil["leitura"] and _arquivo_sqlite(url):
+        app.extensions["db_leitura"] = _engine_leitura(os.path.abspath(url.database), perfil)
+
+    # GET/HEAD não escrevem: suas consultas vão para o engine de leitura
+    @app.before_request
+    def _marcar_somente_leitura():
+        if request.method in ("GET", "HEAD"):
+            db.session.info["somente_leitura"] = True
+
+
+def abrir_escolas(app, db, scripts=()):
+    """``Shards`` com os bancos por escola, ou None se ``ESCOLAS_DIR`` não estiver definido.
+
+    Cada shard usa o perfil e as opções de engine do banco principal e recebe
+    o schema (``preparar_schema``) na primeira abertura.
+    """
+    diretorio = diretorio_escolas()
+    if diretorio is None:
+        return None
+    os.makedirs(diretorio, exist_ok=True)
+    perfil = PERFIS[app.config['DB_PROFILE']]
+    opcoes = {**perfil["engine"], **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+
+    def abrir(escola):
+        caminho = os.path.abspath(caminho_shard(diretorio, escola))
+        escrita = create_engine(f"sqlite:///{caminho}", **opcoes)
+        _aplicar_pragmas(escrita, perfil["pragmas"])
+        preparar_schema(db, scripts, engine=escrita)
+        leitura = _engine_leitura(caminho, perfil) if perfil["leitura"] else None
+        return ShardEscola(caminho, escrita, leitura)
+
+    def fechar(shard):
+        shard.escrita.dispose()
+        if shard.leitura is not None:
+            shard.leitura.dispose()
+
+    maximo = int(os.environ.get("ESCOLAS_MAX_ABERTAS", 32))
+    return Shards(abrir, fechar, maximo=maximo, servico="gerenciamento")
+
+
+def preparar_schema(db, scripts=(), engine=None):
+    """Cria tabelas/colunas que faltam, a menos que o banco já esteja em ``VERSAO_SCHEMA``.
+
+    ``scripts`` são DDLs do SQLite fora dos models (índice FTS5, triggers),
+    idempotentes, executados depois do ``create_all``. ``engine`` é o banco a
+    preparar (padrão: o do app). Devolve ``True`` se o schema foi (re)aplicado.
+    """
+    engine = engine if engine is not None else db.engine
+    sqlite = engine.dialect.name == "sqlite"
+    if sqlite:
+        with engine.connect() as conexao:
+            if conexao.exec_driver_sql("PRAGMA user_version").scalar() == VERSAO_SCHEMA:
+                return False
+
+    db.metadata.create_all(engine)
+    completar_colunas(db, engine)
+    if sqlite:
+        with engine.connect() as conexao:
+            # executescript roda vários statements e faz o próprio commit
+            bruta = conexao.connection.driver_connection
+            for script in scripts:
+                bruta.executescript(script)
+            bruta.execute(f"PRAGMA user_version={VERSAO_SCHEMA}")
+    return True
+
+
+def completar_colunas(db, engine=None):
+    """Adiciona a tabelas já existentes as colunas novas que têm ``server_default`` ou aceitam NULL.
+
+    ``create_all`` só cria tabelas que faltam; bancos criados por versões
+    anteriores ganham aqui as colunas acrescentadas depois (ex.: ``versao``,
+    ``capacidade``).
+    """
+    engine = engine if engine is not None else db.engine
+    with engine.begin() as conexao:
+        existentes = inspect(conexao)
+        for tabela in db.metadata.sorted_tables:
+            colunas = {c["name"] for c in existentes.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name not in colunas and (coluna.server_default is not None or coluna.nullable):
+                    ddl = CreateColumn(coluna).compile(dialect=engine.dialect)
+                    conexao.execute(text(f"ALTER TABLE {tabela.name} ADD COLUMN {ddl}"))
+
+
+def somente_leitura(db):
+    """Decorator para rotas POST que só consultam (ex.: lookup em lote).
+
+    A marca ``somente_leitura`` na view também faz o controle de admissão
+    contar a rota como leitura.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            db.session.info["somente_leitura"] = True
+            return view(*args, **kwargs)
+        wrapper.somente_leitura = True
+        return wrapper
+    return decorator
+
+
+def caminho_arquivo(app):
+    """Caminho do arquivo SQLite do app, ou None se o banco não for um arquivo SQLite."""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    return os.path.abspath(url.database) if _arquivo_sqlite(url) else None
+
+
+def caminho_da_requisicao(app):
+    """Arquivo SQLite da escola da requisição (``X-Escola``), ou o banco do app."""
+    escola = escola_atual()
+    if escola is not None:
+        return app.extensions["escolas"].obter(escola).caminho
+    return caminho_arquivo(app)
+
+
+def _engine_leitura(caminho, perfil):
+    leitura = create_engine(f"sqlite:///file:{caminho}?mode=ro&uri=true", **perfil["leitura"])
+    pragmas_leitura = {k: v for k, v in perfil["pragmas"].items() if k not in ("journal_mode", "synchronous")}
+    _aplicar_pragmas(leitura, {**pragmas_leitura, "query_only": "ON"})
+    return leitura
+
+
+def _arquivo_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _aplicar_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def _pragmas(conexao, _registro):
+        cursor = conexao.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+        cursor.close()
+
+
+def instrumentar_consultas(app):
+    """Conta e mede as consultas SQL de cada requisição (métricas em ``/metrics``)."""
+
+    @app.after_request
+    def _consultas_da_requisicao(resposta):
+        CONSULTAS_POR_REQUISICAO.observar(g.pop("_consultas_sql", 0), route=rota_atual())
+        return resposta
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _inicio_consulta(conexao, _cursor, _sql, _params, _contexto, _executemany):
+    conexao.info.setdefault("_inicio_consulta", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _fim_consulta(conexao, _cursor, _sql, _params, _contexto, _executemany):
+    duracao = time.perf_counter() - conexao.info["_inicio_consulta"].pop()
+    if not has_request_context():
+        return
+    rota = rota_atual()
+    CONSULTAS.inc(route=rota)
+    DURACAO_CONSULTA.observar(duracao, route=rota)
+    g._consultas_sql = g.get("_consultas_sql", 0) + 1
@@ -0,0 +1,67 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import text
+
+from common.openapi import swag_from
+from common.reconciliacao import dividir, montar_baldes, sql_resumo
+
+from . import db
+from .models import Aluno, Professor, Turma
+from .pagination import ParametroInvalido
+
+bp = Blueprint("digest", __name__)
+
+ENTIDADES = {"alunos": Aluno, "professores": Professor, "turmas": Turma}
+MAX_BALDES = 256
+
+
+@bp.errorhandler(ParametroInvalido)
+def parametro_invalido(erro):
+    return jsonify({"error": str(erro)}), 400
+
+
+def _inteiro(nome, padrao=None):
+    valor = request.args.get(nome, padrao)
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido(f"O parâmetro '{nome}' deve ser um inteiro")
+    if valor < 0:
+        raise ParametroInvalido(f"O parâmetro '{nome}' não pode ser negativo")
+    return valor
+
+
+@bp.get("/<any(alunos, professores, turmas):entidade>/digest")
+@swag_from({
+    "tags": ["Reconciliação"],
+    "description": (
+        "Resumo dos IDs existentes em baldes de [inicio, fim): quantidade e soma de um hash de 32 bits "
+        "por ID. Usado pela reconciliação de Reservas e Atividades para achar referências órfãs "
+        "descendo só nas faixas que mudaram."
+    ),
+    "parameters": [
+        {"name": "entidade", "in": "path", "type": "string", "required": True,
+         "enum": list(ENTIDADES)},
+        {"name": "inicio", "in": "query", "type": "integer", "required": True},
+        {"name": "fim", "in": "query", "type": "integer", "required": True},
+        {"name": "baldes", "in": "query", "type": "integer", "default": 16,
+         "description": f"Número de faixas (máx. {MAX_BALDES})."},
+    ],
+    "responses": {
+        200: {"description": "Lista de {inicio, fim, total, hash}, um item por balde (inclusive vazios)."},
+        400: {"description": "Parâmetros inválidos."}
+    }
+})
+def digest(entidade):
+    inicio, fim = _inteiro("inicio"), _inteiro("fim")
+    baldes = _inteiro("baldes", 16)
+    if fim <= inicio:
+        raise ParametroInvalido("O parâmetro 'fim' deve ser maior que 'inicio'")
+    if not 1 <= baldes <= MAX_BALDES:
+        raise ParametroInvalido(f"O parâmetro 'baldes' deve estar entre 1 e {MAX_BALDES}")
+
+    largura, _ = dividir(inicio, fim, baldes)
+    tabela = ENTIDADES[entidade].__tablename__
+    linhas = db.session.execute(
+        text(sql_resumo(tabela, "id")), {"inicio": inicio, "fim": fim, "largura": largura}
+    ).mappings().all()
+    return jsonify({"baldes": montar_baldes(inicio, fim, baldes, linhas)})
@@ -1,20 +1,63 @@
+import uuid
+from datetime import datetime, timezone
+
 from . import db
 
+
+def nova_versao(_atual=None):
+    """Gera a versão de uma linha, trocada a cada INSERT/UPDATE (vira o ETag).
+
+    Um valor aleatório em vez de um contador: se um id for reaproveitado depois
+    de uma remoção, a versão da linha nova nunca coincide com a da antiga.
+    """
+    return uuid.uuid4().hex
+
+
+def _coluna_versao():
+    return db.Column(db.String(32), nullable=False, default=nova_versao, server_default="0")
+
+
+def _versionado(coluna):
+    return {"version_id_col": coluna, "version_id_generator": nova_versao}
+
+
 class Aluno(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(120), nullable=False)
+    nome = db.Column(db.String(120), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    versao = _coluna_versao()
+    __mapper_args__ = _versionado(versao)
 
 class Professor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(120), nullable=False)
+    nome = db.Column(db.String(120), nullable=False, index=True)
     idade = db.Column(db.Integer, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    materia = db.Column(db.String(120), nullable=False)
+    materia = db.Column(db.String(120), nullable=False, index=True)
     observacoes = db.Column(db.Text)
+    versao = _coluna_versao()
+    __mapper_args__ = _versionado(versao)
 
 class Turma(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(120), nullable=False)
+    nome = db.Column(db.String(120), nullable=False, index=True)
     descricao = db.Column(db.String(255), nullable=True)
-    
\ No newline at end of file
+    capacidade = db.Column(db.Integer, nullable=True)  # vagas; None = sem limite
+    versao = _coluna_versao()
+    __mapper_args__ = _versionado(versao)
+
+
+class Mudanca(db.Model):
+    """Outbox append-only das alterações em Aluno, Professor e Turma.
+
+    ``seq`` é monotônico (AUTOINCREMENT nunca reaproveita valores) e serve de
+    cursor para o feed em ``GET /api/changes?since=N``.
+    """
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = db.Column(db.Integer, primary_key=True)
+    entidade = db.Column(db.String(20), nullable=False)
+    entidade_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(10), nullable=False)
+    dados = db.Column(db.JSON)
+    criado_em = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
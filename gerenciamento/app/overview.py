@@ -0,0 +1,133 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, jsonify
+
+from common.cache import SingleFlight, TTLCache
+from common.escolas import escola_atual
+from common.metrics import REGISTRO
+from common.openapi import swag_from
+from common.servico_client import ServicoClient, ServicoIndisponivel
+
+from . import db
+from .database import somente_leitura
+from .models import Aluno, Professor, Turma
+from .serializers import serializar
+
+bp = Blueprint("overview", __name__)
+
+OVERVIEWS = REGISTRO.contador(
+    "overview_requests_total", "Visões gerais de turma, por origem da resposta (cache, coalesced, fan-out).",
+    ("result",))
+
+# Um IN (...) por tabela, dividido abaixo do limite de variáveis do SQLite
+TAMANHO_LOTE_IN = 10000
+
+
+def configurar_overview(app):
+    """Clientes de Reservas e Atividades, cache curto e single-flight da visão geral de turma."""
+    app.extensions["overview"] = {
+        "reservas": ServicoClient("reservas", "http://reservas:5002"),
+        "atividades": ServicoClient("atividades", "http://atividades:5003"),
+        # Reservas e Atividades são consultados em paralelo
+        "executor": ThreadPoolExecutor(max_workers=int(os.environ.get("SERVICOS_POOL", 20)),
+                                       thread_name_prefix="overview"),
+        "cache": TTLCache(tamanho=int(os.environ.get("OVERVIEW_CACHE_TAMANHO", 1000)),
+                          ttl=float(os.environ.get("OVERVIEW_CACHE_TTL", 2.0))),
+        "voo": SingleFlight(),
+    }
+
+
+def _por_id(model, ids):
+    encontrados = {}
+    ordenados = sorted(ids)
+    for i in range(0, len(ordenados), TAMANHO_LOTE_IN):
+        lote = ordenados[i:i + TAMANHO_LOTE_IN]
+        encontrados.update((obj.id, serializar(obj)) for obj in model.query.filter(model.id.in_(lote)))
+    return encontrados
+
+
+def _montar(turma_id, escola):
+    """Faz o fan-out: Reservas e Atividades em paralelo, depois alunos e professores em lote."""
+    turma = db.session.get(Turma, turma_id)
+    if turma is None:
+        return None
+    turma = serializar(turma)
+    # Devolve a conexão ao pool antes de esperar Reservas e Atividades: com eles
+    # lentos, o fan-out não prende as conexões de leitura das outras requisições
+    db.session.rollback()
+
+    recursos = current_app.extensions["overview"]
+    filtros = {"turma_id": turma_id}
+    futuros = {
+        nome: recursos["executor"].submit(recursos[nome].listar, f"/{nome}", filtros, escola)
+        for nome in ("reservas", "atividades")
+    }
+    listas, indisponiveis = {}, {}
+    for nome, futuro in futuros.items():
+        try:
+            listas[nome] = futuro.result()
+        except ServicoIndisponivel as erro:
+            listas[nome], indisponiveis[nome] = [], str(erro)
+
+    alunos = _por_id(Aluno, {r["aluno_id"] for r in listas["reservas"]})
+    professores = _por_id(Professor, {a["professor_id"] for a in listas["atividades"]})
+
+    ocupadas = len(listas["reservas"])
+    return {
+        "turma": turma,
+        "reservas": None if "reservas" in indisponiveis else [
+            {"id": r["id"], "aluno": alunos.get(r["aluno_id"], {"id": r["aluno_id"]})} for r in listas["reservas"]
+        ],
+        "atividades": None if "atividades" in indisponiveis else [
+            {**{k: a[k] for k in ("id", "titulo", "descricao")},
+             "professor": professores.get(a["professor_id"], {"id": a["professor_id"]})}
+            for a in listas["atividades"]
+        ],
+        "totais": {
+            "reservas": None if "reservas" in indisponiveis else ocupadas,
+            "atividades": None if "atividades" in indisponiveis else len(listas["atividades"]),
+            "vagas_livres": (max(turma["capacidade"] - ocupadas, 0)
+                             if turma.get("capacidade") is not None and "reservas" not in indisponiveis else None),
+        },
+        "indisponiveis": indisponiveis,
+    }
+
+
+@bp.get("/turmas/<int:turma_id>/overview")
+@swag_from({
+    "tags": ["Turmas"],
+    "description": (
+        "Visão geral da turma para a página da turma: a turma, as reservas com os dados de cada aluno e "
+        "as atividades com os dados de cada professor. Reservas e Atividades são consultados em paralelo; "
+        "alunos e professores são buscados em lote (uma consulta por tabela). Requisições iguais simultâneas são atendidas por "
+        "um só fan-out, e a resposta fica em cache por OVERVIEW_CACHE_TTL segundos."
+    ),
+    "parameters": [{"name": "turma_id", "in": "path", "type": "integer", "required": True}],
+    "responses": {
+        200: {"description": "Visão geral. Se Reservas ou Atividades não responder, a parte dele vem null "
+                             "e o motivo em 'indisponiveis'."},
+        404: {"description": "Turma não encontrada."}
+    }
+})
+@somente_leitura(db)
+def turma_overview(turma_id):
+    recursos = current_app.extensions["overview"]
+    chave = (escola_atual(), turma_id)
+    visao = recursos["cache"].get(chave)
+    if visao is not None:
+        OVERVIEWS.inc(result="cache")
+        return jsonify(visao)
+
+    def montar():
+        visao = _montar(turma_id, chave[0])
+        # Uma resposta parcial não é guardada: a próxima requisição tenta de novo
+        if visao is not None and not visao["indisponiveis"]:
+            recursos["cache"].set(chave, visao)
+        return visao
+
+    visao, compartilhada = recursos["voo"].executar(chave, montar)
+    OVERVIEWS.inc(result="coalesced" if compartilhada else "fan_out")
+    if visao is None:
+        return jsonify({"error": "Turma não encontrada"}), 404
+    return jsonify(visao)
@@ -0,0 +1,122 @@
+import base64
+import json
+import sys
+
+from sqlalchemy import and_, or_
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+# Ordenações aceitas em ?sort=. Sempre desempatamos por id para que a ordem
+# seja estável e o cursor aponte para uma posição única.
+ORDENACOES = ("id", "-id", "nome", "-nome")
+
+# Faixa do INTEGER do SQLite; fora dela o driver levanta OverflowError
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class ParametroInvalido(ValueError):
+    """Erro de parâmetro de consulta (vira um 400 nas rotas)."""
+
+
+def ler_limite(args):
+    valor = args.get("limit", LIMITE_PADRAO)
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido("O parâmetro 'limit' deve ser um inteiro")
+    if limite < 1:
+        raise ParametroInvalido("O parâmetro 'limit' deve ser maior que zero")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def ler_ordenacao(args):
+    sort = args.get("sort", "id")
+    if sort not in ORDENACOES:
+        raise ParametroInvalido(f"O parâmetro 'sort' deve ser um de: {', '.join(ORDENACOES)}")
+    return sort
+
+
+def codificar_cursor(sort, chave):
+    bruto = json.dumps([sort, chave], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor, sort):
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        cursor_sort, chave = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (ValueError, TypeError):
+        raise ParametroInvalido("Cursor 'after' inválido")
+    if cursor_sort != sort:
+        raise ParametroInvalido("O cursor 'after' foi gerado com outra ordenação")
+    return chave
+
+
+def filtro_prefixo(coluna, prefixo):
+    """Filtro de prefixo como intervalo [prefixo, prefixo+1), que usa o índice da coluna.
+
+    Um ``LIKE 'x%'`` não usa índice no SQLite (o LIKE é case-insensitive por
+    padrão), por isso comparamos por faixa.
+    """
+    # Caracteres no último code point (U+10FFFF) não têm sucessor: o limite sai
+    # do caractere anterior. Só com eles, não há limite superior.
+    base = prefixo.rstrip(chr(sys.maxunicode))
+    if not base:
+        return coluna >= prefixo
+    proximo = ord(base[-1]) + 1
+    if 0xD800 <= proximo <= 0xDFFF:
+        proximo = 0xE000  # surrogates não existem em UTF-8
+    return and_(coluna >= prefixo, coluna < base[:-1] + chr(proximo))
+
+
+def paginar(query, model, args):
+    """Aplica ordenação, cursor (keyset) e limite a ``query``.
+
+    Retorna ``(itens, proximo_cursor)``. Busca ``limit + 1`` linhas para saber
+    se existe próxima página sem precisar de um ``COUNT``.
+    """
+    limite = ler_limite(args)
+    sort = ler_ordenacao(args)
+    decrescente = sort.startswith("-")
+    campo = sort.lstrip("-")
+
+    id_col = model.id
+    if campo == "id":
+        colunas = (id_col,)
+    else:
+        colunas = (getattr(model, campo), id_col)
+
+    cursor = args.get("after")
+    if cursor:
+        chave = decodificar_cursor(cursor, sort)
+        if (not isinstance(chave, list) or len(chave) != len(colunas)
+                or not all(map(_valor_do_tipo, colunas, chave))):
+            raise ParametroInvalido("Cursor 'after' inválido")
+        query = query.filter(_depois_de(colunas, chave, decrescente))
+
+    ordem = [c.desc() if decrescente else c.asc() for c in colunas]
+    linhas = query.order_by(*ordem).limit(limite + 1).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultimo = linhas[-1]
+        proximo = codificar_cursor(sort, [getattr(ultimo, c.key) for c in colunas])
+    return linhas, proximo
+
+
+def _valor_do_tipo(coluna, valor):
+    # O cursor vem do cliente: só valores do tipo da coluna chegam ao SQL
+    if coluna.type.python_type is int:
+        return type(valor) is int and INT64_MIN <= valor <= INT64_MAX
+    return isinstance(valor, coluna.type.python_type)
+
+
+def _depois_de(colunas, chave, decrescente):
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    comparar = (lambda c, v: c < v) if decrescente else (lambda c, v: c > v)
+    if len(colunas) == 1:
+        return comparar(colunas[0], chave[0])
+    (c1, c2), (v1, v2) = colunas, chave
+    return or_(comparar(c1, v1), and_(c1 == v1, comparar(c2, v2)))
@@ -1,10 +1,43 @@
 from flask import Blueprint, request, jsonify
-from flasgger.utils import swag_from
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from common.openapi import swag_from
 from . import db
+from .database import somente_leitura
 from .models import Aluno
+from .pagination import ParametroInvalido, filtro_prefixo, paginar
+from .serializers import etag_lista, ler_campos, projetar, responder, responder_item, serializar
 
 bp = Blueprint("gerenciamento", __name__)
 
+
+@bp.errorhandler(ParametroInvalido)
+def parametro_invalido(erro):
+    return jsonify({"error": str(erro)}), 400
+
+
+@bp.errorhandler(StaleDataError)
+def versao_desatualizada(_erro):
+    # A linha mudou (ou foi removida) entre a leitura e o UPDATE desta requisição
+    db.session.rollback()
+    return jsonify({"error": "O registro foi alterado por outra requisição; tente novamente."}), 409
+
+
+# Projeção: só as colunas pedidas entram no SELECT
+PARAMETRO_CAMPOS = {"name": "fields", "in": "query", "type": "string",
+                    "description": "Campos a devolver, separados por vírgula (ex.: id,nome)."}
+
+# Parâmetros comuns às listagens paginadas
+PARAMETROS_PAGINACAO = [
+    {"name": "limit", "in": "query", "type": "integer", "default": 100,
+     "description": "Quantidade máxima de itens por página (máx. 1000)."},
+    {"name": "after", "in": "query", "type": "string",
+     "description": "Cursor devolvido em 'next_cursor' pela página anterior."},
+    {"name": "sort", "in": "query", "type": "string", "enum": ["id", "-id", "nome", "-nome"],
+     "default": "id", "description": "Ordenação (prefixo '-' para decrescente)."},
+    PARAMETRO_CAMPOS,
+]
+
 # -----------------------
 # CREATE (POST)
 # -----------------------
@@ -42,7 +75,7 @@ def create_aluno():
     aluno = Aluno(nome=nome, email=email)
     db.session.add(aluno)
     db.session.commit()
-    return jsonify({"id": aluno.id, "nome": aluno.nome, "email": aluno.email}), 201
+    return responder_item(aluno, 201)
 
 
 # -----------------------
@@ -51,13 +84,30 @@ def create_aluno():
 @bp.get("/alunos")
 @swag_from({
     "tags": ["Alunos"],
-    "description": "Lista todos os alunos cadastrados.",
-    "responses": {200: {"description": "Lista de alunos."}}
+    "description": "Lista os alunos cadastrados, paginados por cursor.",
+    "parameters": PARAMETROS_PAGINACAO + [
+        {"name": "email", "in": "query", "type": "string", "description": "Filtra pelo e-mail exato."},
+        {"name": "nome", "in": "query", "type": "string", "description": "Filtra pelo prefixo do nome."},
+    ],
+    "responses": {
+        200: {"description": "Página de alunos e cursor da próxima página."},
+        304: {"description": "Nada mudou desde o ETag enviado em If-None-Match."},
+        400: {"description": "Parâmetros inválidos."}
+    }
 })
 def get_alunos():
-    alunos = Aluno.query.all()
-    result = [{"id": a.id, "nome": a.nome, "email": a.email} for a in alunos]
-    return jsonify(result)
+    query = Aluno.query
+    if request.args.get("email"):
+        query = query.filter(Aluno.email == request.args["email"])
+    if request.args.get("nome"):
+        query = query.filter(filtro_prefixo(Aluno.nome, request.args["nome"]))
+
+    campos = ler_campos(Aluno, request.args)
+
+    def pagina():
+        alunos, proximo = paginar(projetar(query, Aluno, campos, request.args), Aluno, request.args)
+        return {"items": [serializar(x, campos) for x in alunos], "next_cursor": proximo}
+    return responder(etag_lista(Aluno), pagina)
 
 
 # -----------------------
@@ -67,14 +117,15 @@ def get_alunos():
 @swag_from({
     "tags": ["Alunos"],
     "description": "Busca um aluno pelo ID.",
-    "parameters": [{"name": "aluno_id", "in": "path", "type": "integer", "required": True}],
-    "responses": {200: {"description": "Aluno encontrado."}, 404: {"description": "Aluno não encontrado."}}
+    "parameters": [{"name": "aluno_id", "in": "path", "type": "integer", "required": True}, PARAMETRO_CAMPOS],
+    "responses": {200: {"description": "Aluno encontrado."}, 304: {"description": "Não modificado (If-None-Match)."}, 404: {"description": "Aluno não encontrado."}}
 })
 def get_aluno(aluno_id):
-    aluno = Aluno.query.get(aluno_id)
+    campos = ler_campos(Aluno, request.args)
+    aluno = projetar(Aluno.query, Aluno, campos).get(aluno_id)
     if not aluno:
         return jsonify({"error": "Aluno não encontrado"}), 404
-    return jsonify({"id": aluno.id, "nome": aluno.nome, "email": aluno.email})
+    return responder_item(aluno, campos=campos)
 
 
 # -----------------------
@@ -110,7 +161,7 @@ def update_aluno(aluno_id):
     aluno.email = data.get("email", aluno.email)
     db.session.commit()
 
-    return jsonify({"id": aluno.id, "nome": aluno.nome, "email": aluno.email})
+    return responder_item(aluno)
 
 
 # -----------------------
@@ -176,10 +227,6 @@ def create_professor():
     if not all([nome, idade, email, materia]):
         return jsonify({"error": "Campos 'nome', 'idade', 'email' e 'materia' são obrigatórios"}), 400
 
-    # Evita duplicar e-mails
-    if Professor.query.filter_by(email=email).first():
-        return jsonify({"error": "Já existe um professor com este e-mail."}), 400
-
     prof = Professor(
         nome=nome,
         idade=idade,
@@ -188,36 +235,47 @@ def create_professor():
         observacoes=observacoes
     )
     db.session.add(prof)
-    db.session.commit()
+    # Evita duplicar e-mails: a restrição UNIQUE já garante, sem consulta extra
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Já existe um professor com este e-mail."}), 400
 
-    return jsonify({
-        "id": prof.id,
-        "nome": prof.nome,
-        "idade": prof.idade,
-        "email": prof.email,
-        "materia": prof.materia,
-        "observacoes": prof.observacoes
-    }), 201
+    return responder_item(prof, 201)
 
 
 # READ (GET ALL)
 @bp.get("/professores")
 @swag_from({
     "tags": ["Professores"],
-    "description": "Lista todos os professores cadastrados.",
-    "responses": {200: {"description": "Lista de professores."}}
+    "description": "Lista os professores cadastrados, paginados por cursor.",
+    "parameters": PARAMETROS_PAGINACAO + [
+        {"name": "email", "in": "query", "type": "string", "description": "Filtra pelo e-mail exato."},
+        {"name": "nome", "in": "query", "type": "string", "description": "Filtra pelo prefixo do nome."},
+        {"name": "materia", "in": "query", "type": "string", "description": "Filtra pela matéria."},
+    ],
+    "responses": {
+        200: {"description": "Página de professores e cursor da próxima página."},
+        304: {"description": "Nada mudou desde o ETag enviado em If-None-Match."},
+        400: {"description": "Parâmetros inválidos."}
+    }
 })
 def list_professores():
-    professores = Professor.query.all()
-    result = [{
-        "id": p.id,
-        "nome": p.nome,
-        "idade": p.idade,
-        "email": p.email,
-        "materia": p.materia,
-        "observacoes": p.observacoes
-    } for p in professores]
-    return jsonify(result)
+    query = Professor.query
+    if request.args.get("email"):
+        query = query.filter(Professor.email == request.args["email"])
+    if request.args.get("nome"):
+        query = query.filter(filtro_prefixo(Professor.nome, request.args["nome"]))
+    if request.args.get("materia"):
+        query = query.filter(Professor.materia == request.args["materia"])
+
+    campos = ler_campos(Professor, request.args)
+
+    def pagina():
+        professores, proximo = paginar(projetar(query, Professor, campos, request.args), Professor, request.args)
+        return {"items": [serializar(x, campos) for x in professores], "next_cursor": proximo}
+    return responder(etag_lista(Professor), pagina)
 
 
 # READ (GET BY ID)
@@ -225,24 +283,19 @@ def list_professores():
 @swag_from({
     "tags": ["Professores"],
     "description": "Busca um professor pelo ID.",
-    "parameters": [{"name": "prof_id", "in": "path", "type": "integer", "required": True}],
+    "parameters": [{"name": "prof_id", "in": "path", "type": "integer", "required": True}, PARAMETRO_CAMPOS],
     "responses": {
         200: {"description": "Professor encontrado."},
+        304: {"description": "Não modificado (If-None-Match)."},
         404: {"description": "Professor não encontrado."}
     }
 })
 def get_professor(prof_id):
-    prof = Professor.query.get(prof_id)
+    campos = ler_campos(Professor, request.args)
+    prof = projetar(Professor.query, Professor, campos).get(prof_id)
     if not prof:
         return jsonify({"error": "Professor não encontrado"}), 404
-    return jsonify({
-        "id": prof.id,
-        "nome": prof.nome,
-        "idade": prof.idade,
-        "email": prof.email,
-        "materia": prof.materia,
-        "observacoes": prof.observacoes
-    })
+    return responder_item(prof, campos=campos)
 
 
 # UPDATE (PUT)
@@ -285,14 +338,7 @@ def update_professor(prof_id):
     prof.observacoes = data.get("observacoes", prof.observacoes)
 
     db.session.commit()
-    return jsonify({
-        "id": prof.id,
-        "nome": prof.nome,
-        "idade": prof.idade,
-        "email": prof.email,
-        "materia": prof.materia,
-        "observacoes": prof.observacoes
-    })
+    return responder_item(prof)
 
 
 # DELETE
@@ -320,6 +366,21 @@ def delete_professor(prof_id):
 
 from .models import Turma
 
+
+def ler_capacidade(dados):
+    """Lê ``capacidade`` (vagas da turma): inteiro não negativo, ou ausente/null para sem limite."""
+    valor = dados.get("capacidade")
+    if isinstance(valor, str):
+        valor = valor.strip() or None  # CSV do cadastro em lote
+        if valor is not None and valor.isdigit():
+            valor = int(valor)
+    if valor is None:
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < 0:
+        raise ValueError("O campo capacidade deve ser um inteiro não negativo")
+    return valor
+
+
 # CREATE (POST)
 @bp.post("/turmas")
 @swag_from({
@@ -333,13 +394,14 @@ from .models import Turma
                 "type": "object",
                 "properties": {
                     "nome": {"type": "string"},
-                    "descricao": {"type": "string"}
+                    "descricao": {"type": "string"},
+                    "capacidade": {"type": "integer", "minimum": 0, "description": "Vagas; omitido ou null = sem limite."}
                 },
                 "required": ["nome"]
             }
         }
     ],
-    "responses": {201: {"description": "Turma criada com sucesso."}}
+    "responses": {201: {"description": "Turma criada com sucesso."}, 400: {"description": "Dados inválidos."}}
 })
 def create_turma():
     data = request.get_json() or {}
@@ -348,24 +410,42 @@ def create_turma():
 
     if not nome:
         return jsonify({"error": "O campo nome é obrigatório"}), 400
+    try:
+        capacidade = ler_capacidade(data)
+    except ValueError as erro:
+        return jsonify({"error": str(erro)}), 400
 
-    turma = Turma(nome=nome, descricao=descricao)
+    turma = Turma(nome=nome, descricao=descricao, capacidade=capacidade)
     db.session.add(turma)
     db.session.commit()
-    return jsonify({"id": turma.id, "nome": turma.nome, "descricao": turma.descricao}), 201
+    return responder_item(turma, 201)
 
 
 # READ (GET ALL)
 @bp.get("/turmas")
 @swag_from({
     "tags": ["Turmas"],
-    "description": "Lista todas as turmas cadastradas.",
-    "responses": {200: {"description": "Lista de turmas."}}
+    "description": "Lista as turmas cadastradas, paginadas por cursor.",
+    "parameters": PARAMETROS_PAGINACAO + [
+        {"name": "nome", "in": "query", "type": "string", "description": "Filtra pelo prefixo do nome."},
+    ],
+    "responses": {
+        200: {"description": "Página de turmas e cursor da próxima página."},
+        304: {"description": "Nada mudou desde o ETag enviado em If-None-Match."},
+        400: {"description": "Parâmetros inválidos."}
+    }
 })
 def list_turmas():
-    turmas = Turma.query.all()
-    result = [{"id": t.id, "nome": t.nome, "descricao": t.descricao} for t in turmas]
-    return jsonify(result)
+    query = Turma.query
+    if request.args.get("nome"):
+        query = query.filter(filtro_prefixo(Turma.nome, request.args["nome"]))
+
+    campos = ler_campos(Turma, request.args)
+
+    def pagina():
+        turmas, proximo = paginar(projetar(query, Turma, campos, request.args), Turma, request.args)
+        return {"items": [serializar(x, campos) for x in turmas], "next_cursor": proximo}
+    return responder(etag_lista(Turma), pagina)
 
 
 # READ (GET BY ID)
@@ -373,14 +453,15 @@ def list_turmas():
 @swag_from({
     "tags": ["Turmas"],
     "description": "Busca uma turma pelo ID.",
-    "parameters": [{"name": "turma_id", "in": "path", "type": "integer", "required": True}],
-    "responses": {200: {"description": "Turma encontrada."}, 404: {"description": "Turma não encontrada."}}
+    "parameters": [{"name": "turma_id", "in": "path", "type": "integer", "required": True}, PARAMETRO_CAMPOS],
+    "responses": {200: {"description": "Turma encontrada."}, 304: {"description": "Não modificada (If-None-Match)."}, 404: {"description": "Turma não encontrada."}}
 })
 def get_turma(turma_id):
-    turma = Turma.query.get(turma_id)
+    campos = ler_campos(Turma, request.args)
+    turma = projetar(Turma.query, Turma, campos).get(turma_id)
     if not turma:
         return jsonify({"error": "Turma não encontrada"}), 404
-    return jsonify({"id": turma.id, "nome": turma.nome, "descricao": turma.descricao})
+    return responder_item(turma, campos=campos)
 
 
 # UPDATE (PUT)
@@ -397,12 +478,13 @@ def get_turma(turma_id):
                 "type": "object",
                 "properties": {
                     "nome": {"type": "string"},
-                    "descricao": {"type": "string"}
+                    "descricao": {"type": "string"},
+                    "capacidade": {"type": "integer", "minimum": 0, "description": "Vagas; null = sem limite."}
                 }
             }
         }
     ],
-    "responses": {200: {"description": "Turma atualizada."}, 404: {"description": "Turma não encontrada."}}
+    "responses": {200: {"description": "Turma atualizada."}, 400: {"description": "Dados inválidos."}, 404: {"description": "Turma não encontrada."}}
 })
 def update_turma(turma_id):
     turma = Turma.query.get(turma_id)
@@ -412,9 +494,14 @@ def update_turma(turma_id):
     data = request.get_json() or {}
     turma.nome = data.get("nome", turma.nome)
     turma.descricao = data.get("descricao", turma.descricao)
+    if "capacidade" in data:
+        try:
+            turma.capacidade = ler_capacidade(data)
+        except ValueError as erro:
+            return jsonify({"error": str(erro)}), 400
     db.session.commit()
 
-    return jsonify({"id": turma.id, "nome": turma.nome, "descricao": turma.descricao})
+    return responder_item(turma)
 
 
 # DELETE
@@ -435,6 +522,75 @@ def delete_turma(turma_id):
     return "", 204
 
 
+# -----------------------
+# LOOKUP EM LOTE
+# -----------------------
+
+ENTIDADES_LOOKUP = {"alunos": Aluno, "professores": Professor, "turmas": Turma}
+MAX_IDS_LOOKUP = 50000
+# Um único IN (...) por tabela no caso comum; listas maiores são divididas
+# para ficar abaixo do limite de variáveis por statement do SQLite (32766)
+TAMANHO_LOTE_IN = 10000
+
+
+@bp.post("/lookup")
+@swag_from({
+    "tags": ["Lookup"],
+    "description": (
+        "Verifica em uma única chamada quais IDs de alunos, professores e turmas existem. "
+        "Para turmas, devolve também a capacidade das encontradas ('capacidade', por id; null = sem limite)."
+    ),
+    "parameters": [
+        {
+            "name": "body",
+            "in": "body",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "alunos": {"type": "array", "items": {"type": "integer"}, "example": [1, 2]},
+                    "professores": {"type": "array", "items": {"type": "integer"}, "example": [1]},
+                    "turmas": {"type": "array", "items": {"type": "integer"}, "example": [3]}
+                }
+            }
+        }
+    ],
+    "responses": {
+        200: {"description": "IDs encontrados ('found') e ausentes ('missing') por entidade."},
+        400: {"description": "Erro de dados inválidos."}
+    }
+})
+@somente_leitura(db)
+def lookup():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Corpo deve ser um objeto JSON"}), 400
+
+    desconhecidas = set(data) - set(ENTIDADES_LOOKUP)
+    if desconhecidas:
+        return jsonify({"error": f"Entidades desconhecidas: {', '.join(sorted(desconhecidas))}"}), 400
+
+    pedidos = {}
+    for nome, ids in data.items():
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({"error": f"'{nome}' deve ser uma lista de inteiros"}), 400
+        pedidos[nome] = set(ids)
+    if sum(len(ids) for ids in pedidos.values()) > MAX_IDS_LOOKUP:
+        return jsonify({"error": f"Máximo de {MAX_IDS_LOOKUP} IDs por chamada"}), 400
+
+    result = {}
+    for nome, ids in pedidos.items():
+        model = ENTIDADES_LOOKUP[nome]
+        colunas = (model.id, model.capacidade) if model is Turma else (model.id,)
+        encontrados = {}
+        ordenados = sorted(ids)
+        for i in range(0, len(ordenados), TAMANHO_LOTE_IN):
+            lote = ordenados[i:i + TAMANHO_LOTE_IN]
+            linhas = db.session.query(*colunas).filter(model.id.in_(lote)).all()
+            encontrados.update((linha.id, linha) for linha in linhas)
+        result[nome] = {"found": sorted(encontrados), "missing": sorted(ids - encontrados.keys())}
+        if model is Turma:
+            result[nome]["capacidade"] = {str(i): linha.capacidade for i, linha in encontrados.items()}
+    return jsonify(result)
 
 
 # -----------------------
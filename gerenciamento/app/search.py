@@ -0,0 +1,168 @@
+import re
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import text
+
+from common.openapi import swag_from
+
+from . import db
+from .pagination import ParametroInvalido, codificar_cursor, decodificar_cursor
+
+bp = Blueprint("search", __name__)
+
+# Alunos e professores dividem um índice FTS5; o rowid codifica a origem
+# (id * 2 + tipo), então os triggers atualizam/removem pela chave, sem varrer o índice.
+TIPOS = {"alunos": 0, "professores": 1}
+NOMES_TIPO = {v: k for k, v in TIPOS.items()}
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+# A paginação para nos JANELA_RANKING resultados mais relevantes; além disso, refine a busca.
+JANELA_RANKING = 500
+# O bm25 é calculado para no máximo JANELA_CANDIDATOS correspondências, as de
+# rowid mais alto (cadastros mais recentes). Até esse número, a ordem é exata.
+# Num prefixo comum, ordenar tudo custa em torno de 1,5 µs por linha (~120 ms
+# para "an" com 84 mil correspondências em 300 mil cadastros); com a janela, ~9 ms.
+JANELA_CANDIDATOS = 5000
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS busca USING fts5(
+    nome, email, materia,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3 4'
+);
+INSERT INTO busca (rowid, nome, email, materia)
+    SELECT id * 2, nome, email, NULL FROM aluno WHERE NOT EXISTS (SELECT 1 FROM busca)
+    UNION ALL
+    SELECT id * 2 + 1, nome, email, materia FROM professor WHERE NOT EXISTS (SELECT 1 FROM busca);
+
+CREATE TRIGGER IF NOT EXISTS tg_busca_aluno_insert AFTER INSERT ON aluno BEGIN
+    INSERT INTO busca (rowid, nome, email) VALUES (NEW.id * 2, NEW.nome, NEW.email);
+END;
+CREATE TRIGGER IF NOT EXISTS tg_busca_aluno_update AFTER UPDATE OF nome, email ON aluno BEGIN
+    UPDATE busca SET nome = NEW.nome, email = NEW.email WHERE rowid = OLD.id * 2;
+END;
+CREATE TRIGGER IF NOT EXISTS tg_busca_aluno_delete AFTER DELETE ON aluno BEGIN
+    DELETE FROM busca WHERE rowid = OLD.id * 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tg_busca_professor_insert AFTER INSERT ON professor BEGIN
+    INSERT INTO busca (rowid, nome, email, materia) VALUES (NEW.id * 2 + 1, NEW.nome, NEW.email, NEW.materia);
+END;
+CREATE TRIGGER IF NOT EXISTS tg_busca_professor_update AFTER UPDATE OF nome, email, materia ON professor BEGIN
+    UPDATE busca SET nome = NEW.nome, email = NEW.email, materia = NEW.materia WHERE rowid = OLD.id * 2 + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tg_busca_professor_delete AFTER DELETE ON professor BEGIN
+    DELETE FROM busca WHERE rowid = OLD.id * 2 + 1;
+END;
+"""
+
+# Pesos do bm25 por coluna: nome, email, materia
+CONSULTA = """
+SELECT rowid, nome, email, materia FROM (
+    SELECT rowid, nome, email, materia, bm25(busca, 10.0, 5.0, 2.0) AS pontuacao
+    FROM busca
+    WHERE busca MATCH :consulta {filtro}
+    ORDER BY rowid DESC
+    LIMIT :candidatos
+)
+ORDER BY pontuacao, rowid
+LIMIT :limite OFFSET :deslocamento
+"""
+
+
+@bp.errorhandler(ParametroInvalido)
+def parametro_invalido(erro):
+    return jsonify({"error": str(erro)}), 400
+
+
+def consulta_fts(q):
+    """Converte o texto digitado numa consulta FTS5: todos os termos, o último como prefixo.
+
+    Cada termo vai entre aspas (nada do texto é interpretado como operador).
+    O último termo só vira prefixo se o texto não terminar em espaço
+    (autocomplete); um prefixo de uma letra não tem índice e é ignorado.
+    """
+    termos = re.findall(r"\w+", q.lower())
+    prefixo = bool(termos) and not q[-1].isspace()
+    if prefixo and len(termos[-1]) < 2:
+        termos.pop()
+        prefixo = False
+    if not any(len(t) >= 2 for t in termos):
+        raise ParametroInvalido("Informe ao menos 2 letras no parâmetro 'q'")
+    partes = [f'"{t}"' for t in termos]
+    if prefixo:
+        partes[-1] += "*"
+    return " ".join(partes)
+
+
+def _ler_limite():
+    try:
+        limite = int(request.args.get("limit", LIMITE_PADRAO))
+    except ValueError:
+        raise ParametroInvalido("O parâmetro 'limit' deve ser um inteiro")
+    if limite < 1:
+        raise ParametroInvalido("O parâmetro 'limit' deve ser maior que zero")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def _serializar(linha):
+    tipo = NOMES_TIPO[linha.rowid % 2]
+    item = {"tipo": tipo, "id": linha.rowid // 2, "nome": linha.nome, "email": linha.email}
+    if tipo == "professores":
+        item["materia"] = linha.materia
+    return item
+
+
+@bp.get("/search")
+@swag_from({
+    "tags": ["Busca"],
+    "description": (
+        "Busca por nome/e-mail de alunos e nome/e-mail/matéria de professores (índice FTS5), "
+        "com resultados ordenados por relevância. O último termo é tratado como prefixo "
+        "(autocomplete), a menos que 'q' termine com espaço. Acentos são ignorados."
+    ),
+    "parameters": [
+        {"name": "q", "in": "query", "type": "string", "required": True,
+         "description": "Texto buscado (ex.: 'ana li')."},
+        {"name": "tipo", "in": "query", "type": "string", "enum": list(TIPOS),
+         "description": "Restringe a alunos ou professores."},
+        {"name": "limit", "in": "query", "type": "integer", "default": LIMITE_PADRAO,
+         "description": f"Resultados por página (máx. {LIMITE_MAXIMO})."},
+        {"name": "after", "in": "query", "type": "string",
+         "description": "Cursor devolvido em 'next_cursor' pela página anterior."},
+    ],
+    "responses": {
+        200: {"description": f"Resultados e cursor da próxima página (até {JANELA_RANKING} resultados por busca)."},
+        400: {"description": "Parâmetros inválidos."}
+    }
+})
+def search():
+    consulta = consulta_fts(request.args.get("q", ""))
+    limite = _ler_limite()
+
+    tipo = request.args.get("tipo")
+    if tipo is not None and tipo not in TIPOS:
+        raise ParametroInvalido(f"O parâmetro 'tipo' deve ser um de: {', '.join(TIPOS)}")
+
+    deslocamento = 0
+    if request.args.get("after"):
+        deslocamento = decodificar_cursor(request.args["after"], "busca")
+        if type(deslocamento) is not int or not 0 <= deslocamento <= JANELA_RANKING:
+            raise ParametroInvalido("Cursor 'after' inválido")
+
+    # Uma linha a mais indica a próxima página, que não passa da janela
+    parametros = {"consulta": consulta, "candidatos": JANELA_CANDIDATOS, "limite": max(0, min(limite + 1, JANELA_RANKING - deslocamento)),
+                  "deslocamento": deslocamento}
+    filtro = ""
+    if tipo is not None:
+        filtro = "AND rowid % 2 = :tipo"
+        parametros["tipo"] = TIPOS[tipo]
+
+    linhas = db.session.execute(text(CONSULTA.format(filtro=filtro)), parametros).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = codificar_cursor("busca", deslocamento + limite)
+    return jsonify({"items": [_serializar(linha) for linha in linhas], "next_cursor": proximo})
@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+import orjson
+from flask import Response, jsonify, request
+from flask.json.provider import JSONProvider
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
+
+from common.compressao import variantes_etag
+from common.escolas import escola_atual
+
+from . import db
+from .models import Aluno, Mudanca, Professor, Turma
+from .pagination import ParametroInvalido, ler_ordenacao
+
+# Campos expostos na API por entidade (a versão da linha vai só no ETag)
+CAMPOS = {
+    Aluno: ("id", "nome", "email"),
+    Professor: ("id", "nome", "idade", "email", "materia", "observacoes"),
+    Turma: ("id", "nome", "descricao", "capacidade"),
+}
+
+NOMES = {Aluno: "alunos", Professor: "professores", Turma: "turmas"}
+
+_OPCOES_ORJSON = orjson.OPT_NON_STR_KEYS
+
+
+def serializar(obj, campos=None):
+    return {campo: getattr(obj, campo) for campo in campos or CAMPOS[type(obj)]}
+
+
+# -----------------------
+# PROJEÇÃO (?fields=)
+# -----------------------
+
+def ler_campos(model, args):
+    """Campos pedidos em ``?fields=id,nome`` (todos, se ausente)."""
+    bruto = args.get("fields")
+    if not bruto:
+        return CAMPOS[model]
+    campos = tuple(dict.fromkeys(c.strip() for c in bruto.split(",") if c.strip()))
+    if not campos or any(c not in CAMPOS[model] for c in campos):
+        raise ParametroInvalido(f"O parâmetro 'fields' aceita: {', '.join(CAMPOS[model])}")
+    return campos
+
+
+def projetar(query, model, campos, args=None):
+    """Restringe o SELECT às colunas de ``campos``; as demais nunca são lidas.
+
+    Também carrega a ``versao`` (ETag) e, com ``args``, a coluna de ordenação
+    usada no cursor; o ``id`` sempre vem por ser a chave primária.
+    """
+    if campos == CAMPOS[model]:
+        return query
+    extras = ["versao"]
+    if args is not None:
+        extras.append(ler_ordenacao(args).lstrip("-"))
+    colunas = dict.fromkeys([*campos, *extras])
+    return query.options(load_only(*(getattr(model, c) for c in colunas)))
+
+
+# -----------------------
+# JSON
+# -----------------------
+
+def _padrao(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+class OrjsonProvider(JSONProvider):
+    """Provider JSON do Flask usando orjson (``jsonify``, ``request.get_json``)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_padrao, option=_OPCOES_ORJSON).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        corpo = orjson.dumps(obj, default=_padrao, option=_OPCOES_ORJSON)
+        return self._app.response_class(corpo, mimetype="application/json")
+
+
+# -----------------------
+# ETAG / GET CONDICIONAL
+# -----------------------
+
+def _na_escola(etag):
+    """Com ``X-Escola``, o ETag leva a escola: shards diferentes nunca têm o mesmo ETag."""
+    escola = escola_atual()
+    return etag if escola is None else f"{etag}@{escola}"
+
+
+def etag_item(obj):
+    return _na_escola(f"{NOMES[type(obj)]}-{obj.id}-{obj.versao}")
+
+
+def etag_lista(model):
+    """ETag das listagens de ``model``: o último ``seq`` do feed de mudanças.
+
+    Toda escrita (ORM ou lote) grava no outbox na mesma transação, então o
+    ``seq`` máximo muda sempre que alguma listagem pode ter mudado. É uma
+    leitura pela chave primária, sem tocar na tabela listada.
+    """
+    seq = db.session.scalar(select(func.max(Mudanca.seq))) or 0
+    return _na_escola(f"{NOMES[model]}-lista-{seq}")
+
+
+def responder(etag, gerar, status=200):
+    """Responde 304 se ``If-None-Match`` já tem ``etag``; senão serializa ``gerar()``.
+
+    ``gerar`` só é chamado quando o corpo precisa ser enviado.
+    """
+    guardado = None
+    if request.method in ("GET", "HEAD"):
+        guardado = next((e for e in variantes_etag(etag) if request.if_none_match.contains(e)), None)
+    if guardado is not None:
+        # O 304 repete a variante que o cliente guardou (ex.: "...-gzip"), não o ETag base
+        resp = Response(status=304)
+        resp.set_etag(guardado)
+    else:
+        resp = jsonify(gerar())
+        resp.status_code = status
+        resp.set_etag(etag)
+    # O cliente pode guardar a resposta, mas deve revalidar (If-None-Match) antes de usar
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def responder_item(obj, status=200, campos=None):
+    return responder(etag_item(obj), lambda: serializar(obj, campos), status)
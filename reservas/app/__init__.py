@@ -0,0 +1,75 @@
+from flask import Flask
+import os
+import sqlite3
+
+from functools import partial
+
+from common.admissao import instalar_admissao
+from common.compressao import instalar_compressao
+from common.escolas import abrir_stores, instalar_escolas, store_atual
+from common.gerenciamento_client import GerenciamentoClient
+from common.group_commit import GroupCommit
+from common.metrics import instrumentar
+from common.reconciliacao import instalar_reconciliacao
+from common.snapshot import instalar_snapshot
+from common.openapi import configurar_docs
+
+
+def create_app():
+    app = Flask(__name__)
+    # Swagger (ou, com FAST_STARTUP=1, o spec pré-construído no build)
+    configurar_docs(app, "Reservas API")
+
+    # Latência, status e requisições em andamento por rota, em GET /metrics
+    instrumentar(app, "reservas")
+
+    # Controle de admissão (429/503 + Retry-After): com workers gevent, o limite de
+    # concorrência é alto; leituras têm vagas reservadas acima das escritas
+    instalar_admissao(app, "reservas", erros_lock=(sqlite3.OperationalError,),
+                      concorrencia=1000, reserva_leituras=200, escritas=200, fila_escritas=1000)
+
+    # gzip/brotli negociado pelo Accept-Encoding nas respostas grandes
+    instalar_compressao(app)
+
+    # Banco no volume /data no Docker (RESERVAS_DB); localmente, ao lado do código
+    db_path = os.environ.get("RESERVAS_DB", os.path.join(os.path.dirname(__file__), "..", "reservas.db"))
+
+    from .store import ReservaStore, gravar_lote
+    app.extensions["reservas"] = ReservaStore(db_path)
+
+    # Várias escolas (ESCOLAS_DIR): com X-Escola, cada escola usa o próprio banco
+    instalar_escolas(app, abrir_stores(ReservaStore, "reservas"))
+
+    # Modo de escrita das reservas: "direta" (um commit por requisição), "lote"
+    # (commit em grupo; responde depois do commit) ou "ticket" (responde 202 ao
+    # enfileirar, com um ticket para consultar o resultado)
+    modo = os.environ.get("RESERVAS_ESCRITA", "direta")
+    if modo not in ("direta", "lote", "ticket"):
+        raise ValueError(f"RESERVAS_ESCRITA inválido: {modo!r} (use direta, lote ou ticket)")
+    app.config["RESERVAS_ESCRITA"] = modo
+    app.config["RESERVAS_LOTE_TIMEOUT"] = float(os.environ.get("RESERVAS_LOTE_TIMEOUT", 5))
+    app.config["RESERVAS_TICKET_JANELA"] = float(os.environ.get("RESERVAS_TICKET_JANELA", 60))
+    app.extensions["reservas_lote"] = GroupCommit(
+        partial(gravar_lote, app.extensions["reservas"], app.extensions["escolas"]), "reservas",
+        max_lote=int(os.environ.get("RESERVAS_LOTE_MAX", 200)),
+        intervalo=float(os.environ.get("RESERVAS_LOTE_INTERVALO_MS", 1)) / 1000,
+        capacidade=int(os.environ.get("RESERVAS_FILA", 10000)),
+    )
+
+    # URL vem de GERENCIAMENTO_URL (docker-compose); conexões reaproveitadas entre requisições
+    app.extensions["gerenciamento"] = GerenciamentoClient()
+
+    # Referências a ids removidos no Gerenciamento: POST /reconciliacao (ou o job
+    # noturno ``python -m common.reconciliacao``); RECONCILIACAO_ACAO=marcar|remover
+    instalar_reconciliacao(app, app.extensions["reservas"], app.extensions["gerenciamento"],
+                           acao=os.environ.get("RECONCILIACAO_ACAO", "marcar"))
+
+    # Snapshot (backup online) e exportação em stream (NDJSON/CSV)
+    instalar_snapshot(app, lambda: store_atual(app, "reservas").caminho,
+                      {"reservas": ("reserva", ("id", "aluno_id", "turma_id"))}, "reservas")
+
+    # Importar e registra as rotas
+    from .routes import bp
+    app.register_blueprint(bp)
+
+    return app
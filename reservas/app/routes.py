@@ -0,0 +1,403 @@
+import re
+import time
+import uuid
+from concurrent.futures import TimeoutError as EsperaEsgotada
+
+from flask import Blueprint, current_app, request, jsonify, url_for
+
+from common.escolas import escola_atual, store_atual
+from common.gerenciamento_client import (
+    GerenciamentoConsultaInvalida, GerenciamentoIndisponivel, GerenciamentoSobrecarregado, GerenciamentoSuspenso)
+from common.group_commit import FilaCheia
+
+from .store import ReservaDuplicada, TurmaLotada
+
+bp = Blueprint("reservas", __name__)
+
+
+def _gerenciamento():
+    return current_app.extensions["gerenciamento"]
+
+
+def _reservas():
+    # Banco da escola do X-Escola, ou o do serviço
+    return store_atual(current_app, "reservas")
+
+
+def _lote():
+    return current_app.extensions["reservas_lote"]
+
+
+@bp.errorhandler(TurmaLotada)
+@bp.errorhandler(ReservaDuplicada)
+def conflito_reserva(erro):
+    return jsonify({"error": str(erro)}), 409
+
+
+def _gerenciamento_suspenso(erro):
+    # Falha rápida enquanto o Gerenciamento está degradado, sem prender a requisição
+    resp = jsonify({"error": "Gerenciamento indisponível no momento; tente novamente em instantes"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(erro.retry_after)
+    return resp
+
+
+# Ticket: instante de emissão (ms, 12 dígitos hex) seguido de um uuid4. Qualquer
+# worker sabe há quanto tempo um ticket foi emitido, mesmo sem tê-lo na sua fila.
+FORMATO_TICKET = re.compile(r"([0-9a-f]{12})[0-9a-f]{32}")
+
+
+def _novo_ticket():
+    return f"{int(time.time() * 1000):012x}{uuid.uuid4().hex}"
+
+
+def _idade_ticket(ticket):
+    """Segundos desde a emissão do ticket, ou None se ele não tem o formato de um ticket."""
+    formato = FORMATO_TICKET.fullmatch(ticket)
+    if formato is None:
+        return None
+    return time.time() - int(formato.group(1), 16) / 1000
+
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+
+# Maior INTEGER do SQLite; acima dele o driver levanta OverflowError
+INT64_MAX = 2 ** 63 - 1
+
+
+def _inteiro(nome, minimo=0):
+    """Lê um parâmetro inteiro da query string, de ``minimo`` até int64 (None se ausente)."""
+    valor = request.args.get(nome)
+    if valor in (None, ""):
+        return None
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ValueError(f"O parâmetro '{nome}' deve ser um inteiro")
+    if valor > INT64_MAX:
+        raise ValueError(f"O parâmetro '{nome}' deve ser um inteiro")
+    if valor < minimo:
+        raise ValueError(f"O parâmetro '{nome}' não pode ser negativo" if minimo == 0
+                         else f"O parâmetro '{nome}' deve ser >= {minimo}")
+    return valor
+
+
+@bp.post("/reservas")
+def criar_reserva():
+    """
+    Cria uma nova reserva (valida aluno e turma via Gerenciamento)
+    ---
+    tags:
+      - Reservas
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            aluno_id:
+              type: integer
+            turma_id:
+              type: integer
+    responses:
+      201:
+        description: Reserva criada (nos modos "direta" e "lote", já gravada)
+      202:
+        description: Reserva aceita na fila (modo "ticket"); acompanhe em Location
+      400:
+        description: Dados inválidos
+      409:
+        description: Turma sem vagas ou aluno já inscrito na turma
+      502:
+        description: Falha ao consultar o Gerenciamento
+      503:
+        description: Gerenciamento fora do ar (circuit breaker aberto) ou sobrecarregado, ou fila de escrita cheia; tente após Retry-After
+      504:
+        description: A gravação do lote não terminou a tempo (modo "lote")
+    """
+    data = request.get_json()
+    aluno_id = data.get("aluno_id")
+    turma_id = data.get("turma_id")
+
+    # bool é subclasse de int no Python, mas true/false não são ids
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (aluno_id, turma_id)):
+        return jsonify({"error": "Campos obrigatórios (inteiros): aluno_id, turma_id"}), 400
+
+    # Validação de aluno e turma (com a capacidade) em uma única chamada ao Gerenciamento
+    try:
+        encontrados = _gerenciamento().detalhes(escola_atual(), alunos=[aluno_id], turmas=[turma_id])
+    except (GerenciamentoSuspenso, GerenciamentoSobrecarregado) as erro:
+        return _gerenciamento_suspenso(erro)
+    except GerenciamentoConsultaInvalida as erro:
+        return jsonify({"error": f"Dados recusados pelo Gerenciamento: {erro}"}), 400
+    except GerenciamentoIndisponivel:
+        return jsonify({"error": "Falha ao validar no Gerenciamento"}), 502
+
+    if aluno_id not in encontrados["alunos"]:
+        return jsonify({"error": "Aluno não encontrado"}), 400
+    if turma_id not in encontrados["turmas"]:
+        return jsonify({"error": "Turma não encontrada"}), 400
+
+    capacidade = encontrados["turmas"][turma_id].get("capacidade")
+    if _reservas().lotada(turma_id, capacidade):
+        raise TurmaLotada(f"A turma {turma_id} não tem vagas")
+
+    modo = current_app.config["RESERVAS_ESCRITA"]
+    if modo == "direta":
+        return jsonify(_reservas().criar(aluno_id, turma_id, capacidade)), 201
+
+    ticket = _novo_ticket() if modo == "ticket" else None
+    pedido = {"aluno_id": aluno_id, "turma_id": turma_id, "capacidade": capacidade, "ticket": ticket,
+              "escola": escola_atual()}
+    try:
+        futuro = _lote().enviar(pedido, chave=ticket)
+    except FilaCheia as erro:
+        resp = jsonify({"error": "Muitas reservas na fila de gravação; tente novamente em instantes"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(erro.retry_after)
+        return resp
+
+    if modo == "ticket":
+        resp = jsonify({"ticket": ticket, "status": "pendente"})
+        resp.status_code = 202
+        resp.headers["Location"] = url_for(".situacao_ticket", ticket=ticket)
+        return resp
+
+    try:
+        reserva = futuro.result(timeout=current_app.config["RESERVAS_LOTE_TIMEOUT"])
+    except EsperaEsgotada:
+        return jsonify({"error": "A gravação da reserva não foi confirmada a tempo"}), 504
+    return jsonify(reserva), 201
+
+
+@bp.get("/reservas/tickets/<ticket>")
+def situacao_ticket(ticket):
+    """
+    Situação de uma reserva aceita com ticket (RESERVAS_ESCRITA=ticket)
+    ---
+    tags:
+      - Reservas
+    parameters:
+      - in: path
+        name: ticket
+        type: string
+        required: true
+    responses:
+      200:
+        description: Reserva gravada (status "gravada") ou recusada na gravação (status "falhou")
+      202:
+        description: Ainda na fila de gravação (status "pendente"), ou emitido há pouco e talvez na fila de outro worker (status "desconhecido")
+      404:
+        description: Ticket inválido, ou emitido há mais de RESERVAS_TICKET_JANELA segundos e nunca gravado
+    """
+    gravado = _reservas().ticket(ticket)
+    if gravado is None:
+        if _lote().pendente(ticket):
+            return jsonify({"ticket": ticket, "status": "pendente"}), 202
+        # Com vários workers, um ticket recente pode estar na fila de outro processo
+        idade = _idade_ticket(ticket)
+        if idade is not None and -1 <= idade <= current_app.config["RESERVAS_TICKET_JANELA"]:
+            resp = jsonify({"ticket": ticket, "status": "desconhecido"})
+            resp.status_code = 202
+            resp.headers["Retry-After"] = "1"
+            return resp
+        return jsonify({"error": "Ticket não encontrado"}), 404
+    if gravado["reserva_id"] is None:
+        return jsonify({"ticket": ticket, "status": "falhou", "error": gravado["erro"]})
+    reserva = {"id": gravado["reserva_id"], "aluno_id": gravado["aluno_id"], "turma_id": gravado["turma_id"]}
+    return jsonify({"ticket": ticket, "status": "gravada", "reserva": reserva})
+
+
+@bp.get("/reservas/fila")
+def fila_stats():
+    """
+    Estatísticas da fila de escrita em lote (tamanho, lotes gravados, média por lote)
+    ---
+    tags:
+      - Reservas
+    responses:
+      200:
+        description: Modo de escrita e contadores da fila
+    """
+    return jsonify({"mode": current_app.config["RESERVAS_ESCRITA"], **_lote().stats()})
+
+
+@bp.get("/reservas")
+def listar_reservas():
+    """
+    Lista as reservas, com filtros por turma e aluno e paginação por cursor
+    ---
+    tags:
+      - Reservas
+    parameters:
+      - in: query
+        name: turma_id
+        type: integer
+      - in: query
+        name: aluno_id
+        type: integer
+      - in: query
+        name: limit
+        type: integer
+        default: 100
+        description: Itens por página (de 1 a 1000; 0 é recusado com 400)
+      - in: query
+        name: after
+        type: integer
+        description: Valor de next_cursor da página anterior
+    responses:
+      200:
+        description: Página de reservas e cursor da próxima página
+      400:
+        description: Parâmetros inválidos
+    """
+    try:
+        filtros = {campo: _inteiro(campo) for campo in ("turma_id", "aluno_id")}
+        # limit=0 é recusado (400), como no Gerenciamento; ausente vale LIMITE_PADRAO
+        limite = _inteiro("limit", minimo=1)
+        limite = LIMITE_PADRAO if limite is None else min(limite, LIMITE_MAXIMO)
+        after = _inteiro("after") or 0
+    except ValueError as erro:
+        return jsonify({"error": str(erro)}), 400
+
+    itens = _reservas().listar(after=after, limite=limite + 1, **filtros)
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo = itens[-1]["id"]
+    return jsonify({"items": itens, "next_cursor": proximo})
+
+
+@bp.delete("/reservas/<int:reserva_id>")
+def remover_reserva(reserva_id):
+    """
+    Remove uma reserva
+    ---
+    tags:
+      - Reservas
+    parameters:
+      - in: path
+        name: reserva_id
+        type: integer
+        required: true
+    responses:
+      204:
+        description: Reserva removida
+      404:
+        description: Reserva não encontrada
+    """
+    if not _reservas().remover(reserva_id):
+        return jsonify({"error": "Reserva não encontrada"}), 404
+    return "", 204
+
+
+@bp.get("/reservas/stats/turmas")
+def stats_reservas_por_turma():
+    """
+    Quantidade de reservas por turma (contadores mantidos a cada inserção/remoção)
+    ---
+    tags:
+      - Reservas
+    responses:
+      200:
+        description: Lista de {turma_id, total}
+    """
+    return jsonify({"items": _reservas().contagens("turma_id")})
+
+
+@bp.get("/reservas/stats/turmas/<int:turma_id>")
+def stats_reservas_turma(turma_id):
+    """
+    Quantidade de reservas de uma turma, em O(1)
+    ---
+    tags:
+      - Reservas
+    parameters:
+      - in: path
+        name: turma_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Total de reservas
+    """
+    return jsonify({"turma_id": turma_id, "total": _reservas().contagem("turma_id", turma_id)})
+
+
+@bp.get("/reservas/stats/alunos/<int:aluno_id>")
+def stats_reservas_aluno(aluno_id):
+    """
+    Quantidade de reservas de um aluno, em O(1)
+    ---
+    tags:
+      - Reservas
+    parameters:
+      - in: path
+        name: aluno_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Total de reservas
+    """
+    return jsonify({"aluno_id": aluno_id, "total": _reservas().contagem("aluno_id", aluno_id)})
+
+
+@bp.get("/cache")
+def cache_stats():
+    """
+    Estatísticas do cache de validação (hits, misses, tamanho)
+    ---
+    tags:
+      - Cache
+    responses:
+      200:
+        description: Contadores do cache
+    """
+    cache = _gerenciamento().cache
+    return jsonify(cache.stats() if cache is not None else {"enabled": False})
+
+
+@bp.delete("/cache")
+def limpar_cache():
+    """
+    Esvazia o cache de validação
+    ---
+    tags:
+      - Cache
+    responses:
+      204:
+        description: Cache esvaziado
+    """
+    _gerenciamento().invalidar()
+    return "", 204
+
+
+@bp.delete("/cache/<entidade>/<int:entidade_id>")
+def invalidar_cache(entidade, entidade_id):
+    """
+    Invalida um ID no cache de validação
+    ---
+    tags:
+      - Cache
+    parameters:
+      - in: path
+        name: entidade
+        type: string
+        enum: [alunos, turmas]
+      - in: path
+        name: entidade_id
+        type: integer
+    responses:
+      204:
+        description: ID removido do cache
+    """
+    _gerenciamento().invalidar(entidade, entidade_id, escola_atual())
+    return "", 204
+
+
+@bp.get("/health")
+def health():
+    return {"status": "ok", "service": "reservas", "gerenciamento": _gerenciamento().breaker.stats()["state"]}
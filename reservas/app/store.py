@@ -0,0 +1,219 @@
+import logging
+import sqlite3
+import time
+
+from common.sqlite_store import SQLiteStore
+
+log = logging.getLogger(__name__)
+
+
+class TurmaLotada(Exception):
+    """A turma não tem mais vagas."""
+
+
+class ReservaDuplicada(Exception):
+    """O aluno já tem reserva nesta turma."""
+
+
+# A vaga é conferida e ocupada no mesmo comando: o INSERT só acontece se a
+# contagem da turma (mantida por trigger) estiver abaixo da capacidade. Como
+# roda dentro da transação de escrita, dois workers nunca ocupam a mesma vaga.
+INSERIR = """
+INSERT INTO reserva (aluno_id, turma_id)
+SELECT :aluno_id, :turma_id
+WHERE :capacidade IS NULL
+   OR COALESCE((SELECT total FROM contagem_reserva_turma_id WHERE turma_id = :turma_id), 0) < :capacidade
+"""
+
+# Tentativas de registrar a falha dos tickets de um lote que não foi gravado
+TENTATIVAS_FALHA = 5
+
+# Reservas repetidas (mesmo aluno e turma), fora a mais antiga de cada par
+REPETIDAS = "SELECT id FROM reserva WHERE id NOT IN (SELECT MIN(id) FROM reserva GROUP BY turma_id, aluno_id)"
+
+
+def gravar_lote(store, escolas, itens):
+    """``criar_lote`` de pedidos de várias escolas: um commit no banco de cada uma.
+
+    Os pedidos sem ``escola`` vão para ``store``; os demais para o shard da
+    escola em ``escolas``. Uma falha no banco de uma escola volta como o erro
+    dos pedidos dela, sem afetar os das outras.
+    """
+    grupos = {}
+    for posicao, item in enumerate(itens):
+        grupos.setdefault(item.get("escola"), []).append(posicao)
+    resultados = [None] * len(itens)
+    for escola, posicoes in grupos.items():
+        try:
+            destino = store if escola is None else escolas.obter(escola)
+            gravados = destino.criar_lote([itens[posicao] for posicao in posicoes])
+        except Exception as erro:
+            gravados = [erro] * len(posicoes)
+        for posicao, resultado in zip(posicoes, gravados):
+            resultados[posicao] = resultado
+    return resultados
+
+
+class ReservaStore(SQLiteStore):
+    """Reservas persistidas em SQLite (WAL).
+
+    O id vem do AUTOINCREMENT do SQLite, atribuído dentro da transação de
+    escrita: é único mesmo com vários workers gravando ao mesmo tempo.
+    Cada aluno tem no máximo uma reserva por turma (índice único), e a
+    capacidade da turma, quando informada, é respeitada na própria inserção.
+    """
+
+    TABELA = "reserva"
+    CONTADORES = ("turma_id", "aluno_id")
+    REFERENCIAS = {"aluno_id": "alunos", "turma_id": "turmas"}
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reserva (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        aluno_id INTEGER NOT NULL,
+        turma_id INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_reserva_aluno_id ON reserva (aluno_id);
+    CREATE INDEX IF NOT EXISTS ix_reserva_turma_id ON reserva (turma_id);
+
+    -- Uma reserva por aluno e turma. Em bancos anteriores, as repetidas (fica a mais
+    -- antiga) vão para a quarentena em reserva_duplicada antes do índice único.
+    CREATE TABLE IF NOT EXISTS reserva_duplicada (
+        id INTEGER PRIMARY KEY,
+        aluno_id INTEGER NOT NULL,
+        turma_id INTEGER NOT NULL,
+        movida_em TEXT NOT NULL
+    );
+    INSERT OR IGNORE INTO reserva_duplicada (id, aluno_id, turma_id, movida_em)
+        SELECT id, aluno_id, turma_id, datetime('now') FROM reserva
+        WHERE id NOT IN (SELECT MIN(id) FROM reserva GROUP BY turma_id, aluno_id);
+    DELETE FROM reserva WHERE id IN (SELECT id FROM reserva_duplicada);
+    DROP INDEX IF EXISTS ix_reserva_turma_aluno;
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_reserva_turma_aluno ON reserva (turma_id, aluno_id);
+
+    -- Resultado das reservas aceitas com ticket (RESERVAS_ESCRITA=ticket)
+    CREATE TABLE IF NOT EXISTS reserva_ticket (
+        ticket TEXT PRIMARY KEY,
+        reserva_id INTEGER,
+        erro TEXT
+    ) WITHOUT ROWID;
+    """
+    VERSAO_SCHEMA = 5
+
+    def _migrar(self, conn):
+        existe = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reserva'").fetchone()
+        repetidas = [linha[0] for linha in conn.execute(REPETIDAS)] if existe else []
+        super()._migrar(conn)
+        if repetidas:
+            log.warning("%d reserva(s) repetida(s) movida(s) para a tabela reserva_duplicada em %s "
+                        "para criar o índice único (ids: %s)", len(repetidas), self.caminho,
+                        ", ".join(map(str, repetidas[:50])) + (" ..." if len(repetidas) > 50 else ""))
+
+    def _inserir(self, conn, aluno_id, turma_id, capacidade):
+        try:
+            cur = conn.execute(INSERIR, {"aluno_id": aluno_id, "turma_id": turma_id, "capacidade": capacidade})
+        except sqlite3.IntegrityError:
+            raise ReservaDuplicada(f"O aluno {aluno_id} já tem reserva na turma {turma_id}")
+        if cur.rowcount == 0:
+            raise TurmaLotada(f"A turma {turma_id} não tem vagas")
+        return {"id": cur.lastrowid, "aluno_id": aluno_id, "turma_id": turma_id}
+
+    def lotada(self, turma_id, capacidade):
+        """Checagem prévia, sem o lock de escrita: a turma já está cheia?
+
+        Em uma turma disputada e lotada, as tentativas seguintes são recusadas
+        com uma leitura, sem entrar na fila de escrita. A garantia continua
+        sendo a do INSERT condicional.
+        """
+        return capacidade is not None and self.contagem("turma_id", turma_id) >= capacidade
+
+    def criar(self, aluno_id, turma_id, capacidade=None):
+        """Cria a reserva; levanta ``TurmaLotada`` ou ``ReservaDuplicada``."""
+        with self.transacao() as conn:
+            return self._inserir(conn, aluno_id, turma_id, capacidade)
+
+    def criar_lote(self, itens):
+        """Grava vários pedidos ``{"aluno_id", "turma_id", "capacidade", "ticket"}`` em uma transação.
+
+        Cada item roda em um SAVEPOINT: o erro de um item volta como a
+        exceção na sua posição da lista, sem desfazer os demais. O resultado
+        de itens com ``ticket`` é registrado na mesma transação. Se a transação
+        inteira falhar, a falha dos tickets é registrada em outra, antes de a
+        exceção subir: quem já recebeu 202 vê o erro em vez de um 404.
+        """
+        try:
+            return self._gravar_lote(itens)
+        except Exception as erro:
+            self._registrar_falha([item["ticket"] for item in itens if item.get("ticket")], erro)
+            raise
+
+    def _gravar_lote(self, itens):
+        resultados = []
+        with self.transacao() as conn:
+            for item in itens:
+                conn.execute("SAVEPOINT item")
+                try:
+                    resultado = self._inserir(conn, item["aluno_id"], item["turma_id"], item.get("capacidade"))
+                except (TurmaLotada, ReservaDuplicada, sqlite3.Error) as erro:
+                    conn.execute("ROLLBACK TO item")
+                    resultado, reserva_id = erro, None
+                else:
+                    reserva_id = resultado["id"]
+                conn.execute("RELEASE item")
+                if item.get("ticket"):
+                    conn.execute("INSERT INTO reserva_ticket (ticket, reserva_id, erro) VALUES (?, ?, ?)",
+                                 (item["ticket"], reserva_id, None if reserva_id else str(resultado)))
+                resultados.append(resultado)
+        return resultados
+
+    def _registrar_falha(self, tickets, erro):
+        if not tickets:
+            return
+        mensagem = f"Falha ao gravar a reserva ({erro}); envie de novo"
+        for tentativa in range(TENTATIVAS_FALHA):
+            try:
+                with self.transacao() as conn:
+                    conn.executemany("INSERT OR IGNORE INTO reserva_ticket (ticket, reserva_id, erro) "
+                                     "VALUES (?, NULL, ?)", [(ticket, mensagem) for ticket in tickets])
+                return
+            except sqlite3.Error:
+                if tentativa == TENTATIVAS_FALHA - 1:
+                    log.exception("Falha de %d ticket(s) não registrada em %s: %s", len(tickets), self.caminho,
+                                  ", ".join(tickets))
+                    return
+                time.sleep(0.1 * 2 ** tentativa)
+
+    def ticket(self, ticket):
+        """Situação gravada de um ticket: a reserva criada, o erro, ou None se ainda não gravado."""
+        with self.leitura() as conn:
+            linha = conn.execute(
+                "SELECT t.reserva_id, t.erro, r.aluno_id, r.turma_id FROM reserva_ticket t "
+                "LEFT JOIN reserva r ON r.id = t.reserva_id WHERE t.ticket = ?", (ticket,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    def remover(self, reserva_id):
+        with self.transacao() as conn:
+            cur = conn.execute("DELETE FROM reserva WHERE id = ?", (reserva_id,))
+        return cur.rowcount > 0
+
+    def listar(self, aluno_id=None, turma_id=None, after=0, limite=100):
+        """Página de reservas com ``id > after``, em ordem de id, filtrada por aluno e/ou turma.
+
+        Cada filtro tem índice próprio (o id já faz parte de todo índice no
+        SQLite), então o custo é proporcional ao tamanho da página, não da tabela.
+        """
+        condicoes, params = ["id > ?"], [after]
+        if aluno_id is not None:
+            condicoes.append("aluno_id = ?")
+            params.append(aluno_id)
+        if turma_id is not None:
+            condicoes.append("turma_id = ?")
+            params.append(turma_id)
+        params.append(limite)
+        with self.leitura() as conn:
+            linhas = conn.execute(
+                f"SELECT id, aluno_id, turma_id FROM reserva WHERE {' AND '.join(condicoes)} ORDER BY id LIMIT ?",
+                params,
+            ).fetchall()
+        return [dict(linha) for linha in linhas]